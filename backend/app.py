@@ -1,23 +1,196 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import Response
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from google import genai
 import os
 from dotenv import load_dotenv
-import requests
 import time
 import random
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
 import json
 from final_agent import scam_agent
-from pymongo import MongoClient
+from model_tiers import build_cascade_from_env
+from verdict_store import open_verdict_store
+from domain_allowlist import load_domain_allowlist
+from blocklist import BlocklistReloader, get_blocklist
+from navigation_feed import NavigationSession
+from speculative import SpeculativeScanner, external_links
+from verdict_sync import CONFIRM_CACHE_SECONDS, PREFIX_LEN, VerdictSyncStore, blocklist_expressions, verdict_list
+from write_behind import WriteBehindQueue
+from jobs import JobStore, JobWorkerPool
+from llm_scheduler import queue_depths as llm_queue_depths, request_class, scheduler_stats
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from event_log import log_event, queue_depth, request_context, setup_logging, verbose_requested
+from metrics import (
+    CACHE_REQUESTS, IN_FLIGHT, PROMETHEUS_CONTENT_TYPE, QUEUE_DEPTH, REGISTRY, REQUEST_LATENCY, STAGE_LATENCY,
+)
+
+# Heavy dependencies (requests, bs4, google-genai, pymongo) are imported when the
+# clients that need them are created, not when this module is imported; see
+# benchmarks/import_profile.py for the startup profile.
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+# Approximate token budget for page text sent to Gemini
+COMPACT_TOKEN_BUDGET = int(os.environ.get("COMPACT_TOKEN_BUDGET", "1500"))
+
+# Random politeness delay before fetching a page, "min,max" seconds
+FETCH_JITTER = tuple(float(x) for x in os.environ.get("FETCH_JITTER", "1,3").split(","))
+
+# WARMUP=1: before accepting traffic, load the LLM clients, parser and tool
+# dependencies and pre-open their connection pools, so the first request after
+# a cold start isn't the slow one
+WARMUP = os.environ.get("WARMUP", "0") == "1"
+
+# Verdict returned for allowlisted top domains without fetching the page
+ALLOWLIST_FRAUD_PROBABILITY = float(os.environ.get("ALLOWLIST_FRAUD_PROBABILITY", "0.05"))
+ALLOWLIST_CONFIDENCE = float(os.environ.get("ALLOWLIST_CONFIDENCE", "0.9"))
+
+# Verdict returned for URLs on a threat-feed blocklist
+BLOCKLIST_FRAUD_PROBABILITY = float(os.environ.get("BLOCKLIST_FRAUD_PROBABILITY", "0.99"))
+BLOCKLIST_CONFIDENCE = float(os.environ.get("BLOCKLIST_CONFIDENCE", "0.95"))
+
+# Navigation feed (/ws/navigation), per connection: queued navigations before the
+# socket stops being read, concurrent analyses, and the burst-coalescing window
+WS_MAX_PENDING = int(os.environ.get("WS_MAX_PENDING", "32"))
+WS_CONCURRENCY = int(os.environ.get("WS_CONCURRENCY", "2"))
+WS_COALESCE_MS = float(os.environ.get("WS_COALESCE_MS", "50"))
+
+# Speculative pre-analysis of the top external links of analyzed pages, in its
+# own quota slice (analyses per minute; 0 turns it off)
+SPECULATIVE_PER_MINUTE = int(os.environ.get("SPECULATIVE_PER_MINUTE", "0"))
+SPECULATIVE_LINKS_PER_PAGE = int(os.environ.get("SPECULATIVE_LINKS_PER_PAGE", "3"))
+
+# Most prefixes one /sync/confirm call may ask about
+MAX_CONFIRM_PREFIXES = 64
+
+# Created by open_clients() when the app starts
+blocklist_reloader = None
+speculative_scanner = None
+verdict_sync = None
+domain_allowlist = None
+verdict_store = None
+results_writer = None
+job_store = None
+job_workers = None
+fetch_session = None
+
+def open_clients():
+    global blocklist_reloader, speculative_scanner, verdict_sync, domain_allowlist, verdict_store, results_writer, job_store, job_workers, fetch_session
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # DOMAIN_ALLOWLIST_FILE: memory-mapped top-domain snapshot (domain_allowlist.py
+    # build), shared through the page cache by every worker process
+    domain_allowlist = load_domain_allowlist()
+
+    # Versioned hash prefixes of known verdicts for local client-side lookups
+    verdict_sync = VerdictSyncStore()
+
+    # BLOCKLIST_FILE: snapshot compiled from threat feeds (blocklist.py compile),
+    # swapped in without a restart whenever it is recompiled
+    if os.environ.get("BLOCKLIST_FILE"):
+        if get_blocklist() is not None:
+            publish_blocklist(get_blocklist())
+        blocklist_reloader = BlocklistReloader(on_reload=publish_blocklist)
+        blocklist_reloader.start()
+
+    # VERDICT_STORE=mongo (MONGO_URL in .env) or sqlite (SQLITE_PATH)
+    verdict_store = open_verdict_store()
+
+    # Results are upserted in batches off the request path
+    results_writer = WriteBehindQueue(
+        verdict_store,
+        max_batch=int(os.environ.get("WRITE_BEHIND_BATCH", "100")),
+        flush_interval=float(os.environ.get("WRITE_BEHIND_INTERVAL", "1.0")),
+    )
+
+    # Long-running investigations: queued here, run by job workers (in-process
+    # threads when JOB_WORKERS > 0, and/or `python jobs.py` worker processes)
+    job_store = JobStore()
+    job_workers = JobWorkerPool(job_store, workers=int(os.environ.get("JOB_WORKERS", "1")),
+                                on_complete=offer_investigated_links)
+    if job_workers.workers > 0:
+        job_workers.start()
+
+    # One pooled session for page fetches, shared by all requests
+    fetch_session = requests.Session()
+    fetch_session.headers.update({
+        "User-Agent": "Mozilla/5.0",
+        "Accept": "text/html",
+        "Accept-Language": "en-US,en;q=0.9",
+    })
+    retry_strategy = Retry(
+        total=5,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["HEAD", "GET", "OPTIONS"],
+    )
+    adapter = HTTPAdapter(max_retries=retry_strategy)
+    fetch_session.mount("https://", adapter)
+    fetch_session.mount("http://", adapter)
+
+    if SPECULATIVE_PER_MINUTE > 0:
+        speculative_scanner = SpeculativeScanner(
+            run_speculative,
+            is_cached=lambda url: bool(results_writer.get(url) or verdict_store.get(url)),
+            per_minute=SPECULATIVE_PER_MINUTE,
+            links_per_page=SPECULATIVE_LINKS_PER_PAGE,
+        )
+        speculative_scanner.start()
+
+def publish_blocklist(blocklist):
+    version = verdict_sync.replace_source("bad", "blocklist", blocklist_expressions(blocklist))
+    log_event("sync.blocklist_published", entries=blocklist.count, version=version)
+
+def offer_investigated_links(url, outcome):
+    # ContentAnalysisTool already collected the investigated page's external links
+    if speculative_scanner is not None:
+        links = outcome["results"].get("content_analysis", {}).get("links") or {}
+        speculative_scanner.offer(url, links.get("external", []))
+
+def close_clients():
+    if blocklist_reloader is not None:
+        blocklist_reloader.stop()
+    if speculative_scanner is not None:
+        speculative_scanner.close()
+    job_workers.stop()
+    results_writer.close()
+    verdict_store.close()
+    fetch_session.close()
+    if domain_allowlist is not None:
+        domain_allowlist.close()
+
+def warm_up():
+    import final_agent
+    from bs4 import BeautifulSoup
+    from content_compactor import compact_page
+
+    start = time.perf_counter()
+    compact_page(BeautifulSoup("<html><body><p>warm-up</p></body></html>", "html.parser"))
+    verdict_store.get("warm-up")  # opens the store's connection
+    final_agent.warm_up()
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if api_key:
+        system = final_agent.SYSTEM_INSTRUCTION if final_agent.PROMPT_MODE != "full" else None
+        get_llm(api_key).warm_up(system)
+    log_event("warm_up.done", duration_ms=round((time.perf_counter() - start) * 1000, 1))
+
+@asynccontextmanager
+async def lifespan(app):
+    setup_logging()
+    open_clients()
+    if WARMUP:
+        warm_up()
+    try:
+        yield
+    finally:
+        close_clients()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -28,56 +201,160 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-MONGO_URL = os.environ.get("MONGO_URL")  # Put your URI in .env
-client = MongoClient(MONGO_URL)
-db = client["ai_analysis_db"]
-results_collection = db["results"]   
-        
+def collect_queue_depths():
+    if results_writer is None:
+        return
+    QUEUE_DEPTH.labels(queue="write_behind").set(results_writer.depth())
+    QUEUE_DEPTH.labels(queue="jobs").set(job_store.counts().get("queued", 0))
+    QUEUE_DEPTH.labels(queue="log").set(queue_depth())
+    if speculative_scanner is not None:
+        QUEUE_DEPTH.labels(queue="speculative").set(speculative_scanner.depth())
+    for priority, depth in llm_queue_depths().items():
+        QUEUE_DEPTH.labels(queue=f"llm:{priority}").set(depth)
+
+REGISTRY.add_collector(collect_queue_depths)
+
+def route_label(scope):
+    # Route templates, not raw paths, so /jobs/<id> doesn't explode label cardinality
+    for route in app.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    endpoint = route_label(request.scope)
+    start = time.perf_counter()
+    status = 500
+    # X-Debug-Log: 1 turns on full, unsampled event logging for this request only
+    with IN_FLIGHT.track_inprogress(endpoint=endpoint), \
+            request_context(request.headers.get("X-Request-ID"), verbose_requested(request.headers)) as request_id:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            REQUEST_LATENCY.labels(endpoint=endpoint, status=status).observe(time.perf_counter() - start)
+
+# Tiered cascade of hedged Gemini -> Together.ai providers, shared across
+# requests so per-tier counters and per-provider latency histograms are meaningful
+llm = None
+
+def get_llm(api_key):
+    global llm
+    if llm is None:
+        llm = build_cascade_from_env(api_key)
+    return llm
+
 class AnalysisRequest(BaseModel):
     url: str
 
-@app.post("/analyze")
-async def analyze_url(request: AnalysisRequest):
+class JobRequest(BaseModel):
+    url: str
+
+class ConfirmRequest(BaseModel):
+    prefixes: list[str]  # hex-encoded hash prefixes
+
+def client_id(connection):
+    """Fair-share key for LLM quota: the X-Client-ID header, else the peer address"""
+    client = connection.headers.get("X-Client-ID")
+    if client:
+        return client[:64]
+    return connection.client.host if connection.client else "anonymous"
+
+def analyze_page(url, client=None):
+    """The /analyze pipeline for one interactive request (blocking). Raises HTTPException on failure"""
+    with request_class("interactive", client=client):
+        if speculative_scanner is None:
+            return run_analysis(url)
+        # Speculative pre-analysis holds off while interactive requests are running
+        with speculative_scanner.interactive():
+            return run_analysis(url)
+
+def run_speculative(url):
+    # Lowest priority class: only LLM quota that interactive and batch work leave unused
+    with request_class("speculative", client="speculative"):
+        return run_analysis(url, speculative=True)
+
+def run_analysis(url, speculative=False):
    ##
     try:
-        print("Starting analyze endpoint")
+        log_event("analyze.start", level="debug", url=url)
         ##
-        
+
+        # Known-bad URLs from the threat feeds: answered before any network or LLM call
+        blocklist = get_blocklist()
+        if blocklist is not None:
+            blocked = blocklist.lookup(url)
+            CACHE_REQUESTS.labels(layer="blocklist", result="hit" if blocked else "miss").inc()
+            if blocked:
+                log_event("analyze.blocklisted", url=url, **blocked)
+                return {
+                    "url": url,
+                    "fraud_probability": BLOCKLIST_FRAUD_PROBABILITY,
+                    "confidence_level": BLOCKLIST_CONFIDENCE,
+                    "justification": f"Listed as a known phishing/malware URL in threat feed {blocked['source']}.",
+                    "usage": {}
+                }
+
+        # Top-ranked domains get an instant low-risk verdict (user-content
+        # platforms like github.io or sites.google.com are never allowlisted)
+        if domain_allowlist is not None:
+            allowlisted = domain_allowlist.lookup(url)
+            CACHE_REQUESTS.labels(layer="allowlist", result="hit" if allowlisted else "miss").inc()
+            if allowlisted:
+                log_event("analyze.allowlisted", level="debug", url=url, domain=allowlisted)
+                return {
+                    "url": url,
+                    "fraud_probability": ALLOWLIST_FRAUD_PROBABILITY,
+                    "confidence_level": ALLOWLIST_CONFIDENCE,
+                    "justification": f"{allowlisted} is one of the most visited domains on the web.",
+                    "usage": {}
+                }
+
+        # Cached verdicts: pending (unflushed) results first, then the verdict store.
+        # Checked before the fetch jitter, fetch and parse, which only a miss needs
+        cached = results_writer.get(url)
+        CACHE_REQUESTS.labels(layer="write_behind", result="hit" if cached else "miss").inc()
+        if not cached:
+            with STAGE_LATENCY.time(stage="store_read"):
+                cached = verdict_store.get(url)
+            CACHE_REQUESTS.labels(layer="verdict_store", result="hit" if cached else "miss").inc()
+        if cached:
+            log_event("analyze.cache_hit", level="debug", url=url, speculative=speculative)
+            if speculative_scanner is not None and not speculative:
+                speculative_scanner.record_cache_hit(url)
+            return cached
+
         # Get Gemini API key
         API_KEY = os.environ.get("GEMINI_API_KEY")
         if not API_KEY:
             raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not set.")
-        client = genai.Client(api_key=API_KEY)
-
-        # Setup requests
-        session = requests.Session()
-        session.headers.update({
-            "User-Agent": "Mozilla/5.0",
-            "Accept": "text/html",
-            "Accept-Language": "en-US,en;q=0.9",
-        })
-        retry_strategy = Retry(
-            total=5,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "OPTIONS"],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
+        client = get_llm(API_KEY)
+        import requests
+        from bs4 import BeautifulSoup
+        from content_compactor import compact_page
 
         # Get page
-        time.sleep(random.uniform(1, 3))
+        time.sleep(random.uniform(*FETCH_JITTER))
         try:
-            response = session.get(request.url, timeout=10)
+            with STAGE_LATENCY.time(stage="page_fetch"):
+                response = fetch_session.get(url, timeout=10)
             if response.status_code != 200:
                 raise HTTPException(status_code=response.status_code, detail="Failed to fetch URL.")
         except requests.RequestException:
             raise HTTPException(status_code=500, detail="Error fetching the URL.")
 
-        # Extract text
-        soup = BeautifulSoup(response.text, "html.parser")
-        clean_text = soup.get_text(separator='\n')[:7500]
+        # Extract main content + forms/CTAs/contacts within the token budget
+        with STAGE_LATENCY.time(stage="html_parse"):
+            soup = BeautifulSoup(response.text, "html.parser")
+        # Links first: compact_page strips boilerplate (nav, footers) out of the soup.
+        # Only a cache miss gets here, so cached pages don't re-offer their links
+        if speculative_scanner is not None and not speculative:
+            speculative_scanner.offer(url, external_links(soup, url))
+        with STAGE_LATENCY.time(stage="html_parse"):
+            clean_text = compact_page(soup, token_budget=COMPACT_TOKEN_BUDGET)
 
         # Build Gemini prompt
         # prompt = f"""
@@ -87,25 +364,19 @@ async def analyze_url(request: AnalysisRequest):
         # Respond with only the number (no text).
         # """
         
-        # TODO: implement Mongo query here 
-        cached = results_collection.find_one({"_id" : request.url}) 
-        if cached:
-            return cached
-
-        
         ##
         import json
         try:
-            analysis_result = scam_agent(client, request.url, clean_text)
+            analysis_result = scam_agent(client, url, clean_text)
             #analysis_result = json.loads(result)
-            print(f"Parsed JSON: {analysis_result}")
+            log_event("analyze.verdict", level="debug", url=url, verdict=analysis_result)
                 
             # Validate required fields
             if not all(key in analysis_result for key in ["fraud_probability", "confidence_level", "justification"]):
                 raise ValueError("Missing required fields in response")
                     
         except (json.JSONDecodeError, ValueError) as e:
-            print(f"JSON parsing error: {e}")
+            log_event("analyze.unparseable", level="warning", url=url, error=str(e))
             # Fallback response
             analysis_result = {
                 "fraud_probability": 0.0,
@@ -114,46 +385,127 @@ async def analyze_url(request: AnalysisRequest):
             }
                 
         except Exception as e:
-            print(f"Gemini error: {e}")
+            log_event("analyze.llm_error", level="error", url=url, error=str(e))
             raise HTTPException(status_code=500, detail=f"Gemini error: {str(e)}")
 
-        print("Analysis completed successfully")
         response_data = {
-            "url": request.url,
+            "url": url,
             "fraud_probability": analysis_result["fraud_probability"],
             "confidence_level": analysis_result["confidence_level"],
-            "justification": analysis_result["justification"]
+            "justification": analysis_result["justification"],
+            "usage": analysis_result.get("usage", {})
         }
-        print(f"About to return: {response_data}")
+        log_event("analyze.done", url=url, fraud_probability=response_data["fraud_probability"],
+                  confidence_level=response_data["confidence_level"])
+        log_event("analyze.response", level="debug", response=response_data)
 
-        # add to DB 
-        cached = results_collection.find_one({"_id": request.url})
-        # results_collection.update_one(response_data)
- 
-        if cached:
-            results_collection.update_one(
-             {"_id": response_data["url"]},  # filter: find document where _id == url
-                {"$set": {
-                    "fraud_probability": response_data["fraud_probability"],
-                    "confidence_level": response_data["confidence_level"],
-                    "justification": response_data["justification"]
-                }})
-        else:
-            results_collection.insert_one({
-                "_id": response_data["url"],
-                "fraud_probability": response_data["fraud_probability"],
-                "confidence_level": response_data["confidence_level"],
-                "justification": response_data["justification"]
-            })
+        # add to DB (queued upsert, flushed in bulk by the write-behind thread)
+        results_writer.enqueue({
+            "_id": response_data["url"],
+            "fraud_probability": response_data["fraud_probability"],
+            "confidence_level": response_data["confidence_level"],
+            "justification": response_data["justification"]
+        })
+        try:
+            verdict_sync.set_verdict(url, verdict_list(response_data["fraud_probability"],
+                                                       response_data["confidence_level"]))
+        except Exception as e:
+            log_event("sync.publish_failed", level="warning", url=url, error=str(e))
 
         return response_data
         
     except Exception as e:
-        print(f"Error in analyze: {e}")
         import traceback
-        traceback.print_exc()
+        log_event("analyze.failed", level="error", url=url, error=str(e), traceback=traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+@app.post("/analyze")
+async def analyze_url(request: AnalysisRequest, http_request: Request):
+    # Fetching, parsing and the LLM call block, so they run in the threadpool
+    return await run_in_threadpool(analyze_page, request.url, client_id(http_request))
+
+@app.websocket("/ws/navigation")
+async def navigation_feed(websocket: WebSocket):
+    # Same pipeline as /analyze; see navigation_feed.py for the message protocol
+    client = client_id(websocket)
+    with request_context(websocket.headers.get("X-Request-ID"), verbose_requested(websocket.headers)):
+        session = NavigationSession(
+            websocket,
+            lambda url: analyze_page(url, client),
+            max_pending=WS_MAX_PENDING,
+            concurrency=WS_CONCURRENCY,
+            coalesce_window=WS_COALESCE_MS / 1000,
+        )
+        with IN_FLIGHT.track_inprogress(endpoint="/ws/navigation"):
+            await session.run()
+
+@app.get("/llm/stats")
+async def llm_stats():
+    if llm is None:
+        return {"tiers": {}, "schedulers": scheduler_stats()}
+    return dict(llm.stats(), schedulers=scheduler_stats())
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest, http_request: Request):
+    url = request.url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    # SQLite calls can wait on the workers' write lock (busy_timeout), so keep them off the event loop
+    job_id = await run_in_threadpool(job_store.create, url, client=client_id(http_request))
+    return {"job_id": job_id, "status": "queued", "poll": f"/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.get("/metrics")
+async def metrics():
+    # Collectors read the job database (queue depth), so render in the threadpool
+    return Response(await run_in_threadpool(REGISTRY.render), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/sync/prefixes")
+async def sync_prefixes(since: int = 0):
+    # A full update reads and encodes every live prefix; SQLite work stays off the event loop
+    return await run_in_threadpool(verdict_sync.update, since)
+
+@app.post("/sync/confirm")
+async def sync_confirm(request: ConfirmRequest):
+    if len(request.prefixes) > MAX_CONFIRM_PREFIXES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CONFIRM_PREFIXES} prefixes per request.")
+    try:
+        prefixes = [bytes.fromhex(prefix) for prefix in request.prefixes]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Prefixes must be hex-encoded.")
+    if any(len(prefix) != PREFIX_LEN for prefix in prefixes):
+        raise HTTPException(status_code=400, detail=f"Prefixes must be {PREFIX_LEN} bytes.")
+    def lookup():
+        return {
+            "version": verdict_sync.version(),
+            "matches": verdict_sync.confirm(prefixes),
+            "cache_seconds": CONFIRM_CACHE_SECONDS,
+        }
+    return await run_in_threadpool(lookup)
+
+@app.get("/blocklist/stats")
+async def blocklist_stats():
+    blocklist = get_blocklist()
+    if blocklist is None:
+        return {"entries": 0}
+    return blocklist.stats()
+
+@app.get("/speculative/stats")
+async def speculative_stats():
+    if speculative_scanner is None:
+        return {"enabled": False}
+    return dict(speculative_scanner.stats(), enabled=True)
+
+@app.get("/persistence/stats")
+async def persistence_stats():
+    return results_writer.stats()
+
 @app.get("/connection")
 async def connection():
     return {"status": "connected"}
@@ -0,0 +1,60 @@
+"""Benchmark: one LLM call per URL vs. batched prompts, against a local stub LLM.
+
+Reports LLM calls, wall time and projected URLs/minute under a fixed RPM quota.
+
+    python benchmarks/batch_bench.py
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from final_agent import scam_agent, scam_agent_batch
+from llm_providers import OpenAICompatibleProvider
+from stub_llm_server import DEFAULT_VERDICT, start_stub_server
+
+PAGES = 64
+RPM_QUOTA = 60
+MALFORMED_RATE = 0.1  # fraction of batch replies that come back truncated
+
+
+def stub_reply(request):
+    prompt = request["messages"][-1]["content"]
+    page_ids = re.findall(r"^### Page (\d+)$", prompt, re.MULTILINE)
+    if not page_ids:
+        return json.dumps(DEFAULT_VERDICT)
+    reply = json.dumps([dict(DEFAULT_VERDICT, id=page_id) for page_id in page_ids])
+    if random.random() < MALFORMED_RATE:
+        return reply[: len(reply) // 2]
+    return reply
+
+
+def main():
+    random.seed(7)
+    _, url = start_stub_server(median_ms=400, sigma=0.3, reply=stub_reply)
+    pages = [(f"https://example-{i}.test/", f"[TITLE]\nExample shop {i}\n[CONTENT]\nProducts and prices.")
+             for i in range(PAGES)]
+
+    print(f"{'mode':>10} {'llm calls':>10} {'wall s':>8} {f'urls/min @{RPM_QUOTA}rpm':>18}")
+    provider = OpenAICompatibleProvider("stub", "stub-model", url + "/v1/chat/completions", name="stub")
+    start = time.perf_counter()
+    for page_url, text in pages:
+        scam_agent(provider, page_url, text)
+    calls = provider.latency.count
+    print(f"{'single':>10} {calls:>10} {time.perf_counter() - start:>8.1f} {PAGES / calls * RPM_QUOTA:>18.0f}")
+
+    for batch_size in (4, 8, 16):
+        provider = OpenAICompatibleProvider("stub", "stub-model", url + "/v1/chat/completions", name="stub")
+        start = time.perf_counter()
+        results = scam_agent_batch(provider, pages, batch_size=batch_size)
+        assert len(results) == PAGES
+        calls = provider.latency.count
+        print(f"{f'batch {batch_size}':>10} {calls:>10} {time.perf_counter() - start:>8.1f} "
+              f"{PAGES / calls * RPM_QUOTA:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
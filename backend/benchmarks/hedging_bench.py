@@ -0,0 +1,57 @@
+"""Benchmark: tail latency with and without hedging, against local stub LLMs.
+
+    python benchmarks/hedging_bench.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from llm_providers import HedgedLLM, OpenAICompatibleProvider
+from stub_llm_server import start_stub_server
+
+REQUESTS = 300
+CONCURRENCY = 8
+
+
+def run(llm):
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        llm.complete("system", "prompt")
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        list(pool.map(one, range(REQUESTS)))
+    latencies.sort()
+    return {q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 for q in (0.5, 0.95, 0.99)}
+
+
+def main():
+    # Primary: fast median, heavy tail. Secondary: slower median, tight distribution.
+    _, primary_url = start_stub_server(median_ms=150, sigma=1.0)
+    _, secondary_url = start_stub_server(median_ms=250, sigma=0.2)
+
+    def providers():
+        return (OpenAICompatibleProvider("stub", "primary-model", primary_url + "/v1/chat/completions", name="primary"),
+                OpenAICompatibleProvider("stub", "secondary-model", secondary_url + "/v1/chat/completions", name="secondary"))
+
+    primary, _ = providers()
+    baseline = run(HedgedLLM(primary))
+
+    primary, secondary = providers()
+    hedged_llm = HedgedLLM(primary, secondary, max_hedge_rate=0.1, default_delay=1.0)
+    hedged = run(hedged_llm)
+    stats = hedged_llm.stats()
+
+    print(f"{'':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, result in (("primary", baseline), ("hedged", hedged)):
+        print(f"{label:>10} {result[0.5]:>8.0f} {result[0.95]:>8.0f} {result[0.99]:>8.0f}")
+    print(f"hedge rate {stats['hedge_rate']:.1%} (cap {stats['max_hedge_rate']:.0%}), "
+          f"secondary won {stats['hedge_wins']}/{stats['hedges']}, hedge delay {stats['hedge_delay_s']}s")
+
+
+if __name__ == "__main__":
+    main()
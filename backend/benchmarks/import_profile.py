@@ -0,0 +1,100 @@
+"""Startup profile: what importing a backend module costs, from ``-X importtime``.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter
+(several times, keeping the fastest run) and reports the wall time plus the
+slowest imports by cumulative and by self time. Cold starts under
+scale-to-zero pay this on every new instance.
+
+    python benchmarks/import_profile.py                 # import app
+    python benchmarks/import_profile.py final_agent --top 30
+    python benchmarks/import_profile.py app --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+
+def profile_import(module, runs=3):
+    """(wall seconds, [(module, self_us, cumulative_us, depth)]) for the fastest of ``runs`` imports"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit status {proc.returncode}"
+            raise SystemExit(f"import {module} failed: {error}")
+        if best is None or wall < best[0]:
+            best = (wall, parse_importtime(proc.stderr))
+    return best
+
+
+def parse_importtime(stderr):
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def top_level_packages(entries):
+    """Cumulative time per top-level package, children folded in"""
+    totals = {}
+    for name, _, cumulative_us, depth in entries:
+        if depth == 0:
+            package = name.split(".")[0]
+            totals[package] = totals.get(package, 0) + cumulative_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def print_report(module, wall, entries, top):
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+    print(f"import {module}: {wall * 1000:.1f} ms wall (interpreter start included), "
+          f"{total_us / 1000:.1f} ms in imports, {len(entries)} modules")
+
+    print(f"\n{'top-level package':40} {'cumulative ms':>14}")
+    for package, cumulative_us in top_level_packages(entries)[:top]:
+        print(f"{package:40} {cumulative_us / 1000:>14.1f}")
+
+    print(f"\n{'module':60} {'self ms':>9}")
+    for name, self_us, _, _ in sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]:
+        print(f"{name:60} {self_us / 1000:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile module import time with -X importtime")
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters; the fastest is reported")
+    parser.add_argument("--json", metavar="PATH", help="also write the raw profile here")
+    args = parser.parse_args(argv)
+
+    wall, entries = profile_import(args.module, args.runs)
+    print_report(args.module, wall, entries, args.top)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "module": args.module,
+                "python": sys.version.split()[0],
+                "wall_ms": round(wall * 1000, 1),
+                "imports": [{"module": name, "self_us": self_us, "cumulative_us": cumulative_us, "depth": depth}
+                            for name, self_us, cumulative_us, depth in entries],
+            }, f, indent=2)
+        print(f"\nWrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
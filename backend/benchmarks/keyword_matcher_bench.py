@@ -0,0 +1,79 @@
+"""Benchmark: naive keyword loop vs. compiled Aho-Corasick matcher.
+
+Run from the backend directory:
+    python benchmarks/keyword_matcher_bench.py
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from keyword_matcher import KeywordMatcher
+
+PATTERN_COUNTS = [24, 100, 1000, 10000, 50000]
+SAMPLES = 200
+
+
+def random_word(rng, low=4, high=12):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def build_inputs(rng, patterns):
+    """Half domains, half ~3KB page texts, with a few planted keywords"""
+    inputs = []
+    for i in range(SAMPLES):
+        if i % 2:
+            parts = [random_word(rng) for _ in range(3)]
+            parts.insert(1, rng.choice(patterns))
+            inputs.append("-".join(parts) + ".com")
+        else:
+            words = [random_word(rng, 2, 9) for _ in range(400)]
+            for _ in range(5):
+                words.insert(rng.randrange(len(words)), rng.choice(patterns))
+            inputs.append(" ".join(words)[:3000])
+    return inputs
+
+
+def naive(patterns, inputs):
+    hits = 0
+    for text in inputs:
+        for keyword in patterns:
+            if keyword in text:
+                hits += 1
+    return hits
+
+
+def automaton(matcher, inputs):
+    hits = 0
+    for text in inputs:
+        hits += len(matcher.find_first(text))
+    return hits
+
+
+def main():
+    rng = random.Random(1234)
+    print(f"{'patterns':>9} {'build ms':>10} {'naive us/input':>15} {'ac us/input':>12} {'speedup':>8}")
+    for count in PATTERN_COUNTS:
+        patterns = list({random_word(rng) for _ in range(count)})
+        inputs = build_inputs(rng, patterns)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(patterns)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        naive_hits = naive(patterns, inputs)
+        naive_us = (time.perf_counter() - start) / len(inputs) * 1e6
+
+        start = time.perf_counter()
+        ac_hits = automaton(matcher, inputs)
+        ac_us = (time.perf_counter() - start) / len(inputs) * 1e6
+
+        assert naive_hits == ac_hits, (naive_hits, ac_hits)
+        print(f"{len(patterns):>9} {build_ms:>10.1f} {naive_us:>15.1f} {ac_us:>12.1f} {naive_us / ac_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""End-to-end load test with local stand-ins for every external service.
+
+Starts stub Gemini / Together.ai (stub_llm_server), Safe Browsing, WHOIS and
+target sites serving the static corpus (stub_services), then drives either the
+API's /analyze endpoint (uvicorn in a child process) or
+InvestigationOrchestrator.execute_investigation in-process, at a fixed
+concurrency. Reports RPS, p50/p95/p99 latency, CPU time and peak RSS.
+
+    python benchmarks/loadtest.py analyze --requests 200 --concurrency 16
+    python benchmarks/loadtest.py investigate --requests 40 --concurrency 4 --save-baseline investigate
+    python benchmarks/loadtest.py analyze --compare analyze   # exit status 1 on regression
+
+Baselines are JSON files in benchmarks/baselines/. Only compare runs made on
+the same machine with the same stub settings.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+AGENT_DIR = os.path.join(BACKEND_DIR, "..", "olive_agents_test")
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_llm_server import start_stub_server
+from stub_services import install_whois_stub, load_corpus, start_safe_browsing_stub, start_site_stub, start_whois_stub
+
+# Lower is better for latencies / errors, higher for throughput
+COMPARED = {"rps": 1, "p50_ms": -1, "p95_ms": -1, "p99_ms": -1, "error_rate": -1}
+
+PLAN = {
+    "tools_to_use": ["safe_browsing", "domain_analysis", "content_analysis", "deepfake_detection", "text_analysis"],
+    "reasoning": "Stub plan: run every tool",
+    "priority": "medium",
+    "estimated_api_calls": 4,
+    "deepfake_analysis_warranted": True,
+}
+
+
+def stub_reply(request):
+    """Canned LLM answers, picked by the system prompt of each caller"""
+    messages = request.get("messages") or []
+    system = messages[0]["content"] if messages and messages[0].get("role") == "system" else ""
+    if "investigation orchestrator" in system:
+        return json.dumps(PLAN)
+    if "deepfake detection" in system:
+        return json.dumps({"suspicious": False, "confidence": 40, "reason": "stub", "deepfake_indicators": [],
+                           "likely_ai_generated": False})
+    if "text analysis" in system:
+        return json.dumps({"scam_likelihood": random.choice(["low", "medium", "high"]), "confidence": 70,
+                           "red_flags": [], "social_engineering_tactics": [], "overall_assessment": "stub"})
+    if "final risk assessments" in system:
+        score = random.randint(0, 100)
+        return json.dumps({"overall_risk_score": score, "risk_level": "high" if score > 60 else "low",
+                           "confidence_in_assessment": 75, "primary_risk_factors": [], "secondary_risk_factors": [],
+                           "user_recommendation": "stub", "technical_summary": "stub",
+                           "false_positive_likelihood": 20})
+    # Gemini verdict; mid-band scores ask for Safe Browsing + WHOIS like the real model does
+    probability = round(random.random(), 2)
+    in_band = 0.25 <= probability <= 0.75
+    return json.dumps({"fraud_probability": probability, "confidence_level": 0.8, "justification": "stub verdict",
+                       "call_google_safe_browsing": in_band, "call_whoami": in_band})
+
+
+def start_stubs(args):
+    latency = {"sigma": args.sigma, "error_rate": args.error_rate}
+    _, gemini = start_stub_server(median_ms=args.llm_median_ms, reply=stub_reply, **latency)
+    _, together = start_stub_server(median_ms=args.llm_median_ms, reply=stub_reply, **latency)
+    _, safe_browsing = start_safe_browsing_stub(median_ms=args.service_median_ms, **latency)
+    _, whois_address = start_whois_stub(median_ms=args.service_median_ms, **latency)
+    _, sites = start_site_stub(median_ms=args.site_median_ms, **latency)
+    return {
+        "gemini": gemini,
+        "together": together + "/v1/chat/completions",
+        "safe_browsing": safe_browsing + "/v4/threatMatches:find",
+        "whois": whois_address,
+        "sites": sites,
+    }
+
+
+def target_urls(stubs, count, bust_cache=True):
+    pages = [name for name in load_corpus() if name != "index.html"]
+    urls = []
+    for i in range(count):
+        url = f"{stubs['sites']}/{pages[i % len(pages)]}"
+        urls.append(f"{url}?lt={i}" if bust_cache else url)
+    return urls
+
+
+def proc_usage(pid):
+    """(cpu seconds, peak RSS MB) of a process from /proc; (None, None) elsewhere"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        with open(f"/proc/{pid}/status") as f:
+            peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        return cpu, peak_kb / 1024
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None, None
+
+
+def self_usage():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    peak_mb = usage.ru_maxrss / 1024 if sys.platform != "darwin" else usage.ru_maxrss / 1024 / 1024
+    return usage.ru_utime + usage.ru_stime, peak_mb
+
+
+def drive(call, urls, concurrency):
+    latencies, errors = [], []
+
+    def one(url):
+        start = time.perf_counter()
+        try:
+            call(url)
+        except Exception as e:
+            errors.append(e)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, urls))
+    return latencies, len(errors), time.perf_counter() - start
+
+
+def summarize(mode, args, latencies, errors, elapsed, cpu_s, peak_rss_mb):
+    latencies = sorted(latencies)
+
+    def pct(q):
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "concurrency": args.concurrency,
+        "stubs": {"llm_median_ms": args.llm_median_ms, "service_median_ms": args.service_median_ms,
+                  "site_median_ms": args.site_median_ms, "sigma": args.sigma, "error_rate": args.error_rate},
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "error_rate": round(errors / len(latencies), 4),
+        "cpu_s": round(cpu_s, 2) if cpu_s is not None else None,
+        "peak_rss_mb": round(peak_rss_mb, 1) if peak_rss_mb is not None else None,
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_analyze(args, stubs):
+    import requests
+
+    workdir = tempfile.mkdtemp(prefix="adlumen-loadtest-")
+    env = dict(
+        os.environ,
+        GEMINI_API_KEY="stub",
+        GEMINI_BASE_URL=stubs["gemini"],
+        TOGETHER_API_KEY="stub",
+        TOGETHER_API_URL=stubs["together"],
+        GOOGLE_SAFE_BROWSING_API_KEY="stub",
+        SAFE_BROWSING_API_URL=stubs["safe_browsing"],
+        LOADTEST_WHOIS="%s:%d" % stubs["whois"],
+        VERDICT_STORE="sqlite",
+        SQLITE_PATH=os.path.join(workdir, "verdicts.db"),
+        JOBS_DB=os.path.join(workdir, "jobs.db"),
+        JOB_WORKERS="0",
+        FETCH_JITTER="0,0",
+    )
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "serve-app", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                requests.get(base_url + "/connection", timeout=1)
+                break
+            except requests.RequestException:
+                if server.poll() is not None or time.time() > deadline:
+                    raise RuntimeError("API server did not start (rerun with --verbose)")
+                time.sleep(0.2)
+
+        session = requests.Session()
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+        def call(url):
+            response = session.post(base_url + "/analyze", json={"url": url}, timeout=120)
+            response.raise_for_status()
+
+        cpu_before, _ = proc_usage(server.pid)
+        latencies, errors, elapsed = drive(call, target_urls(stubs, args.requests, not args.allow_cache), args.concurrency)
+        cpu_after, peak = proc_usage(server.pid)
+        cpu = cpu_after - cpu_before if cpu_after is not None else None
+        return summarize("analyze", args, latencies, errors, elapsed, cpu, peak)
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def run_investigate(args, stubs):
+    if AGENT_DIR not in sys.path:
+        sys.path.insert(0, AGENT_DIR)
+    import scam_detection_agent as agent
+
+    install_whois_stub(stubs["whois"])
+    agent.TOGETHER_API_KEY = "stub"
+    agent.TOGETHER_API_URL = stubs["together"]
+    agent.GOOGLE_SAFE_BROWSING_API_KEY = "stub"
+    agent.SAFE_BROWSING_API_URL = stubs["safe_browsing"]
+    # Measure the pipeline, not the 55 RPM budget
+    rate_limiter = agent.RateLimiter(max_requests=10 ** 9)
+
+    def call(url):
+        result = agent.InvestigationOrchestrator(rate_limiter=rate_limiter).execute_investigation(url)
+        if result["final_assessment"].get("method") != "ai_powered":
+            raise RuntimeError("final assessment fell back")
+
+    cpu_before, _ = self_usage()
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+        latencies, errors, elapsed = drive(call, target_urls(stubs, args.requests), args.concurrency)
+    cpu_after, peak = self_usage()
+    return summarize("investigate", args, latencies, errors, elapsed, cpu_after - cpu_before, peak)
+
+
+def compare(result, baseline, tolerance):
+    """Print deltas against a baseline; True if any metric regressed beyond tolerance"""
+    regressed = False
+    print(f"\n{'metric':>12} {'baseline':>10} {'current':>10} {'change':>8}")
+    for metric, direction in COMPARED.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+        worse = change * direction < -tolerance if metric != "error_rate" else new > old + 0.01
+        regressed |= worse
+        print(f"{metric:>12} {old:>10} {new:>10} {change:>+8.1%}{'  REGRESSION' if worse else ''}")
+    return regressed
+
+
+def serve_app(port):
+    """Child process entry: route WHOIS to the stub, then run the API"""
+    import uvicorn
+
+    if os.environ.get("LOADTEST_WHOIS"):
+        host, whois_port = os.environ["LOADTEST_WHOIS"].rsplit(":", 1)
+        install_whois_stub((host, int(whois_port)))
+    uvicorn.run("app:app", host="127.0.0.1", port=port, log_level="warning")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end load test against local stubs")
+    parser.add_argument("mode", choices=["analyze", "investigate", "serve-app"])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-median-ms", type=float, default=400)
+    parser.add_argument("--service-median-ms", type=float, default=80, help="Safe Browsing and WHOIS stubs")
+    parser.add_argument("--site-median-ms", type=float, default=120)
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of stub latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--allow-cache", action="store_true", help="repeat URLs so /analyze can hit its cache")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME", help="compare with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--port", type=int, default=8000, help="serve-app only")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.mode == "serve-app":
+        serve_app(args.port)
+        return 0
+
+    stubs = start_stubs(args)
+    result = (run_analyze if args.mode == "analyze" else run_investigate)(args, stubs)
+    print(json.dumps(result, indent=2))
+
+    status = 0
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            status = int(compare(result, json.load(f), args.tolerance))
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline {path}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Micro-benchmarks for the CPU-bound hot paths of a scan.
+
+Times each case per corpus page (see micro_corpus.py) with GC disabled, the
+median of several rounds, then runs it once more under tracemalloc for peak
+and retained memory. Console output from the code under test is discarded.
+
+    python benchmarks/micro_bench.py
+    python benchmarks/micro_bench.py --only parse,get_text --pages median --save-baseline main
+    python benchmarks/micro_bench.py --compare main   # exit status 1 on regression
+
+Cases from the investigation agent need its dependencies (python-whois,
+Pillow); they are reported as skipped when it can't be imported.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+AGENT_DIR = os.path.join(BACKEND_DIR, "..", "olive_agents_test")
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bs4 import BeautifulSoup
+
+from content_compactor import compact_page
+from final_agent import average_score, clean_json_response, parse_batch_response
+from micro_corpus import BASE_URL, CORPUS_VERSION, build_corpus, corpus_digest
+
+MIN_ROUND_SECONDS = 0.2
+ROUNDS = 5
+
+VERDICT = '{"fraud_probability": 0.42, "confidence_level": 0.8, "justification": "Login form posts to another domain.", "call_google_safe_browsing": true, "call_whoami": false}'
+LLM_REPLIES = [
+    VERDICT,
+    "```json\n" + VERDICT + "\n```",
+    "\n```\n" + VERDICT + "\n```\n",
+]
+BATCH_REPLY = "```json\n[" + ", ".join(VERDICT[:-1] + f', "id": "{i}"}}' for i in range(1, 9)) + "]\n```"
+DOMAINS = [
+    f"{prefix}{brand}{suffix}.{tld}"
+    for prefix in ("", "secure-", "login.", "my")
+    for brand in ("paypal", "bakery", "amazon", "riverside", "netflix")
+    for suffix in ("", "-verify", "-support", "online")
+    for tld in ("com", "net", "xyz")
+]
+
+
+def _agent():
+    if AGENT_DIR not in sys.path:
+        sys.path.insert(0, AGENT_DIR)
+    import scam_detection_agent
+
+    return scam_detection_agent
+
+
+def _stripped_soup(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup(["script", "style"]):
+        script.decompose()
+    return soup
+
+
+def _verdicts():
+    import json as json_module
+
+    for reply in LLM_REPLIES:
+        json_module.loads(clean_json_response(reply))
+    parse_batch_response(BATCH_REPLY)
+
+
+def _scores():
+    for i in range(100):
+        average_score(i / 100, [(0.7, True), (0.0, False), (0.9, True), (0.2, True)])
+
+
+# name -> (setup(html) -> state, run(state), fresh). setup runs outside the timer:
+# before every call when the case mutates its input (fresh), else once per page
+PAGE_CASES = {
+    "parse": (lambda html: html, lambda html: BeautifulSoup(html, "html.parser"), False),
+    "get_text": (_stripped_soup, lambda soup: soup.get_text(), False),
+    "compact_page": (lambda html: BeautifulSoup(html, "html.parser"),
+                     lambda soup: compact_page(soup, token_budget=1500), True),
+    "forms": (lambda html: BeautifulSoup(html, "html.parser"),
+              lambda soup: _agent().ContentAnalysisTool.analyze_forms(soup), False),
+    "links": (lambda html: BeautifulSoup(html, "html.parser"),
+              lambda soup: _agent().ContentAnalysisTool.analyze_links(soup, BASE_URL + "/"), False),
+    "text_patterns": (lambda html: _stripped_soup(html).get_text()[:3000],
+                      lambda text: _agent().TEXT_PATTERN_MATCHER.find_first(text), False),
+}
+
+# Page-independent cases
+GLOBAL_CASES = {
+    "domain_keywords": lambda: [_agent().DOMAIN_KEYWORD_MATCHER.find_first(domain) for domain in DOMAINS],
+    "json_cleanup": _verdicts,
+    "average_score": _scores,
+}
+
+
+def time_case(setup, run, fresh):
+    """Median seconds per call over ROUNDS rounds of at least MIN_ROUND_SECONDS"""
+    state = None if fresh else setup()
+    per_call = []
+    for _ in range(ROUNDS):
+        gc.collect()
+        gc.disable()
+        try:
+            calls, elapsed = 0, 0.0
+            while elapsed < MIN_ROUND_SECONDS or calls < 3:
+                if fresh:
+                    state = setup()
+                start = time.perf_counter()
+                run(state)
+                elapsed += time.perf_counter() - start
+                calls += 1
+        finally:
+            gc.enable()
+        per_call.append(elapsed / calls)
+    return statistics.median(per_call), min(per_call)
+
+
+def allocations(setup, run):
+    """(peak KB, retained KB) for one call under tracemalloc, excluding setup"""
+    state = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0)
+    return round((peak - base) / 1024, 1), round(retained / 1024, 1)
+
+
+def measure(setup, run, fresh):
+    try:
+        median, best = time_case(setup, run, fresh)
+        peak_kb, retained_kb = allocations(setup, run)
+    except ImportError as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    return {"median_ms": round(median * 1000, 4), "min_ms": round(best * 1000, 4),
+            "peak_kb": peak_kb, "retained_kb": retained_kb}
+
+
+def run_suite(only=None, pages=None):
+    corpus = build_corpus()
+    if pages:
+        corpus = {name: html for name, html in corpus.items() if name in pages}
+    results = {}
+    for case, (setup, run, fresh) in PAGE_CASES.items():
+        if only and case not in only:
+            continue
+        for page, html in corpus.items():
+            results[f"{case}/{page}"] = measure(lambda html=html: setup(html), run, fresh)
+    for case, run in GLOBAL_CASES.items():
+        if only and case not in only:
+            continue
+        results[case] = measure(lambda: None, lambda _: run(), False)
+    return {
+        "corpus_version": CORPUS_VERSION,
+        "corpus_digest": corpus_digest(build_corpus()),
+        "python": sys.version.split()[0],
+        "page_bytes": {name: len(html.encode("utf-8")) for name, html in corpus.items()},
+        "results": results,
+    }
+
+
+def print_results(report):
+    print(f"corpus v{report['corpus_version']} ({report['corpus_digest']}), Python {report['python']}")
+    print(f"{'case':44} {'median ms':>11} {'min ms':>10} {'peak KB':>10} {'kept KB':>10}")
+    for name, row in report["results"].items():
+        if "median_ms" in row:
+            print(f"{name:44} {row['median_ms']:>11.3f} {row['min_ms']:>10.3f} {row['peak_kb']:>10.1f} "
+                  f"{row['retained_kb']:>10.1f}")
+        else:
+            print(f"{name:44} {row.get('skipped') or row.get('error')}")
+
+
+def compare(report, baseline, tolerance):
+    """True if any case got slower (median) or allocates more (peak) beyond tolerance"""
+    if (baseline["corpus_version"], baseline["corpus_digest"]) != (report["corpus_version"], report["corpus_digest"]):
+        raise SystemExit("Baseline was recorded on a different corpus; re-record it")
+    regressed = False
+    print(f"\n{'case':44} {'time':>9} {'peak':>9}")
+    for name, row in report["results"].items():
+        old = baseline["results"].get(name)
+        if not old or "median_ms" not in old or "median_ms" not in row:
+            continue
+        time_change = row["median_ms"] / old["median_ms"] - 1 if old["median_ms"] else 0.0
+        peak_change = row["peak_kb"] / old["peak_kb"] - 1 if old["peak_kb"] else 0.0
+        worse = time_change > tolerance or peak_change > tolerance
+        regressed |= worse
+        print(f"{name:44} {time_change:>+9.1%} {peak_change:>+9.1%}{'  REGRESSION' if worse else ''}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU micro-benchmarks over the versioned page corpus")
+    parser.add_argument("--only", help="comma-separated case names")
+    parser.add_argument("--pages", help="comma-separated corpus page names")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    only = set(args.only.split(",")) if args.only else None
+    pages = set(args.pages.split(",")) if args.pages else None
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report = run_suite(only, pages)
+    print_results(report)
+
+    status = 0
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"micro-{args.compare}.json")) as f:
+            status = int(compare(report, json.load(f), args.tolerance))
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"micro-{args.save_baseline}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline {path}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
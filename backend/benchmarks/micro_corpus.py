@@ -0,0 +1,137 @@
+"""Versioned page corpus for the CPU micro-benchmarks.
+
+Pages are generated from a fixed seed so the corpus is identical on every
+machine without committing megabytes of HTML. Bump CORPUS_VERSION whenever a
+generator changes: micro_bench.py refuses to compare results across versions.
+
+- small: a hand-written shop page from corpus/sites (~3 KB)
+- median: a news-style page around the median HTML size of the web (~80 KB)
+- pathological_*: inputs that stress one extractor each
+"""
+import hashlib
+import os
+import random
+
+CORPUS_VERSION = 1
+
+SITES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "sites")
+BASE_URL = "https://bench.test"
+
+WORDS = (
+    "the council said project would account update review secure payment street library season market "
+    "report city local verify new plan data service team community customer offer limited school"
+).split()
+
+SCAM_PHRASES = [
+    "act now", "limited time", "account suspended", "verify your account", "click here",
+    "urgent action required", "congratulations you have won", "guaranteed return",
+]
+
+
+def _sentence(rng, words=14):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def small_page():
+    with open(os.path.join(SITES_DIR, "bakery-shop.html"), encoding="utf-8") as f:
+        return f.read().replace("{{BASE_URL}}", BASE_URL)
+
+
+def median_page(rng):
+    nav = "".join(f'<li><a href="{BASE_URL}/section/{i}">Section {i}</a></li>' for i in range(60))
+    scripts = "".join(
+        f"<script>window.cfg{i} = {{id: {i}, flags: [{', '.join(str(rng.randint(0, 9)) for _ in range(40))}]}};</script>"
+        for i in range(25)
+    )
+    article = "".join(
+        f"<p>{' '.join(_sentence(rng) for _ in range(4))} <a href=\"{BASE_URL}/story/{i}\">more</a></p>"
+        for i in range(120)
+    )
+    related = "".join(
+        f'<div class="card"><a href="https://partner{i % 7}.test/p/{i}"><img src="{BASE_URL}/img/{i}.jpg" alt="Story {i}">'
+        f"<span>{_sentence(rng, 8)}</span></a></div>"
+        for i in range(80)
+    )
+    return (
+        f"<!DOCTYPE html><html><head><title>Riverside Gazette - {_sentence(rng, 6)}</title>"
+        f'<meta name="description" content="{_sentence(rng)}"><style>{"p{margin:0} " * 200}</style>{scripts}</head>'
+        f"<body><header><nav><ul>{nav}</ul></nav>"
+        f'<form action="/search"><input type="search" name="q"><button>Search</button></form></header>'
+        f"<main><article><h1>{_sentence(rng, 8)}</h1>{article}</article></main>"
+        f'<aside>{related}</aside><footer><form action="/newsletter" method="post">'
+        f'<input type="email" name="email"><button>Sign up</button></form>'
+        f'<a href="mailto:news@gazette.test">news@gazette.test</a></footer></body></html>'
+    )
+
+
+def deep_nesting_page(depth=800):
+    """Deeply nested divs (generated markup, ad iframes gone wrong)"""
+    return (
+        "<html><head><title>Nested</title></head><body>"
+        + "<div><span>level</span>" * depth
+        + "<p>Verify your account to continue.</p>"
+        + "</div>" * depth
+        + "</body></html>"
+    )
+
+
+def many_links_and_forms_page(rng, links=20000, forms=400, inputs=20):
+    parts = ["<html><head><title>Link farm</title></head><body>"]
+    for i in range(links):
+        host = BASE_URL if i % 3 else f"https://ext{i % 97}.test"
+        parts.append(f'<a href="{host}/p/{i}">{rng.choice(WORDS)}</a> ')
+    for i in range(forms):
+        fields = "".join(
+            f'<input type="{rng.choice(["text", "email", "password", "hidden"])}" name="f{i}_{j}">'
+            for j in range(inputs)
+        )
+        parts.append(f'<form action="/submit/{i}" method="post">{fields}<button>Go</button></form>')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def huge_text_page(rng, paragraphs=6000):
+    """~2 MB of visible text with scam phrases sprinkled through it"""
+    body = []
+    for i in range(paragraphs):
+        text = _sentence(rng, 40)
+        if i % 50 == 0:
+            text += " " + rng.choice(SCAM_PHRASES).upper() + "!"
+        body.append(f"<p>{text}</p>")
+    return f"<html><head><title>Wall of text</title></head><body>{''.join(body)}</body></html>"
+
+
+def malformed_page(rng, blocks=3000):
+    """Unclosed tags, stray closers and broken attributes the parser must repair"""
+    parts = ["<html><body>"]
+    for i in range(blocks):
+        parts.append(rng.choice([
+            f"<div class=x{i}><p>{_sentence(rng, 6)}",
+            f"<a href='{BASE_URL}/{i}>broken quote</a>",
+            "</span></td></tr>",
+            f"<table><tr><td>{i}<td>cell",
+            f"<form><input name=a{i} type=password><select><option>{i}",
+            "<b><i>mis</b>nested</i>",
+        ]))
+    return "".join(parts)
+
+
+def build_corpus():
+    """{name: html}, identical for a given CORPUS_VERSION"""
+    rng = random.Random(f"adlumen-micro-corpus-v{CORPUS_VERSION}")
+    return {
+        "small": small_page(),
+        "median": median_page(rng),
+        "pathological_nesting": deep_nesting_page(),
+        "pathological_links_forms": many_links_and_forms_page(rng),
+        "pathological_text": huge_text_page(rng),
+        "pathological_malformed": malformed_page(rng),
+    }
+
+
+def corpus_digest(corpus):
+    digest = hashlib.sha256()
+    for name in sorted(corpus):
+        digest.update(name.encode("utf-8"))
+        digest.update(corpus[name].encode("utf-8"))
+    return digest.hexdigest()[:16]
@@ -0,0 +1,116 @@
+"""Local stand-in for LLM APIs, for exercising providers without live keys.
+
+Speaks the OpenAI / Together.ai chat-completions format and the Gemini REST
+``generateContent`` / ``cachedContents`` endpoints, with a configurable
+log-normal latency distribution and error rate.
+
+    python benchmarks/stub_llm_server.py --port 8101 --median-ms 300 --sigma 0.8
+"""
+import argparse
+import json
+import math
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+DEFAULT_VERDICT = {
+    "fraud_probability": 0.12,
+    "confidence_level": 0.85,
+    "justification": "Stub verdict: no fraud indicators in the supplied content."
+}
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    server_version = "StubLLM/1.0"
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        config = self.server.config
+
+        time.sleep(config.sample_latency())
+        if random.random() < config.error_rate:
+            self._send_json(503, {"error": {"message": "stub overloaded"}})
+            return
+
+        prompt_tokens = len(json.dumps(request)) // 4
+        reply = config.reply(request)
+        completion_tokens = len(reply) // 4
+
+        if self.path.endswith("/chat/completions"):
+            self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+        elif re.search(r"/models/[^/]+:generateContent$", self.path):
+            self._send_json(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": reply}]}, "finishReason": "STOP"}],
+                "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": completion_tokens,
+                                  "totalTokenCount": prompt_tokens + completion_tokens},
+            })
+        elif self.path.endswith("/cachedContents"):
+            self._send_json(200, {"name": "cachedContents/stub", "model": request.get("model")})
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+
+class StubConfig:
+    def __init__(self, median_ms=300, sigma=0.5, error_rate=0.0, reply=None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self._reply = reply
+
+    def sample_latency(self):
+        return random.lognormvariate(math.log(self.median_ms / 1000), self.sigma) if self.median_ms else 0
+
+    def reply(self, request):
+        if self._reply:
+            return self._reply(request)
+        return json.dumps(DEFAULT_VERDICT)
+
+
+def start_stub_server(port=0, **config):
+    """Start a stub in a daemon thread. Returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubLLMHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(**config)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--median-ms", type=float, default=300)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = start_stub_server(args.port, median_ms=args.median_ms, sigma=args.sigma, error_rate=args.error_rate)
+    print(f"Stub LLM listening on {url} (chat: {url}/v1/chat/completions)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
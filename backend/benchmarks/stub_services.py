@@ -0,0 +1,177 @@
+"""Local stand-ins for the non-LLM services a scan touches.
+
+- Safe Browsing: ``POST /v4/threatMatches:find``, flags a configurable share of URLs
+- target sites: serves the static HTML corpus in benchmarks/corpus/sites (plus a
+  tiny PNG for every /img/ path); ``{{BASE_URL}}`` in a page is replaced with the
+  stub's own address so absolute links and images resolve locally
+- WHOIS: the plain-text port-43 protocol on any port, with install_whois_stub()
+  routing ``whois.whois`` to it
+
+Latency and error rates use the same log-normal StubConfig as stub_llm_server.
+"""
+import base64
+import json
+import os
+import random
+import socket
+import socketserver
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from stub_llm_server import StubConfig
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "sites")
+
+# 1x1 transparent PNG
+PIXEL_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_or_fail(self):
+        """Sleep for a sampled latency; True if this request should fail"""
+        config = self.server.config
+        time.sleep(config.sample_latency())
+        return random.random() < config.error_rate
+
+
+class SafeBrowsingHandler(_QuietHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self._delay_or_fail():
+            self._send(503, b'{"error": {"code": 503}}', "application/json")
+            return
+        matches = []
+        for entry in request.get("threatInfo", {}).get("threatEntries", []):
+            if random.random() < self.server.threat_rate:
+                matches.append({
+                    "threatType": "SOCIAL_ENGINEERING",
+                    "platformType": "ANY_PLATFORM",
+                    "threat": {"url": entry.get("url")},
+                })
+        self._send(200, json.dumps({"matches": matches} if matches else {}).encode("utf-8"), "application/json")
+
+
+class SiteHandler(_QuietHandler):
+    def do_GET(self):
+        if self._delay_or_fail():
+            self._send(503, b"Service Unavailable", "text/plain")
+            return
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/img/"):
+            self._send(200, PIXEL_PNG, "image/png")
+            return
+        page = self.server.pages.get(path.strip("/") or "index.html")
+        if page is None:
+            self._send(404, b"Not Found", "text/plain")
+            return
+        self._send(200, page.replace("{{BASE_URL}}", self.server.base_url).encode("utf-8"), "text/html; charset=utf-8")
+
+
+class WhoisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        domain = self.rfile.readline().decode("utf-8", "replace").strip()
+        config = self.server.config
+        time.sleep(config.sample_latency())
+        if random.random() < config.error_rate:
+            return  # dropped connection, like an overloaded WHOIS server
+        # Deterministic per domain so repeated lookups parse the same way
+        rng = random.Random(domain)
+        created = datetime(2024, 1, 1) - timedelta(days=rng.choice([5, 90, 400, 4000]))
+        text = (
+            f"Domain Name: {domain.upper()}\n"
+            f"Registrar: {rng.choice(['Stub Registrar, Inc.', 'NameCheap, Inc.', 'MarkMonitor Inc.'])}\n"
+            f"Creation Date: {created:%Y-%m-%dT%H:%M:%SZ}\n"
+            f"Registry Expiry Date: {created + timedelta(days=rng.choice([365, 3650])):%Y-%m-%dT%H:%M:%SZ}\n"
+            f"Name Server: NS1.STUB.TEST\n"
+        )
+        self.wfile.write(text.encode("utf-8"))
+
+
+class _WhoisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _serve(server):
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def load_corpus(directory=CORPUS_DIR):
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def start_safe_browsing_stub(port=0, threat_rate=0.1, **config):
+    """Returns (server, base_url); the API URL is base_url + '/v4/threatMatches:find'"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), SafeBrowsingHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(**config)
+    server.threat_rate = threat_rate
+    _serve(server)
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_site_stub(port=0, pages=None, **config):
+    """Serve the HTML corpus. Returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), SiteHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(**config)
+    server.pages = pages if pages is not None else load_corpus()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    _serve(server)
+    return server, server.base_url
+
+
+def start_whois_stub(port=0, **config):
+    """Returns (server, (host, port))"""
+    server = _WhoisServer(("127.0.0.1", port), WhoisHandler)
+    server.config = StubConfig(**config)
+    _serve(server)
+    return server, server.server_address
+
+
+def install_whois_stub(address):
+    """Route python-whois lookups in this process to a stub WHOIS server.
+
+    python-whois always connects to port 43, so whois.whois is replaced with a
+    lookup against ``address`` that still goes through the library's parser.
+    """
+    import whois
+    from whois.parser import WhoisEntry
+
+    def stub_whois(url, *args, **kwargs):
+        domain = url.split("://")[-1].split("/")[0].split(":")[0]
+        with socket.create_connection(tuple(address), timeout=10) as conn:
+            conn.sendall(domain.encode("utf-8") + b"\r\n")
+            chunks = []
+            while True:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        text = b"".join(chunks).decode("utf-8", "replace")
+        if not text:
+            raise ConnectionError(f"WHOIS stub returned nothing for {domain}")
+        return WhoisEntry.load(domain, text)
+
+    whois.whois = stub_whois
@@ -0,0 +1,313 @@
+"""Known-bad URL and domain blocklist compiled from local threat-feed dumps.
+
+``python blocklist.py compile feeds/*.txt -o blocklist.db`` turns feed files
+into one SQLite snapshot holding a Bloom filter plus the exact entries. Feeds
+may be plain lists of URLs or hostnames, CSV exports (the first field that
+looks like a URL is used, e.g. PhishTank) or hosts files ("0.0.0.0 evil.test").
+
+- URL entries match the same canonical URL (scheme and tracking params ignored)
+- hostname entries match that host and all of its subdomains
+
+A lookup probes the in-memory Bloom filter first, so the vast majority of
+URLs (not listed) are cleared in a few microseconds without touching disk;
+only filter hits are confirmed against the exact entries in SQLite, which
+removes false positives.
+
+Snapshots are replaced by rename. The service points BLOCKLIST_FILE at the
+snapshot and a BlocklistReloader thread swaps in a new one when the file
+changes (every BLOCKLIST_RELOAD_INTERVAL seconds, default 30), without a
+restart; lookups in flight keep using the snapshot they started with.
+"""
+import argparse
+import glob
+import hashlib
+import math
+import os
+import sqlite3
+import sys
+import time
+from threading import Event, Lock, Thread
+
+from event_log import log_event
+from url_utils import canonicalize_url, extract_host
+
+SCHEMA = """
+CREATE TABLE entries (key TEXT PRIMARY KEY, source TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE meta (name TEXT PRIMARY KEY, value BLOB);
+"""
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter with double hashing over one BLAKE2b digest"""
+
+    def __init__(self, capacity, error_rate=0.001, size=None, hashes=None, bits=None):
+        capacity = max(capacity, 1)
+        self.size = size or max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def entry_key(entry):
+    """Lookup key for one feed entry: 'url:<canonical url without scheme>' or 'host:<hostname>'"""
+    entry = entry.strip().strip("\"'")
+    if "://" in entry or "/" in entry:
+        canonical = canonicalize_url(entry)
+        return "url:" + canonical.split("://", 1)[1]
+    host = entry.lstrip("*.").rstrip(".").lower()
+    return "host:" + host if "." in host and " " not in host else None
+
+
+def url_keys(url):
+    """Keys that would block ``url``: its canonical form and every parent host"""
+    keys = ["url:" + canonicalize_url(url).split("://", 1)[1]]
+    labels = extract_host(url).split(".")
+    keys.extend("host:" + ".".join(labels[i:]) for i in range(len(labels) - 1))
+    return keys
+
+
+def read_feed(path):
+    """Raw entries from one feed file"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("#", "!")):
+                continue
+            fields = [field.strip().strip("\"'") for field in line.split(",")]
+            urls = [field for field in fields if "://" in field]
+            if urls:
+                yield urls[0]
+            elif len(fields) == 1:
+                yield fields[0].split()[-1]  # plain entry, or hosts-file "0.0.0.0 evil.test"
+            elif not fields[0].isdigit() or "." in fields[-1]:
+                yield fields[-1]  # "rank,domain" style
+
+
+def compile_blocklist(feed_paths, path, error_rate=0.001):
+    """Compile feeds into a snapshot at ``path``. Returns the number of distinct entries"""
+    entries = {}
+    for feed_path in feed_paths:
+        source = os.path.basename(feed_path)
+        for entry in read_feed(feed_path):
+            try:
+                key = entry_key(entry)
+            except ValueError:
+                continue  # unparseable URL (bad port, ...)
+            if key and key not in entries:
+                entries[key] = source
+
+    bloom = BloomFilter(len(entries), error_rate)
+    for key in entries:
+        bloom.add(key)
+
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO entries (key, source) VALUES (?, ?)", sorted(entries.items()))
+        conn.executemany("INSERT INTO meta (name, value) VALUES (?, ?)", [
+            ("bloom_bits", bytes(bloom.bits)),
+            ("bloom_size", bloom.size),
+            ("bloom_hashes", bloom.hashes),
+            ("count", len(entries)),
+            ("compiled_at", time.time()),
+            ("sources", ",".join(sorted({os.path.basename(p) for p in feed_paths}))),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+class Blocklist:
+    """Read-only view of one compiled snapshot"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = Lock()
+        meta = dict(self._conn.execute("SELECT name, value FROM meta"))
+        self.bloom = BloomFilter(0, size=meta["bloom_size"], hashes=meta["bloom_hashes"], bits=meta["bloom_bits"])
+        self.count = meta["count"]
+        self.compiled_at = meta["compiled_at"]
+        self.sources = meta["sources"]
+        self.lookups = 0
+        self.filter_hits = 0
+        self.matches = 0
+
+    def lookup(self, url):
+        """{"key", "source"} for the entry blocking ``url``, or None"""
+        self.lookups += 1
+        try:
+            candidates = [key for key in url_keys(url) if key in self.bloom]
+        except ValueError:
+            return None
+        if not candidates:
+            return None
+        self.filter_hits += 1
+        placeholders = ",".join("?" * len(candidates))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT key, source FROM entries WHERE key IN ({placeholders}) LIMIT 1", candidates
+            ).fetchone()
+        if row is None:
+            return None
+        self.matches += 1
+        return {"key": row[0], "source": row[1]}
+
+    def keys(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM entries").fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "entries": self.count,
+            "sources": self.sources,
+            "compiled_at": self.compiled_at,
+            "filter_bytes": len(self.bloom.bits),
+            "lookups": self.lookups,
+            "filter_hits": self.filter_hits,
+            "matches": self.matches,
+            "false_positives": self.filter_hits - self.matches,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_blocklist = None
+_blocklist_mtime = None
+_swap_lock = Lock()
+
+
+def reload_blocklist(path=None):
+    """Load the snapshot at ``path`` (default BLOCKLIST_FILE) and swap it in if it changed.
+
+    Returns the active Blocklist, or None when no snapshot is configured.
+    """
+    global _blocklist, _blocklist_mtime
+    path = path or os.environ.get("BLOCKLIST_FILE")
+    if not path or not os.path.exists(path):
+        return _blocklist
+    with _swap_lock:
+        mtime = os.stat(path).st_mtime_ns
+        if _blocklist is not None and (_blocklist.path, _blocklist_mtime) == (path, mtime):
+            return _blocklist
+        blocklist = Blocklist(path)
+        # Readers grab the module reference once per lookup, so the swap is
+        # atomic; the old connection closes when its last lookup drops it
+        _blocklist, _blocklist_mtime = blocklist, mtime
+    log_event("blocklist.loaded", path=path, entries=blocklist.count, sources=blocklist.sources)
+    return blocklist
+
+
+def get_blocklist():
+    """Process-wide snapshot, loaded on first use; None when BLOCKLIST_FILE isn't set"""
+    if _blocklist is None:
+        return reload_blocklist()
+    return _blocklist
+
+
+def check_url(url):
+    """Blocklist match for ``url``, or None (also None when no blocklist is loaded)"""
+    blocklist = get_blocklist()
+    return blocklist.lookup(url) if blocklist is not None else None
+
+
+class BlocklistReloader:
+    """Background thread that swaps in a recompiled snapshot"""
+
+    def __init__(self, path=None, interval=None, on_reload=None):
+        self.path = path or os.environ.get("BLOCKLIST_FILE")
+        self.interval = interval or float(os.environ.get("BLOCKLIST_RELOAD_INTERVAL", "30"))
+        self.on_reload = on_reload  # called with the new Blocklist after each swap
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="blocklist-reloader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                previous = _blocklist
+                blocklist = reload_blocklist(self.path)
+                if blocklist is not previous and blocklist is not None and self.on_reload:
+                    self.on_reload(blocklist)
+            except Exception as e:
+                log_event("blocklist.reload_failed", level="error", path=self.path, error=str(e))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def _expand(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(os.path.join(pattern, name) for name in os.listdir(pattern)))
+        else:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return [path for path in paths if os.path.isfile(path)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile threat-feed dumps into a blocklist snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = commands.add_parser("compile", help="compile feed files (or directories) into a snapshot")
+    compile_cmd.add_argument("feeds", nargs="+")
+    compile_cmd.add_argument("-o", "--output", default=os.environ.get("BLOCKLIST_FILE", "blocklist.db"))
+    compile_cmd.add_argument("--error-rate", type=float, default=0.001, help="Bloom filter false-positive rate")
+    compile_cmd.add_argument("--watch", type=float, metavar="SECONDS",
+                             help="keep running and recompile whenever a feed changes")
+    check = commands.add_parser("check", help="look up URLs in a snapshot")
+    check.add_argument("snapshot")
+    check.add_argument("urls", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        blocklist = Blocklist(args.snapshot)
+        for url in args.urls:
+            match = blocklist.lookup(url)
+            print(f"{url}: " + (f"blocked by {match['key']} ({match['source']})" if match else "not listed"))
+        blocklist.close()
+        return 0
+
+    seen = None
+    while True:
+        feeds = _expand(args.feeds)
+        state = {path: os.stat(path).st_mtime_ns for path in feeds}
+        if state != seen:
+            start = time.perf_counter()
+            count = compile_blocklist(feeds, args.output, args.error_rate)
+            print(f"Compiled {count} entries from {len(feeds)} feeds into {args.output} "
+                  f"in {time.perf_counter() - start:.1f}s")
+            seen = state
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
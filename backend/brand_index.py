@@ -0,0 +1,216 @@
+"""Typosquat and homoglyph detection against an index of protected brand domains.
+
+Each protected domain is reduced to its brand label and then to a confusable
+"skeleton" (homoglyphs, IDN look-alikes, digit swaps and diacritics folded to
+plain ASCII). Skeletons are stored in a hash table for exact look-alike hits and
+in a deletion-neighbourhood index (SymSpell style) for edit-distance-1 typos,
+so a lookup touches a handful of buckets instead of scanning every brand.
+"""
+import os
+import unicodedata
+
+from url_utils import extract_host, registrable_domain, registrable_label
+
+# Single characters that render like an ASCII letter (subset of Unicode TR39)
+CONFUSABLES = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "з": "e", "і": "i", "ї": "i",
+    "ј": "j", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p", "с": "c",
+    "ѕ": "s", "т": "t", "у": "y", "х": "x", "һ": "h", "ԁ": "d", "ԛ": "q",
+    "ԝ": "w", "ӏ": "l", "ь": "b",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v",
+    "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+    # Latin look-alikes
+    "ı": "i", "ɩ": "i", "ł": "l", "ɡ": "g", "ʀ": "r", "ß": "b", "ø": "o",
+    "đ": "d", "ħ": "h",
+    # Digits and symbols
+    "0": "o", "1": "l", "3": "e", "5": "s", "|": "l", "!": "i",
+}
+
+# Multi-character sequences that read as a single letter
+SEQUENCE_CONFUSABLES = [("rn", "m"), ("vv", "w"), ("cl", "d")]
+
+MIN_TYPO_LENGTH = 4  # shorter brand labels produce too many edit-distance hits
+
+DEFAULT_PROTECTED_DOMAINS = [
+    "paypal.com", "apple.com", "microsoft.com", "amazon.com", "google.com",
+    "facebook.com", "instagram.com", "twitter.com", "netflix.com",
+    "spotify.com", "adobe.com", "dropbox.com",
+]
+
+
+def decode_idn(host):
+    """Decode punycode ('xn--') labels back to Unicode"""
+    labels = []
+    for label in host.split("."):
+        if label.startswith("xn--"):
+            try:
+                label = label[4:].encode("ascii").decode("punycode")
+            except (UnicodeError, ValueError):
+                pass
+        labels.append(label)
+    return ".".join(labels)
+
+
+def skeleton(label):
+    """Fold a label to its visual skeleton, e.g. 'pаypa1' (Cyrillic а) -> 'paypal'"""
+    label = unicodedata.normalize("NFKD", label.lower())
+    folded = []
+    for ch in label:
+        if unicodedata.combining(ch):
+            continue
+        folded.append(CONFUSABLES.get(ch, ch))
+    label = "".join(folded)
+    for sequence, replacement in SEQUENCE_CONFUSABLES:
+        label = label.replace(sequence, replacement)
+    return label
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def damerau_levenshtein(a, b, max_distance=2):
+    """Optimal string alignment distance, early-exiting above max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (prev_prev is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], prev_prev[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, current
+    return prev[-1]
+
+
+class BrandIndex:
+    """Index of protected domains for look-alike lookups"""
+
+    def __init__(self, domains=()):
+        self.domains = set()        # protected registrable domains
+        self.brands = []            # brand id -> (label, skeleton, domain)
+        self._by_skeleton = {}      # skeleton -> [brand ids]
+        self._by_delete = {}        # skeleton with one char deleted -> brand id or [ids]
+        for domain in domains:
+            self.add(domain)
+
+    def __len__(self):
+        return len(self.brands)
+
+    def add(self, domain):
+        domain = registrable_domain(domain.strip().lower())
+        if not domain or domain in self.domains:
+            return
+        self.domains.add(domain)
+        label = domain.split(".")[0]
+        brand_skeleton = skeleton(label)
+        brand_id = len(self.brands)
+        self.brands.append((label, brand_skeleton, domain))
+        self._by_skeleton.setdefault(brand_skeleton, []).append(brand_id)
+        if len(brand_skeleton) >= MIN_TYPO_LENGTH:
+            for key in _deletes(brand_skeleton) | {brand_skeleton}:
+                self._add_delete(key, brand_id)
+
+    def _add_delete(self, key, brand_id):
+        # Most keys map to a single brand; only allocate a list on collision
+        existing = self._by_delete.get(key)
+        if existing is None:
+            self._by_delete[key] = brand_id
+        elif isinstance(existing, list):
+            existing.append(brand_id)
+        else:
+            self._by_delete[key] = [existing, brand_id]
+
+    def _delete_candidates(self, key):
+        found = self._by_delete.get(key)
+        if found is None:
+            return ()
+        return found if isinstance(found, list) else (found,)
+
+    def lookup(self, url):
+        """Return look-alike matches for the URL's host, best first"""
+        host = extract_host(url)
+        if not host:
+            return []
+        domain = registrable_domain(host)
+        if domain in self.domains:
+            return []  # the protected domain itself
+
+        unicode_host = decode_idn(host)
+        is_idn = unicode_host != host or not host.isascii()
+        label = registrable_label(unicode_host)
+
+        # Check the brand label itself plus its hyphen-separated parts
+        # ("paypa1-secure-login" -> "paypa1")
+        candidates = [label] + [part for part in label.split("-") if part and part != label]
+
+        matches = {}
+        for candidate in candidates:
+            candidate_skeleton = skeleton(candidate)
+            for brand_id in self._by_skeleton.get(candidate_skeleton, ()):
+                brand_label, _, brand_domain = self.brands[brand_id]
+                if candidate == brand_label:
+                    continue  # same label on another TLD is not a look-alike
+                technique = "idn_homoglyph" if is_idn else "confusable"
+                matches.setdefault(brand_domain, {
+                    "protected_domain": brand_domain,
+                    "matched_label": candidate,
+                    "technique": technique,
+                    "distance": 0,
+                })
+
+            if len(candidate_skeleton) < MIN_TYPO_LENGTH:
+                continue
+            brand_ids = set()
+            for key in _deletes(candidate_skeleton) | {candidate_skeleton}:
+                brand_ids.update(self._delete_candidates(key))
+            for brand_id in brand_ids:
+                brand_label, brand_skeleton, brand_domain = self.brands[brand_id]
+                if brand_domain in matches or candidate == brand_label:
+                    continue
+                distance = damerau_levenshtein(candidate_skeleton, brand_skeleton, max_distance=1)
+                if distance <= 1:
+                    matches[brand_domain] = {
+                        "protected_domain": brand_domain,
+                        "matched_label": candidate,
+                        "technique": "idn_homoglyph" if is_idn else "typo",
+                        "distance": distance,
+                    }
+
+        return sorted(matches.values(), key=lambda m: (m["distance"], m["protected_domain"]))
+
+
+def load_brand_index(path=None):
+    """Build the index from a file of protected domains (one per line) or the defaults"""
+    path = path or os.environ.get("PROTECTED_DOMAINS_FILE")
+    if not path:
+        return BrandIndex(DEFAULT_PROTECTED_DOMAINS)
+    index = BrandIndex()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            # Accept plain lists and Tranco-style "rank,domain" rows
+            if line and not line.startswith("#"):
+                index.add(line.split(",")[-1])
+    return index
+
+
+_brand_index = None
+
+
+def get_brand_index():
+    """Process-wide index, built on first use"""
+    global _brand_index
+    if _brand_index is None:
+        _brand_index = load_brand_index()
+    return _brand_index
@@ -0,0 +1,189 @@
+"""Main-content extraction and token compaction of page text before LLM calls.
+
+Instead of ``soup.get_text()[:N]`` (menus, cookie banners and footers first,
+then an arbitrary cut) the page is reduced to:
+
+1. fraud-relevant elements: forms, calls to action, contact details
+2. the main content, whitespace-collapsed and with repeated lines removed
+
+and packed in that order into a token budget.
+"""
+import re
+
+from bs4 import BeautifulSoup
+
+DEFAULT_TOKEN_BUDGET = 1500
+CHARS_PER_TOKEN = 4  # rough average for English text with Gemini / Llama tokenizers
+
+NOISE_TAGS = ["script", "style", "noscript", "svg", "iframe", "template", "canvas"]
+BOILERPLATE_TAGS = ["nav", "header", "footer", "aside"]
+# Matched against whole class / id tokens ("site-footer", "cookie-banner"), never
+# substrings, so layout wrappers like "has-sidebar" or "main-menu-layout" survive
+BOILERPLATE_HINTS = re.compile(
+    r"(?:site|main|global|top|page)?[-_]?"
+    r"(?:cookies?|consent|gdpr|navbar|nav|navigation|menu|footer|breadcrumbs?|sidebar|"
+    r"newsletter|social|share|sharing|related|advert|ads|promo-bar|skip-link)"
+    r"(?:[-_]?(?:bar|banner|notice|consent|popup|modal|links|container|wrapper|wrap|area|menu|nav|list|box))?",
+    re.IGNORECASE,
+)
+MAIN_SELECTORS = ["main", "article", "[role=main]", "#content", "#main", ".content", ".main"]
+
+CTA_WORDS = re.compile(
+    r"\b(log ?in|sign ?in|sign ?up|verify|confirm|update|pay|claim|download|install|"
+    r"subscribe|buy|order|submit|continue|unlock|call|redeem|withdraw|deposit|register)\b",
+    re.IGNORECASE,
+)
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"(?<![\w/(])[+(]?\d[\d\s().-]{7,}\d(?![\w/])")
+WHITESPACE_RE = re.compile(r"\s+")
+
+MAX_FORMS = 5
+MAX_CTAS = 10
+MAX_CONTACTS = 5
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _clean(text):
+    return WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def _is_boilerplate(element):
+    if element.name in ("html", "body", "main", "article"):
+        return False
+    if element.name in BOILERPLATE_TAGS:
+        return True
+    tokens = list(element.get("class", []) or []) + (element.get("id") or "").split()
+    return any(BOILERPLATE_HINTS.fullmatch(token) for token in tokens)
+
+
+def _describe_forms(soup):
+    forms = []
+    for form in soup.find_all("form")[:MAX_FORMS]:
+        fields = []
+        for inp in form.find_all(["input", "select", "textarea"]):
+            # An <input> without a type attribute is a text field
+            input_type = (inp.get("type") or ("text" if inp.name == "input" else inp.name)).lower()
+            if input_type == "hidden":
+                continue
+            name = inp.get("name") or inp.get("placeholder") or inp.get("aria-label") or ""
+            fields.append(f"{_clean(name)}({input_type})" if name else input_type)
+        action = form.get("action") or "(same page)"
+        method = (form.get("method") or "get").lower()
+        forms.append(f"- action={action} method={method} fields: {', '.join(fields) or 'none'}")
+    return forms
+
+
+def _describe_ctas(soup):
+    ctas, seen = [], set()
+    for element in soup.find_all(["button", "a", "input"]):
+        if element.name == "input":
+            if (element.get("type") or "").lower() not in ("submit", "button"):
+                continue
+            text = _clean(element.get("value"))
+        else:
+            text = _clean(element.get_text(" "))
+        if not text or len(text) > 60:
+            continue
+        if element.name == "a" and not CTA_WORDS.search(text):
+            continue
+        href = element.get("href") if element.name == "a" else None
+        entry = f"{text} -> {href}" if href and href.startswith("http") else text
+        if entry.lower() in seen:
+            continue
+        seen.add(entry.lower())
+        ctas.append(entry)
+        if len(ctas) >= MAX_CTAS:
+            break
+    return ctas
+
+
+def _describe_contacts(soup):
+    text = soup.get_text(" ")
+    emails = list(dict.fromkeys(EMAIL_RE.findall(text)))[:MAX_CONTACTS]
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        if href.startswith("mailto:"):
+            emails.append(href[7:].split("?")[0])
+    phones = [_clean(p) for p in PHONE_RE.findall(text)]
+    for link in soup.find_all("a", href=True):
+        if link["href"].startswith("tel:"):
+            phones.append(link["href"][4:])
+    emails = list(dict.fromkeys(emails))[:MAX_CONTACTS]
+    phones = list(dict.fromkeys(phones))[:MAX_CONTACTS]
+    contacts = []
+    if emails:
+        contacts.append("emails: " + ", ".join(emails))
+    if phones:
+        contacts.append("phones: " + ", ".join(phones))
+    return contacts
+
+
+def _main_content_lines(soup):
+    root = None
+    for selector in MAIN_SELECTORS:
+        root = soup.select_one(selector)
+        if root is not None and len(_clean(root.get_text(" "))) > 200:
+            break
+        root = None
+    root = root or soup.body or soup
+
+    # Boilerplate inside the root goes; the root and its ancestors never do
+    keep = {id(root)} | {id(parent) for parent in root.parents}
+    for element in soup.find_all(True):
+        if element.parent is not None and id(element) not in keep and _is_boilerplate(element):
+            element.extract()
+
+    lines, seen = [], set()
+    for text in root.stripped_strings:
+        line = _clean(text)
+        if len(line) < 2:
+            continue
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return lines
+
+
+def compact_page(page, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Compact HTML (string or BeautifulSoup) into LLM-ready text within token_budget.
+
+    A BeautifulSoup object passed in is modified in place.
+    """
+    soup = BeautifulSoup(page, "html.parser") if isinstance(page, str) else page
+    for element in soup(NOISE_TAGS):
+        element.decompose()
+
+    title = _clean(soup.title.get_text()) if soup.title else ""
+    # Contact details often live in the footer, so collect them before stripping it
+    sections = [
+        ("TITLE", [title] if title else []),
+        ("FORMS", _describe_forms(soup)),
+        ("CALLS TO ACTION", _describe_ctas(soup)),
+        ("CONTACT", _describe_contacts(soup)),
+    ]
+    sections.append(("CONTENT", _main_content_lines(soup)))
+
+    budget = token_budget * CHARS_PER_TOKEN
+    parts = []
+    for heading, lines in sections:
+        if not lines or budget <= len(heading) + 3:
+            continue
+        header = f"[{heading}]"
+        parts.append(header)
+        budget -= len(header) + 1
+        for line in lines:
+            if len(line) + 1 <= budget:
+                parts.append(line)
+                budget -= len(line) + 1
+            else:
+                if budget > 40:
+                    # Cut the last line at a word boundary rather than mid-word
+                    parts.append(line[:budget - 1].rsplit(" ", 1)[0])
+                budget = 0
+                break
+    return "\n".join(parts)
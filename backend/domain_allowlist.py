@@ -0,0 +1,175 @@
+"""Read-only allowlist of top-ranked domains, memory-mapped and shared by workers.
+
+The snapshot file is a sorted array of 64-bit BLAKE2b hashes of registrable
+domains (a Tranco-style top-N list, one domain or "rank,domain" per line).
+Registrable domains come from the Public Suffix List, private section
+included, so "yahoo.co.id" stays "yahoo.co.id" and a bare public suffix
+("co.id", "github.io") is never stored or matched:
+
+    8 bytes   magic b"ADLALW01"
+    8 bytes   entry count (little-endian uint64)
+    8 * count sorted hashes (little-endian uint64)
+
+Every worker process maps the same file read-only, so the kernel keeps one
+copy in the page cache however many workers there are, and a lookup is a
+binary search over the mapping. A million domains take 8 MB; the chance of a
+false hit from a hash collision is around 1e-13 per lookup.
+
+Hosts on platforms that serve user content (github.io, blogspot.com,
+sites.google.com, link shorteners, ...) are never allowlisted, even when the
+platform's own domain is in the ranking: phishing pages live there too.
+
+    python domain_allowlist.py build top-1m.csv allowlist.bin --top 100000
+    python domain_allowlist.py check allowlist.bin https://en.wikipedia.org/wiki/Bread
+"""
+import argparse
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from url_utils import extract_host, public_suffix_domain
+
+MAGIC = b"ADLALW01"
+HEADER = struct.Struct("<8sQ")
+
+# Hosts (and their subdomains) where anyone can publish: a top ranking for the
+# platform says nothing about the page. Extend with ALLOWLIST_USER_CONTENT.
+USER_CONTENT_DOMAINS = {
+    # static and app hosting
+    "github.io", "gitlab.io", "pages.dev", "workers.dev", "vercel.app", "netlify.app",
+    "herokuapp.com", "firebaseapp.com", "web.app", "appspot.com", "azurewebsites.net",
+    "cloudfront.net", "webflow.io", "glitch.me", "repl.co", "replit.app", "onrender.com",
+    "fly.dev", "ngrok.io", "ngrok-free.app", "000webhostapp.com", "translate.goog", "ipfs.io",
+    "script.google.com", "script.googleusercontent.com", "googleusercontent.com",
+    # site builders and blogs
+    "blogspot.com", "wordpress.com", "wixsite.com", "weebly.com", "square.site", "notion.site",
+    "carrd.co", "godaddysites.com", "tumblr.com", "medium.com", "substack.com",
+    # documents, forms and file sharing
+    "sites.google.com", "docs.google.com", "drive.google.com", "forms.gle", "storage.googleapis.com",
+    "dropboxusercontent.com", "1drv.ms", "onedrive.live.com", "sharepoint.com",
+    "typeform.com", "jotform.com", "formstack.com",
+    # cloud object storage (every bucket and region endpoint)
+    "amazonaws.com", "core.windows.net", "firebasestorage.googleapis.com", "firebasestorage.app",
+    "r2.dev", "digitaloceanspaces.com", "backblazeb2.com", "wasabisys.com",
+    # link shorteners and link-in-bio pages
+    "bit.ly", "tinyurl.com", "t.co", "goo.gl", "ow.ly", "is.gd", "cutt.ly", "rebrand.ly", "linktr.ee",
+}
+
+
+def domain_hash(domain):
+    return int.from_bytes(hashlib.blake2b(domain.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def normalize_domain(entry):
+    """Registrable domain for a list entry or URL, or '' if there isn't one (public suffixes, IPs)"""
+    host = extract_host(entry.strip())
+    return public_suffix_domain(host) if "." in host else ""
+
+
+def read_domain_list(path, top=None):
+    """Domains in rank order from a plain or Tranco-style "rank,domain" file"""
+    domains = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                domains.append(line.split(",")[-1])
+                if top and len(domains) >= top:
+                    break
+    return domains
+
+
+def build_allowlist(domains, path):
+    """Write a snapshot for ``domains``. Returns the number of distinct entries.
+
+    The file is written next to ``path`` and renamed over it, so workers that
+    already mapped the previous snapshot keep reading it undisturbed.
+    """
+    hashes = sorted({domain_hash(domain) for domain in map(normalize_domain, domains) if domain})
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(hashes)))
+        f.write(struct.pack(f"<{len(hashes)}Q", *hashes))
+    os.replace(tmp_path, path)
+    return len(hashes)
+
+
+class DomainAllowlist:
+    """Memory-mapped snapshot written by build_allowlist()"""
+
+    def __init__(self, path, user_content_domains=USER_CONTENT_DOMAINS):
+        if sys.byteorder != "little":
+            raise RuntimeError("Allowlist snapshots are little-endian; this host is not")
+        self.path = path
+        self.user_content_domains = set(user_content_domains)
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or len(self._mmap) != HEADER.size + 8 * count:
+            self._mmap.close()
+            raise ValueError(f"{path} is not an allowlist snapshot")
+        # Native uint64 view straight over the mapping; nothing is copied
+        self._hashes = memoryview(self._mmap)[HEADER.size:].cast("Q")
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __contains__(self, domain):
+        key = domain_hash(domain)
+        i = bisect.bisect_left(self._hashes, key)
+        return i < len(self._hashes) and self._hashes[i] == key
+
+    def is_user_content(self, host):
+        labels = host.split(".")
+        return any(".".join(labels[i:]) in self.user_content_domains for i in range(len(labels) - 1))
+
+    def lookup(self, url):
+        """The allowlisted registrable domain for ``url``, or None"""
+        host = extract_host(url)
+        if "." not in host or self.is_user_content(host):
+            return None
+        domain = public_suffix_domain(host)
+        return domain if domain and domain in self else None
+
+    def close(self):
+        self._hashes.release()
+        self._mmap.close()
+
+
+def load_domain_allowlist(path=None):
+    """Map the snapshot at ``path`` (default DOMAIN_ALLOWLIST_FILE); None when not configured"""
+    path = path or os.environ.get("DOMAIN_ALLOWLIST_FILE")
+    if not path:
+        return None
+    extra = {d.strip().lower() for d in os.environ.get("ALLOWLIST_USER_CONTENT", "").split(",") if d.strip()}
+    return DomainAllowlist(path, USER_CONTENT_DOMAINS | extra)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query a memory-mapped top-domain allowlist")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="snapshot a ranked domain list")
+    build.add_argument("source", help="plain or Tranco-style rank,domain file")
+    build.add_argument("output")
+    build.add_argument("--top", type=int, help="keep only the N highest-ranked entries")
+    check = commands.add_parser("check", help="look up URLs or domains")
+    check.add_argument("snapshot")
+    check.add_argument("urls", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_allowlist(read_domain_list(args.source, args.top), args.output)
+        print(f"Wrote {count} domains to {args.output}")
+        return 0
+    allowlist = DomainAllowlist(args.snapshot)
+    for url in args.urls:
+        print(f"{url}: {allowlist.lookup(url) or 'not allowlisted'}")
+    allowlist.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
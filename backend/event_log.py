@@ -0,0 +1,157 @@
+"""Structured, non-blocking event logging.
+
+``log_event("llm.raw_response", level="debug", url=url, raw=text)`` hands one
+record to a bounded in-memory queue; a background QueueListener thread formats
+it as a JSON line and writes it to stdout, so a slow terminal or log shipper
+never blocks a request. When the queue is full, events are dropped and counted
+rather than waited on.
+
+- LOG_LEVEL: minimum level (debug, info, warning, error; default info)
+- LOG_SAMPLE: per-event sampling rates, e.g. "analyze.done=0.1,score.average=0.01"
+- LOG_MAX_FIELD: characters kept per field before truncation (default 512)
+
+A request sent with ``X-Debug-Log: 1`` logs every event it produces at any
+level, unsampled, with LOG_DEBUG_MAX_FIELD (default 64 KB) per field. Set
+LOG_DEBUG_HEADER=0 to ignore the header.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import LOG_EVENTS_DROPPED
+
+LOGGER_NAME = "adlumen"
+LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+QUEUE_SIZE = 10000
+
+MAX_FIELD = int(os.environ.get("LOG_MAX_FIELD", "512"))
+DEBUG_MAX_FIELD = int(os.environ.get("LOG_DEBUG_MAX_FIELD", "65536"))
+DEBUG_HEADER = "X-Debug-Log"
+DEBUG_HEADER_ENABLED = os.environ.get("LOG_DEBUG_HEADER", "1") != "0"
+
+# (request id, verbose) for the request being handled, if any
+_request = ContextVar("log_request", default=(None, False))
+
+_logger = logging.getLogger(LOGGER_NAME)
+_queue = None
+_listener = None
+_setup_lock = threading.Lock()
+_sample_rates = {}
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_EVENTS_DROPPED.inc()
+
+    def prepare(self, record):
+        return record  # fields are already snapshotted; formatting happens on the listener thread
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {"ts": round(record.created, 3), "level": record.levelname.lower(), "event": record.getMessage()}
+        data.update(getattr(record, "fields", {}))
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def _parse_sample_rates(spec):
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def setup_logging(level=None, sample=None, stream=None):
+    """Install the queue handler and start the writer thread (idempotent)"""
+    global _queue, _listener, _sample_rates
+    with _setup_lock:
+        if _listener is not None:
+            return
+        _sample_rates = _parse_sample_rates(sample if sample is not None else os.environ.get("LOG_SAMPLE", ""))
+        _logger.setLevel(LEVELS.get((level or os.environ.get("LOG_LEVEL", "info")).lower(), logging.INFO))
+        _logger.propagate = False
+
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        _queue = queue.Queue(QUEUE_SIZE)
+        _logger.addHandler(_DroppingQueueHandler(_queue))
+        _listener = logging.handlers.QueueListener(_queue, handler)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            for handler in list(_logger.handlers):
+                _logger.removeHandler(handler)
+
+
+def _clip(value, limit):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if not isinstance(value, str):
+        # Snapshot containers now; the caller may mutate them before the writer runs
+        encoded = json.dumps(value, default=str, ensure_ascii=False)
+        if len(encoded) <= limit:
+            return json.loads(encoded)
+        value = encoded
+    if len(value) > limit:
+        return f"{value[:limit]}...(+{len(value) - limit} chars)"
+    return value
+
+
+def log_event(event, level="info", **fields):
+    """Log one structured event; cheap no-op when filtered out by level or sampling"""
+    if _listener is None:
+        setup_logging()
+    levelno = LEVELS[level]
+    request_id, verbose = _request.get()
+    if not verbose:
+        if not _logger.isEnabledFor(levelno):
+            return
+        rate = _sample_rates.get(event)
+        if rate is not None and random.random() >= rate:
+            return
+    limit = DEBUG_MAX_FIELD if verbose else MAX_FIELD
+    record_fields = {name: _clip(value, limit) for name, value in fields.items()}
+    if request_id:
+        record_fields["request_id"] = request_id
+    # handle() skips the logger's level check, so verbose requests get debug events too
+    _logger.handle(_logger.makeRecord(LOGGER_NAME, levelno, "", 0, event, (), None, extra={"fields": record_fields}))
+
+
+@contextmanager
+def request_context(request_id=None, verbose=False):
+    """Tag events logged inside the block with a request id (and verbosity)"""
+    request_id = request_id or uuid.uuid4().hex[:16]
+    token = _request.set((request_id, verbose))
+    try:
+        yield request_id
+    finally:
+        _request.reset(token)
+
+
+def verbose_requested(headers):
+    return DEBUG_HEADER_ENABLED and headers.get(DEBUG_HEADER, "").lower() in ("1", "true", "yes")
+
+
+def queue_depth():
+    return _queue.qsize() if _queue is not None else 0
@@ -1,190 +1,394 @@
+import json
+import os
+from datetime import datetime
+from threading import Lock
+from urllib.parse import urlparse
+
+from event_log import log_event
+from llm_scheduler import acquire
+from metrics import STAGE_LATENCY
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# "slim" sends the static framework once as a (cached) system instruction and only
+# the URL + content per call; "full" sends everything inline like before.
+PROMPT_MODE = os.environ.get("PROMPT_MODE", "slim")
+
+SAFE_BROWSING_API_URL = os.environ.get("SAFE_BROWSING_API_URL", "https://safebrowsing.googleapis.com/v4/threatMatches:find")
+
+SYSTEM_INSTRUCTION = """# Cybersecurity Agent - Initial Analysis
+
+## Role & Context
+You are the **initial analysis component** of a multi-stage fraud detection system. Your assessment will be combined with additional tool results to calculate a final averaged fraud score. Focus on providing your best independent assessment using cybersecurity expertise.
+
+## Your Specific Task
+Perform comprehensive fraud risk analysis using ONLY the provided URL and content. Do NOT call external tools - your role is the foundational analysis that will be enhanced by specialized tools if needed.
+
+## Input Data
+Each request message contains the **Target URL** and the **Extracted Content** of the page.
+
+## Analysis Framework
+
+### Primary Cybersecurity Assessment
+Analyze as an expert cybersecurity specialist:
+
+**Content Security Analysis:**
+- Phishing indicators (credential harvesting, urgent language, impersonation)
+- Social engineering tactics (false scarcity, fear appeals, unrealistic promises)
+- Legitimacy markers (professional copy, consistent branding, logical business model)
+- Contact verification (email domains, phone patterns, address consistency)
+
+**Technical Security Evaluation:**
+- Domain assessment (structure, TLD reputation, suspicious patterns)
+- Known threat signatures (compare against common fraud schemes)
+- Security implementation (HTTPS usage, redirect behavior)
+- Website functionality (normal business operations vs. suspicious requests)
+
+**Risk Indicators Checklist:**
+- Grammar/spelling errors in professional contexts
+- Mismatched branding or domain inconsistencies
+- Excessive urgency or pressure tactics
+- Requests for sensitive information
+- Suspicious payment methods or processes
+- Domain age implications (if determinable from content)
+
+## Scoring Guidelines
+Your fraud_probability represents your independent assessment:
+- **0.00-0.25**: Strong legitimacy indicators, professional presentation
+- **0.26-0.50**: Minor concerns but likely legitimate
+- **0.51-0.75**: Significant red flags, probably fraudulent
+- **0.76-1.00**: Multiple fraud indicators, high confidence malicious
+
+## Function Call Decision
+Based on your analysis, determine if additional validation would be valuable:
+
+**Available Tools:**
+- `google_safe_browsing_check(url)` - Check reputation databases
+- `whoami(url)` - Domain registration analysis
+
+**Call Functions When:**
+- Your confidence is medium (fraud_probability 0.25-0.75)
+- Conflicting indicators need external validation
+- Domain details would significantly impact assessment
+
+**Skip Functions When:**
+- High confidence in legitimacy (< 0.25 fraud probability)
+- High confidence in fraud (> 0.75 fraud probability)
+- Content provides overwhelming evidence either way
+
+## Output Requirements
+Return ONLY this JSON object with no additional text:
+
+```json
+{
+        "fraud_probability": final_fraud_score,
+        "confidence_level": analysis_result["confidence_level"],
+        "justification": analysis_result["justification"]
+}
+```
+
+## Formatting Rules
+- **fraud_probability**: Your independent assessment (0.00-1.00, two decimals)
+- **confidence_level**: Certainty in your assessment (0.00-1.00, two decimals)
+- **justification**: 1-2 sentences explaining key determining factors
+- **call_google_safe_browsing**: Boolean - should this tool be called?
+- **call_whoami**: Boolean - should this tool be called?
+- **Error handling**: Return {} if analysis cannot be completed
+
+## Important Notes
+- Your score will be averaged with tool results for the final fraud score
+- Focus on what you can determine from content and URL alone
+- Make function call decisions based on what would genuinely improve overall assessment accuracy
+- Higher confidence = less need for additional tools"""
+
+
+def build_request(url, clean_text):
+    """Per-URL payload for slim mode: only what changes between calls"""
+    return f"""- **Target URL**: {url}
+- **Extracted Content**: {clean_text}"""
+
+
 def build_prompt(url, clean_text):
-    prompt = f"""# Cybersecurity Agent - Initial Analysis
-
-    ## Role & Context
-    You are the **initial analysis component** of a multi-stage fraud detection system. Your assessment will be combined with additional tool results to calculate a final averaged fraud score. Focus on providing your best independent assessment using cybersecurity expertise.
-
-    ## Your Specific Task
-    Perform comprehensive fraud risk analysis using ONLY the provided URL and content. Do NOT call external tools - your role is the foundational analysis that will be enhanced by specialized tools if needed.
-
-    ## Input Data
-    - **Target URL**: {url}
-    - **Extracted Content**: {clean_text}
-
-    ## Analysis Framework
-
-    ### Primary Cybersecurity Assessment
-    Analyze as an expert cybersecurity specialist:
-
-    **Content Security Analysis:**
-    - Phishing indicators (credential harvesting, urgent language, impersonation)
-    - Social engineering tactics (false scarcity, fear appeals, unrealistic promises)
-    - Legitimacy markers (professional copy, consistent branding, logical business model)
-    - Contact verification (email domains, phone patterns, address consistency)
-
-    **Technical Security Evaluation:**
-    - Domain assessment (structure, TLD reputation, suspicious patterns)
-    - Known threat signatures (compare against common fraud schemes)
-    - Security implementation (HTTPS usage, redirect behavior)
-    - Website functionality (normal business operations vs. suspicious requests)
-
-    **Risk Indicators Checklist:**
-    - Grammar/spelling errors in professional contexts
-    - Mismatched branding or domain inconsistencies
-    - Excessive urgency or pressure tactics
-    - Requests for sensitive information
-    - Suspicious payment methods or processes
-    - Domain age implications (if determinable from content)
-
-    ## Scoring Guidelines
-    Your fraud_probability represents your independent assessment:
-    - **0.00-0.25**: Strong legitimacy indicators, professional presentation
-    - **0.26-0.50**: Minor concerns but likely legitimate
-    - **0.51-0.75**: Significant red flags, probably fraudulent
-    - **0.76-1.00**: Multiple fraud indicators, high confidence malicious
-
-    ## Function Call Decision
-    Based on your analysis, determine if additional validation would be valuable:
-
-    **Available Tools:**
-    - `google_safe_browsing_check(url)` - Check reputation databases
-    - `whoami(url)` - Domain registration analysis
-
-    **Call Functions When:**
-    - Your confidence is medium (fraud_probability 0.25-0.75)
-    - Conflicting indicators need external validation
-    - Domain details would significantly impact assessment
-
-    **Skip Functions When:**
-    - High confidence in legitimacy (< 0.25 fraud probability)
-    - High confidence in fraud (> 0.75 fraud probability)
-    - Content provides overwhelming evidence either way
-
-    ## Output Requirements
-    Return ONLY this JSON object with no additional text:
-
-    ```json
-    {{
-            "fraud_probability": final_fraud_score,
-            "confidence_level": analysis_result["confidence_level"],
-            "justification": analysis_result["justification"]
-    }}
-    ```
-
-    ## Formatting Rules
-    - **fraud_probability**: Your independent assessment (0.00-1.00, two decimals)
-    - **confidence_level**: Certainty in your assessment (0.00-1.00, two decimals)
-    - **justification**: 1-2 sentences explaining key determining factors
-    - **call_google_safe_browsing**: Boolean - should this tool be called?
-    - **call_whoami**: Boolean - should this tool be called?
-    - **Error handling**: Return {{}} if analysis cannot be completed
-
-    ## Important Notes
-    - Your score will be averaged with tool results for the final fraud score
-    - Focus on what you can determine from content and URL alone
-    - Make function call decisions based on what would genuinely improve overall assessment accuracy
-    - Higher confidence = less need for additional tools"""
-        
-    return prompt
-    
-def scam_agent(client, url, clean_text):
-    # Get the prompt
-    prompt = build_prompt(url, clean_text)
-    
+    """Full inline prompt (PROMPT_MODE=full)"""
+    return SYSTEM_INSTRUCTION + "\n\n## Request\n" + build_request(url, clean_text)
+
+
+def generate(client, url, clean_text, model=GEMINI_MODEL):
+    """Call the LLM in the configured prompt mode. Returns (text, usage)
+
+    ``client`` is an LLMProvider / HedgedLLM, or a bare google-genai client.
+    """
+    from llm_providers import GeminiProvider
+
+    provider = client if hasattr(client, "complete") else GeminiProvider(client, model)
+    if PROMPT_MODE == "full":
+        text, usage = provider.complete(None, build_prompt(url, clean_text))
+    else:
+        text, usage = provider.complete(SYSTEM_INSTRUCTION, build_request(url, clean_text))
+    usage["prompt_mode"] = PROMPT_MODE
+    return text, usage
+
+def clean_json_response(raw_response):
+    """Strip Markdown code fences around a JSON reply"""
+    raw_response = raw_response.strip()
+    if raw_response.startswith('```json'):
+        raw_response = raw_response[7:]  # Remove ```json
+    elif raw_response.startswith('```'):
+        raw_response = raw_response[3:]
+    if raw_response.endswith('```'):
+        raw_response = raw_response[:-3]  # Remove ```
+    return raw_response.strip()
+
+def finalize_verdict(url, full_response, usage):
+    """Validate a parsed verdict, run the tools it asks for and average the scores"""
     try:
-        # Call Gemini
-        gemini_response = client.models.generate_content(
-            model="gemini-2.5-flash", 
-            contents=prompt
-        )
-        raw_response = gemini_response.text.strip()
-        print(f"Raw Gemini response: {raw_response}")
-        
-        # Clean the response by removing Markdown code blocks
-        if raw_response.startswith('```json'):
-            raw_response = raw_response[7:]  # Remove ```json
-        if raw_response.endswith('```'):
-            raw_response = raw_response[:-3]  # Remove ```
-        raw_response = raw_response.strip()
-        
-        # Parse JSON response
-        import json
-        try:
-            full_response = json.loads(raw_response)
-            print(f"Parsed JSON: {full_response}")
-            
-            # Validate required fields
-            required_fields = ["fraud_probability", "confidence_level", "justification"]
-            if not all(key in full_response for key in required_fields):
-                raise ValueError("Missing required fields in response")
-                
-            # Extract tool call flags
-            call_google = full_response.pop("call_google_safe_browsing", False)
-            call_whoami = full_response.pop("call_whoami", False)
+        # Validate required fields
+        required_fields = ["fraud_probability", "confidence_level", "justification"]
+        if not all(key in full_response for key in required_fields):
+            raise ValueError("Missing required fields in response")
             
-            analysis_result = full_response
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"JSON parsing error: {e}")
-            analysis_result = {
-                "fraud_probability": 0.0,
-                "confidence_level": 0.0,
-                "justification": "Unable to analyze due to parsing error"
-            }
-            call_google = False
-            call_whoami = False
+        # Extract tool call flags
+        call_google = full_response.pop("call_google_safe_browsing", False)
+        call_whoami = full_response.pop("call_whoami", False)
+        
+        analysis_result = full_response
         
-        # Call tools based on flags
-        tool_results = []
+    except (TypeError, ValueError) as e:
+        log_event("verdict.invalid", level="warning", url=url, error=str(e))
+        analysis_result = {
+            "fraud_probability": 0.0,
+            "confidence_level": 0.0,
+            "justification": "Unable to analyze due to parsing error"
+        }
+        call_google = False
+        call_whoami = False
+    
+    # Call tools based on flags
+    tool_results = [typosquat_check(url)]  # local index lookup, always cheap enough to run
 
-        if call_google:
-            tool_results.append(google_safe_browsing_check(url))
+    if call_google:
+        tool_results.append(google_safe_browsing_check(url))
 
-        if call_whoami:
-            tool_results.append((whoami(url), True))  # whoami always returns includable score
+    if call_whoami:
+        tool_results.append((whoami(url), True))  # whoami always returns includable score
 
-        # Average scores
-        final_fraud_score = average_score(analysis_result["fraud_probability"], tool_results)
+    # Average scores
+    final_fraud_score = average_score(analysis_result["fraud_probability"], tool_results)
 
-        # Update analysis_result with final averaged score
-        analysis_result = {
-            "fraud_probability": final_fraud_score,
-            "confidence_level": analysis_result["confidence_level"],
-            "justification": analysis_result["justification"]
-        }
+    # Update analysis_result with final averaged score
+    return {
+        "fraud_probability": final_fraud_score,
+        "confidence_level": analysis_result["confidence_level"],
+        "justification": analysis_result["justification"],
+        "usage": usage
+    }
+
+def llm_verdict(provider, url, clean_text):
+    """One LLM call. Returns (parsed verdict dict, usage); {} if the reply isn't JSON"""
+    raw_response, usage = generate(provider, url, clean_text)
+    log_event("llm.raw_response", level="debug", url=url, raw=raw_response)
+    
+    # Parse JSON response
+    try:
+        full_response = json.loads(clean_json_response(raw_response))
+        log_event("llm.parsed", level="debug", url=url, verdict=full_response)
+    except json.JSONDecodeError as e:
+        log_event("llm.unparseable", level="warning", url=url, error=str(e))
+        full_response = {}
+    return full_response, usage
+
+def scam_agent(client, url, clean_text):
+    """``client`` is an LLM provider, a ModelCascade of tiers, or a google-genai client"""
+    usage = {}
+    try:
+        if not hasattr(client, "tiers"):
+            full_response, usage = llm_verdict(client, url, clean_text)
+            return finalize_verdict(url, full_response, usage)
 
-        return analysis_result
+        # Tiered: cheapest model first, escalate only ambiguous verdicts
+        for tier_index, tier in enumerate(client.tiers):
+            try:
+                full_response, usage = llm_verdict(tier.provider, url, clean_text)
+                failed = False
+            except Exception as e:
+                if tier_index == len(client.tiers) - 1:
+                    raise
+                log_event("cascade.tier_failed", level="warning", url=url, tier=tier.name, error=str(e))
+                full_response, failed = {}, True
+            if not client.record(tier_index, full_response, failed=failed):
+                break
+            log_event("cascade.escalate", url=url, tier=tier.name)
+        usage["tier"] = tier.name
+        return finalize_verdict(url, full_response, usage)
         
     except Exception as e:
-        print(f"Gemini error: {e}")
+        log_event("llm.error", level="error", url=url, error=str(e))
         # Error response
         return {
             "fraud_probability": 0.0,
             "confidence_level": 0.0,
-            "justification": f"Analysis failed: {str(e)}"
+            "justification": f"Analysis failed: {str(e)}",
+            "usage": usage
         }
+
+# Batched mode: K compacted pages per LLM call. Callers pass pages already
+# compacted (compact_page); no serving path uses it yet, only
+# benchmarks/batch_bench.py (jobs and bulk_scan run full investigations)
+BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", "8"))
+
+BATCH_SYSTEM_INSTRUCTION = SYSTEM_INSTRUCTION + """
+
+## Batch Mode (overrides the single-object output format above)
+The request contains several pages, each introduced by a `### Page <id>` heading.
+Analyze every page independently and return ONLY a JSON array with exactly one object per page:
+
+```json
+[
+    {"id": "<page id>", "fraud_probability": 0.00, "confidence_level": 0.00, "justification": "...", "call_google_safe_browsing": false, "call_whoami": false}
+]
+```"""
+
+
+def build_batch_request(pages):
+    """pages: [(url, clean_text)]; pages are numbered 1..K to keep ids short"""
+    sections = []
+    for page_id, (url, clean_text) in enumerate(pages, 1):
+        sections.append(f"### Page {page_id}\n" + build_request(url, clean_text))
+    return "\n\n".join(sections)
+
+
+def parse_batch_response(raw_response):
+    """Map page id -> verdict dict from a JSON array reply. Raises on malformed output"""
+    verdicts = json.loads(clean_json_response(raw_response))
+    if isinstance(verdicts, dict):
+        verdicts = verdicts.get("results") or verdicts.get("verdicts") or [verdicts]
+    if not isinstance(verdicts, list):
+        raise ValueError("Batch response is not a JSON array")
+    return {str(v.get("id")): v for v in verdicts if isinstance(v, dict) and "id" in v}
+
+
+def scam_agent_batch(client, pages, batch_size=BATCH_SIZE):
+    """Analyze many (url, clean_text) pages with one LLM call per batch.
+
+    Returns verdicts in input order. A batch whose reply doesn't parse, or that
+    is missing some pages, is split and retried; single pages fall back to a
+    single-page call. With a ModelCascade, each tier gets a batch of the pages
+    the previous tier escalated.
+    """
+    from llm_providers import GeminiProvider
+
+    if hasattr(client, "tiers"):
+        cascade, providers = client, [tier.provider for tier in client.tiers]
+    elif hasattr(client, "complete"):
+        cascade, providers = None, [client]
+    else:
+        cascade, providers = None, [GeminiProvider(client, GEMINI_MODEL)]
+
+    pending = list(dict.fromkeys(pages))
+    results = {}
+    for tier_index, provider in enumerate(providers):
+        raw = {}
+        for i in range(0, len(pending), batch_size):
+            _analyze_batch(provider, pending[i:i + batch_size], raw)
+
+        escalated = []
+        for url, clean_text in pending:
+            verdict, usage = raw[url]
+            if cascade is not None:
+                usage["tier"] = cascade.tiers[tier_index].name
+                if cascade.record(tier_index, verdict, failed=not verdict):
+                    escalated.append((url, clean_text))
+                    continue
+            results[url] = finalize_verdict(url, verdict, usage)
+        pending = escalated
+    return [results[url] for url, _ in pages]
+
+def _analyze_batch(provider, pages, raw):
+    """Fill raw[url] = (verdict dict, usage), splitting batches that fail to parse"""
+    if len(pages) == 1:
+        url, clean_text = pages[0]
+        try:
+            raw[url] = llm_verdict(provider, url, clean_text)
+        except Exception as e:
+            log_event("llm.error", level="error", url=url, error=str(e))
+            raw[url] = ({}, {"error": str(e)})
+        return
+
+    verdicts, usage = {}, {}
+    try:
+        raw_response, usage = provider.complete(BATCH_SYSTEM_INSTRUCTION, build_batch_request(pages))
+        verdicts = parse_batch_response(raw_response)
+    except Exception as e:
+        log_event("batch.split", level="warning", pages=len(pages), error=str(e))
+    usage["batch_size"] = len(pages)
+
+    missing = []
+    for page_id, (url, clean_text) in enumerate(pages, 1):
+        verdict = verdicts.get(str(page_id))
+        if verdict is None:
+            missing.append((url, clean_text))
+        else:
+            verdict.pop("id", None)
+            raw[url] = (verdict, dict(usage))
+
+    if len(missing) == len(pages):
+        middle = len(pages) // 2
+        _analyze_batch(provider, pages[:middle], raw)
+        _analyze_batch(provider, pages[middle:], raw)
+    elif missing:
+        _analyze_batch(provider, missing, raw)
     
+# Pooled session for tool calls (Safe Browsing), created on first use so that
+# importing this module doesn't pull in requests
+_http_session = None
+_http_session_lock = Lock()
+
+
+def http_session():
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                import requests
+
+                _http_session = requests.Session()
+    return _http_session
+
+
+def warm_up():
+    """Load the tools' dependencies and open a Safe Browsing connection ahead of the first scan"""
+    from brand_index import get_brand_index
+
+    get_brand_index()
+    try:
+        import whois  # noqa: F401
+    except ImportError as e:
+        log_event("warm_up.failed", level="warning", target="whois", error=str(e))
+    try:
+        http_session().head(SAFE_BROWSING_API_URL, timeout=5)
+    except Exception as e:
+        log_event("warm_up.failed", level="warning", target="safe_browsing", error=str(e))
+
+
 def google_safe_browsing_check(url):
     """Returns (score, should_include_in_average) tuple"""
     try:
         import requests
-        import os
-        from urllib.parse import urlparse
-        
+
         # Skip check for certain domains
         domain = urlparse(url).netloc.lower()
         excluded_domains = ['.gov', '.mil', 'localhost']  # Add others as needed
         if any(domain.endswith(excluded) for excluded in excluded_domains):
-            print(f"Skipping Safe Browsing check for excluded domain: {domain}")
+            log_event("safe_browsing.skipped", level="debug", domain=domain, reason="excluded_domain")
             return (0.0, False)  # Neutral score, excluded from average
         
         api_key = os.getenv('GOOGLE_SAFE_BROWSING_API_KEY')
         if not api_key:
-            print("Google Safe Browsing API key not found")
+            log_event("safe_browsing.skipped", level="warning", reason="no_api_key")
             return (0.0, False)
         
         # API request setup remains the same...
-        api_url = f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={api_key}"
+        api_url = f"{SAFE_BROWSING_API_URL}?key={api_key}"
         payload = {
             "client": {
                 "clientId": "fraud-detection-agent",
@@ -199,13 +403,15 @@ def google_safe_browsing_check(url):
         }
         
         try:
-            response = requests.post(api_url, json=payload, timeout=10)
+            acquire("safe_browsing")
+            with STAGE_LATENCY.time(stage="safe_browsing"):
+                response = http_session().post(api_url, json=payload, timeout=10)
             response.raise_for_status()
             result = response.json()
             
             if "matches" in result and result["matches"]:
                 threat_types = [match.get("threatType", "UNKNOWN") for match in result["matches"]]
-                print(f"Threats found: {threat_types}")
+                log_event("safe_browsing.threats", url=url, threats=threat_types)
                 
                 score = 0.0
                 for threat in threat_types:
@@ -220,34 +426,54 @@ def google_safe_browsing_check(url):
                 
                 return (min(score, 1.0), True)
             else:
-                print("No threats found in Google Safe Browsing")
+                log_event("safe_browsing.clean", level="debug", url=url)
                 return (0.0, True)
                 
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 403:
-                print("Google Safe Browsing API access denied (possibly restricted domain)")
+                log_event("safe_browsing.denied", level="warning", url=url)
                 return (0.0, False)
             raise
             
     except Exception as e:
-        print(f"Google Safe Browsing check failed: {e}")
+        log_event("safe_browsing.failed", level="warning", url=url, error=str(e))
         return (0.0, False)  # Neutral score, excluded from average
     
+def typosquat_check(url):
+    """Returns (score, should_include_in_average) tuple"""
+    try:
+        from brand_index import get_brand_index
+
+        matches = get_brand_index().lookup(url)
+        if not matches:
+            return (0.0, False)  # No look-alike found, don't dilute the average
+
+        top_match = matches[0]
+        log_event("typosquat.match", url=url, **top_match)
+        if top_match["technique"] == "idn_homoglyph":
+            return (0.9, True)
+        if top_match["technique"] == "confusable":
+            return (0.8, True)
+        return (0.7, True)
+
+    except Exception as e:
+        log_event("typosquat.failed", level="warning", url=url, error=str(e))
+        return (0.0, False)
+
 def whoami(url):
     try:
         import whois
-        from urllib.parse import urlparse
-        from datetime import datetime
-        
+
         # Extract domain from URL
         domain = urlparse(url).netloc
         if domain.startswith('www.'):
             domain = domain[4:]
         
-        print(f"Performing WHOIS lookup for: {domain}")
+        log_event("whois.lookup", level="debug", domain=domain)
         
         # Perform WHOIS lookup
-        w = whois.whois(domain)
+        with STAGE_LATENCY.time(stage="whois"):
+            w = whois.whois(domain)
         
         score = 0.0
         factors = []
@@ -298,11 +524,11 @@ def whoami(url):
         # Cap score at 1.0
         score = min(score, 1.0)
         
-        print(f"WHOIS analysis complete. Score: {score}, Factors: {factors}")
+        log_event("whois.done", level="debug", domain=domain, score=score, factors=factors)
         return score
         
     except Exception as e:
-        print(f"WHOIS lookup failed: {e}")
+        log_event("whois.failed", level="warning", url=url, error=str(e))
         return 0.0  # Return neutral score on failure
 
 def average_score(gemini_score, tool_results):
@@ -318,7 +544,7 @@ def average_score(gemini_score, tool_results):
     
     if valid_scores:
         average = sum(valid_scores) / len(valid_scores)
-        print(f"Averaging {len(valid_scores)} scores: {valid_scores} = {average:.2f}")
+        log_event("score.average", level="debug", scores=valid_scores, average=average)
         return round(average, 2)
     else:
         return round(gemini_score, 2)
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""Asynchronous investigation jobs.
+
+``POST /jobs`` only records a queued job; workers claim jobs from a shared
+SQLite database (WAL mode), run ``InvestigationOrchestrator.execute_investigation``
+and write partial tool results back as each tool finishes. Workers can run as
+threads inside the API process (JOB_WORKERS) or as separate processes:
+
+    python jobs.py --workers 4
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from event_log import log_event
+from llm_scheduler import request_class
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "olive_agents_test")
+
+JOB_LEASE_SECONDS = 15 * 60  # a running job not updated for this long is requeued
+POLL_INTERVAL = 0.5
+REQUEUE_INTERVAL = 60  # how often idle workers look for stale running jobs
+
+
+class JobStore:
+    """Job state in SQLite, safe to share between the API and worker processes"""
+
+    def __init__(self, path=None, busy_timeout_ms=5000):
+        self.path = path or os.environ.get("JOBS_DB", "jobs.db")
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " status TEXT NOT NULL,"  # queued | running | done | failed
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " worker TEXT,"
+            " plan TEXT,"
+            " results TEXT,"
+            " final_assessment TEXT,"
+            " error TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+        # Databases created before jobs carried their client
+        if "client" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN client TEXT")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, url, client=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, url, status, created_at, updated_at, results, client)"
+            " VALUES (?, ?, 'queued', ?, ?, '{}', ?)",
+            (job_id, url, now, now, client),
+        )
+        return job_id
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ("plan", "results", "final_assessment"):
+            job[field] = json.loads(job[field]) if job[field] else None
+        return job
+
+    def claim(self, worker):
+        """Atomically move the oldest queued job to running; returns it or None"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, updated_at = ? WHERE id = ?",
+                (worker, time.time(), row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"])
+
+    def update(self, job_id, **fields):
+        for field in ("plan", "results", "final_assessment"):
+            if field in fields:
+                fields[field] = json.dumps(fields[field], default=str)
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._conn().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def requeue_stale(self, lease_seconds=JOB_LEASE_SECONDS):
+        """Put running jobs whose worker went quiet back in the queue"""
+        return self._conn().execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND updated_at < ?",
+            (time.time() - lease_seconds,),
+        ).rowcount
+
+    def counts(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class JobWorkerPool:
+    """Threads that claim jobs and run investigations under one shared RateLimiter"""
+
+    def __init__(self, store, workers=2, on_complete=None):
+        self.store = store
+        self.workers = workers
+        self.on_complete = on_complete  # called with (url, outcome) after each finished investigation
+        self._stop = threading.Event()
+        self._threads = []
+        self._rate_limiter = None
+        self._next_requeue = 0.0
+
+    def start(self):
+        if AGENT_DIR not in sys.path:
+            sys.path.insert(0, AGENT_DIR)
+        from scam_detection_agent import RateLimiter
+
+        self._rate_limiter = RateLimiter()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{os.getpid()}-{i}",), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _requeue_stale(self, worker):
+        """Requeue jobs of crashed workers, at most every REQUEUE_INTERVAL per pool; returns the count"""
+        now = time.monotonic()
+        if now < self._next_requeue:
+            return 0
+        self._next_requeue = now + REQUEUE_INTERVAL
+        try:
+            requeued = self.store.requeue_stale()
+        except sqlite3.OperationalError as e:
+            log_event("jobs.requeue_failed", level="warning", worker=worker, error=str(e))
+            return 0
+        if requeued:
+            log_event("jobs.requeued", worker=worker, jobs=requeued)
+        return requeued
+
+    def _run(self, worker):
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(worker)
+            except sqlite3.OperationalError as e:
+                log_event("jobs.claim_failed", level="warning", worker=worker, error=str(e))
+                job = None
+            if job is None:
+                # Nothing queued: pick up jobs whose worker died since the pool started
+                if not self._requeue_stale(worker):
+                    self._stop.wait(POLL_INTERVAL)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        from scam_detection_agent import InvestigationOrchestrator
+
+        job_id = job["id"]
+        results = {}
+
+        def on_progress(event, data):
+            if event == "planned":
+                self.store.update(job_id, plan=data["plan"])
+            elif event == "tool_done":
+                results[data["tool"]] = data["result"]
+                self.store.update(job_id, results=results)
+
+        try:
+            orchestrator = InvestigationOrchestrator(rate_limiter=self._rate_limiter)
+            # Jobs share the LLM quota fairly per client, behind interactive requests
+            with request_class("batch", client=job.get("client") or "jobs"):
+                outcome = orchestrator.execute_investigation(job["url"], on_progress=on_progress)
+            self.store.update(
+                job_id,
+                status="done",
+                results=outcome["results"],
+                final_assessment=outcome["final_assessment"],
+            )
+            if self.on_complete:
+                try:
+                    self.on_complete(job["url"], outcome)
+                except Exception as e:
+                    log_event("jobs.on_complete_failed", level="warning", job_id=job_id, error=str(e))
+        except Exception as e:
+            log_event("jobs.failed", level="error", job_id=job_id, url=job["url"], error=str(e))
+            self.store.update(job_id, status="failed", error=str(e))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run investigation job workers")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--db", default=None, help="job database (default: JOBS_DB or jobs.db)")
+    args = parser.parse_args(argv)
+
+    pool = JobWorkerPool(JobStore(args.db), workers=args.workers)
+    pool.start()
+    print(f"{args.workers} job workers polling {pool.store.path}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
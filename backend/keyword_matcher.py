@@ -0,0 +1,133 @@
+"""Aho-Corasick multi-pattern matcher for domain and page-text indicators.
+
+The automaton is compiled once and then matches every pattern in a single
+linear scan of the input, so lookup cost stays flat as keyword lists grow
+from a few dozen entries to tens of thousands of brands and scam phrases.
+"""
+from collections import deque
+
+
+class KeywordMatcher:
+    """Compiled Aho-Corasick automaton over a fixed set of keywords"""
+
+    def __init__(self, patterns=(), ignore_case=True):
+        self.ignore_case = ignore_case
+        self.patterns = []   # pattern id -> keyword
+        self.tags = []       # pattern id -> tag (e.g. "brand", "action")
+        self._ids = {}       # keyword -> pattern id
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]     # pattern ids ending exactly at this state
+        self._dict_link = [0]  # nearest suffix state with output (0 = none)
+        self._compiled = False
+
+        for item in patterns:
+            if isinstance(item, tuple):
+                self.add(*item)
+            else:
+                self.add(item)
+        self.compile()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def add(self, keyword, tag=None):
+        """Add a keyword; the first tag registered for a keyword wins"""
+        if self.ignore_case:
+            keyword = keyword.lower()
+        if not keyword or keyword in self._ids:
+            return
+        pattern_id = len(self.patterns)
+        self._ids[keyword] = pattern_id
+        self.patterns.append(keyword)
+        self.tags.append(tag)
+
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._dict_link.append(0)
+            state = next_state
+        self._out[state] = self._out[state] + (pattern_id,)
+        self._compiled = False
+
+    def compile(self):
+        """Build failure and dictionary links (BFS over the trie)"""
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict_link
+        queue = deque()
+        for next_state in goto[0].values():
+            fail[next_state] = 0
+            dict_link[next_state] = 0
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                if f == next_state:
+                    f = 0
+                fail[next_state] = f
+                dict_link[next_state] = f if out[f] else dict_link[f]
+        self._compiled = True
+
+    def iter_matches(self, text):
+        """Yield (start_position, pattern_id) for every occurrence in text"""
+        if not self._compiled:
+            self.compile()
+        if self.ignore_case:
+            text = text.lower()
+        goto, fail, out, dict_link, patterns = (
+            self._goto, self._fail, self._out, self._dict_link, self.patterns
+        )
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            match_state = state if out[state] else dict_link[state]
+            while match_state:
+                for pattern_id in out[match_state]:
+                    yield end - len(patterns[pattern_id]) + 1, pattern_id
+                match_state = dict_link[match_state]
+
+    def find_first(self, text):
+        """Return [(keyword, tag, first_position)] ordered like the input patterns.
+
+        Mirrors the old ``for keyword in keywords: text.find(keyword)`` loop,
+        but in a single pass over the text.
+        """
+        first = {}
+        for start, pattern_id in self.iter_matches(text):
+            if pattern_id not in first or start < first[pattern_id]:
+                first[pattern_id] = start
+        return [
+            (self.patterns[pattern_id], self.tags[pattern_id], first[pattern_id])
+            for pattern_id in sorted(first)
+        ]
+
+    def contains_any(self, text):
+        """True if any pattern occurs in text"""
+        for _ in self.iter_matches(text):
+            return True
+        return False
+
+
+def load_keyword_file(path):
+    """Read one keyword per line, skipping blanks and '#' comments"""
+    keywords = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                keywords.append(line)
+    return keywords
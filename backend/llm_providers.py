@@ -0,0 +1,342 @@
+"""LLM provider abstraction with request hedging across providers.
+
+Every provider exposes ``complete(system, prompt) -> (text, usage)``. HedgedLLM
+sends a request to the primary provider and, if it hasn't answered by the
+primary's observed p95 latency (counted from when the request is sent, not
+while it waits for quota), fires the same request at a secondary provider
+and returns whichever answer arrives first. Hedges are capped to a fraction of
+recent calls so a slow primary can't double the load on the secondary.
+"""
+import hashlib
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from threading import Event, Lock
+
+import requests
+
+from event_log import log_event
+from llm_scheduler import acquire
+from metrics import CACHE_REQUESTS, LLM_ERRORS, LLM_TOKENS, STAGE_LATENCY, LatencyHistogram
+
+TOGETHER_API_URL = "https://api.together.xyz/v1/chat/completions"
+TOGETHER_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo"
+
+USE_CONTEXT_CACHE = os.environ.get("GEMINI_CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_TTL = 3600  # seconds
+
+
+class LLMProvider:
+    """Base class for LLM backends"""
+
+    def __init__(self, name, model):
+        self.name = name
+        self.model = model
+        self.latency = LatencyHistogram()
+        self.errors = 0
+
+    def complete(self, system, prompt, max_tokens=None, temperature=None):
+        """Return (text, usage). ``system`` may be None for a single inline prompt.
+
+        Waits for this provider's quota first, in the caller's priority class
+        (see llm_scheduler); the wait isn't counted in the provider's latency.
+        """
+        return self.send(system, prompt, max_tokens, temperature, queued_s=acquire(self.name))
+
+    def send(self, system, prompt, max_tokens=None, temperature=None, queued_s=0.0):
+        """``complete`` for a caller that already holds a quota token (``queued_s`` waited for it)"""
+        start = time.perf_counter()
+        try:
+            text, usage = self._complete(system, prompt, max_tokens, temperature)
+        except Exception:
+            self.errors += 1
+            LLM_ERRORS.labels(provider=self.name).inc()
+            raise
+        elapsed = time.perf_counter() - start
+        self.latency.observe(elapsed)
+        STAGE_LATENCY.labels(stage=f"llm:{self.name}").observe(elapsed)
+        for kind in ("prompt", "completion", "cached"):
+            LLM_TOKENS.labels(provider=self.name, model=self.model, kind=kind).inc(usage.get(f"{kind}_tokens") or 0)
+        usage.setdefault("latency_ms", round(elapsed * 1000, 1))
+        usage["queue_wait_ms"] = round(queued_s * 1000, 1)
+        usage["provider"] = self.name
+        usage["model"] = self.model
+        return text, usage
+
+    def _complete(self, system, prompt, max_tokens, temperature):
+        raise NotImplementedError
+
+    def warm_up(self, system=None):
+        """Open a connection (and any cache for ``system``) before the first call; never raises"""
+        try:
+            self._warm_up(system)
+        except Exception as e:
+            log_event("warm_up.failed", level="warning", target=self.name, error=str(e))
+
+    def _warm_up(self, system):
+        pass
+
+    def stats(self):
+        return {"model": self.model, "errors": self.errors, "latency": self.latency.snapshot()}
+
+
+# (model, system hash) -> (cache name or None, expires_at)
+_context_caches = {}
+
+
+class GeminiProvider(LLMProvider):
+    """google-genai client; system instructions go through an explicit context cache"""
+
+    def __init__(self, client=None, model="gemini-2.5-flash", api_key=None, base_url=None, name="gemini"):
+        super().__init__(name, model)
+        if client is None:
+            from google import genai
+
+            http_options = {"base_url": base_url} if base_url else None
+            client = genai.Client(api_key=api_key, http_options=http_options)
+        self.client = client
+
+    def get_context_cache(self, system):
+        """Create (or reuse) a context cache holding ``system``.
+
+        Returns None when caching is disabled or unavailable, in which case the
+        system instruction is sent uncached (still eligible for implicit caching).
+        """
+        if not USE_CONTEXT_CACHE:
+            return None
+        key = (self.model, hashlib.sha256(system.encode("utf-8")).hexdigest())
+        cached = _context_caches.get(key)
+        if cached and cached[1] > time.time() + 60:
+            CACHE_REQUESTS.labels(layer="gemini_context", result="hit" if cached[0] else "unavailable").inc()
+            return cached[0]
+        CACHE_REQUESTS.labels(layer="gemini_context", result="miss").inc()
+        try:
+            from google.genai import types
+
+            cache = self.client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    display_name="adlumen-scam-agent",
+                    system_instruction=system,
+                    ttl=f"{CONTEXT_CACHE_TTL}s",
+                ),
+            )
+            _context_caches[key] = (cache.name, time.time() + CONTEXT_CACHE_TTL)
+            return cache.name
+        except Exception as e:
+            log_event("llm.context_cache_unavailable", level="warning", model=self.model, error=str(e))
+            # Don't retry on every call
+            _context_caches[key] = (None, time.time() + CONTEXT_CACHE_TTL)
+            return None
+
+    def _warm_up(self, system):
+        if system and self.get_context_cache(system):
+            return
+        self.client.models.get(model=self.model)  # any cheap call opens the connection
+
+    def _complete(self, system, prompt, max_tokens, temperature):
+        from google.genai import types
+
+        config_args = {}
+        if max_tokens:
+            config_args["max_output_tokens"] = max_tokens
+        if temperature is not None:
+            config_args["temperature"] = temperature
+        if system:
+            cache_name = self.get_context_cache(system)
+            if cache_name:
+                config_args["cached_content"] = cache_name
+            else:
+                config_args["system_instruction"] = system
+
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(**config_args) if config_args else None
+        )
+        metadata = getattr(response, "usage_metadata", None)
+        usage = {
+            "prompt_tokens": getattr(metadata, "prompt_token_count", None) or 0,
+            "completion_tokens": getattr(metadata, "candidates_token_count", None) or 0,
+            "cached_tokens": getattr(metadata, "cached_content_token_count", None) or 0,
+        }
+        return response.text, usage
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Chat-completions endpoint (Together.ai, or a local stub server)"""
+
+    def __init__(self, api_key, model=TOGETHER_MODEL, api_url=TOGETHER_API_URL, name="together", timeout=30):
+        super().__init__(name, model)
+        self.api_key = api_key
+        self.api_url = api_url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _warm_up(self, system):
+        self.session.head(self.api_url, timeout=5)
+
+    def _complete(self, system, prompt, max_tokens, temperature):
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens or 500}
+        if temperature is not None:
+            payload["temperature"] = temperature
+
+        response = self.session.post(
+            self.api_url,
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            json=payload,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        result = response.json()
+        usage = result.get("usage") or {}
+        return result["choices"][0]["message"]["content"], {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "cached_tokens": 0,
+        }
+
+
+class HedgedLLM:
+    """Primary provider with a capped, latency-triggered hedge to a secondary"""
+
+    def __init__(self, primary, secondary=None, max_hedge_rate=0.1, hedge_quantile=0.95,
+                 default_delay=8.0, min_delay=0.25, min_samples=20, window=200, max_workers=16):
+        self.primary = primary
+        self.secondary = secondary
+        self.max_hedge_rate = max_hedge_rate
+        self.hedge_quantile = hedge_quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._recent = deque(maxlen=window)  # True where the call was hedged
+        self._lock = Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def name(self):
+        return self.primary.name
+
+    @property
+    def model(self):
+        return self.primary.model
+
+    def hedge_delay(self):
+        """Seconds to wait on the primary before hedging: its observed p95"""
+        if self.primary.latency.sample_count() < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, self.primary.latency.percentile(self.hedge_quantile))
+
+    def _hedge_allowed(self):
+        with self._lock:
+            return sum(self._recent) < self.max_hedge_rate * len(self._recent)
+
+    def _record(self, hedged):
+        with self._lock:
+            self.calls += 1
+            self._recent.append(hedged)
+            if hedged:
+                self.hedges += 1
+
+    def complete(self, system, prompt, max_tokens=None, temperature=None):
+        if self.secondary is None:
+            self._record(False)
+            return self.primary.complete(system, prompt, max_tokens, temperature)
+
+        # Each call runs in a copy of the caller's context so it keeps its priority class.
+        # The hedge timer starts once the primary request is sent: hedge_delay() is the
+        # provider's latency without our own quota wait, so that wait mustn't count
+        sent, abandoned = Event(), Event()
+        primary_future = self._pool.submit(copy_context().run, self._send_primary, sent, abandoned, system, prompt,
+                                           max_tokens, temperature)
+        primary_future.add_done_callback(lambda _: sent.set())  # failed before sending
+        sent.wait()
+        done, _ = wait([primary_future], timeout=self.hedge_delay())
+        if done and primary_future.exception() is None:
+            self._record(False)
+            return primary_future.result()
+
+        # Primary is slow (or already failed): hedge if the budget allows
+        if not done and not self._hedge_allowed():
+            self._record(False)
+            return primary_future.result()
+
+        self._record(True)
+        secondary_future = self._pool.submit(copy_context().run, self.secondary.complete, system, prompt, max_tokens,
+                                             temperature)
+        pending = {primary_future, secondary_future}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    abandoned.set()
+                    text, usage = future.result()
+                    usage["hedged"] = True
+                    if future is secondary_future:
+                        self.hedge_wins += 1
+                    return text, usage
+                last_error = future.exception()
+        raise last_error
+
+    def _send_primary(self, sent, abandoned, system, prompt, max_tokens, temperature):
+        queued_s = acquire(self.primary.name)
+        if abandoned.is_set():
+            # Answered elsewhere while this call waited for quota; don't send it
+            raise RuntimeError("Primary call abandoned: the hedge answered first")
+        sent.set()
+        return self.primary.send(system, prompt, max_tokens, temperature, queued_s=queued_s)
+
+    def warm_up(self, system=None):
+        self.primary.warm_up(system)
+        if self.secondary is not None:
+            self.secondary.warm_up(system)
+
+    def stats(self):
+        providers = {self.primary.name: self.primary.stats()}
+        if self.secondary is not None:
+            providers[self.secondary.name] = self.secondary.stats()
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+            "max_hedge_rate": self.max_hedge_rate,
+            "hedge_delay_s": round(self.hedge_delay(), 3),
+            "providers": providers,
+        }
+
+
+def build_secondary_from_env():
+    """Together.ai hedge target, or None when TOGETHER_API_KEY isn't set"""
+    if not os.environ.get("TOGETHER_API_KEY"):
+        return None
+    return OpenAICompatibleProvider(
+        api_key=os.environ["TOGETHER_API_KEY"],
+        model=os.environ.get("TOGETHER_MODEL", TOGETHER_MODEL),
+        api_url=os.environ.get("TOGETHER_API_URL", TOGETHER_API_URL),
+    )
+
+
+def build_llm_from_env(gemini_api_key=None, model=None, secondary=None):
+    """Gemini primary, hedged to Together.ai when TOGETHER_API_KEY is set"""
+    primary = GeminiProvider(
+        api_key=gemini_api_key or os.environ.get("GEMINI_API_KEY"),
+        model=model or os.environ.get("GEMINI_MODEL", "gemini-2.5-flash"),
+        base_url=os.environ.get("GEMINI_BASE_URL"),
+        name=f"gemini:{model}" if model else "gemini",
+    )
+    return HedgedLLM(
+        primary,
+        secondary if secondary is not None else build_secondary_from_env(),
+        max_hedge_rate=float(os.environ.get("LLM_MAX_HEDGE_RATE", "0.1")),
+    )
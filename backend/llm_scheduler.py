@@ -0,0 +1,242 @@
+"""Priority and fair-share scheduling of LLM and paid-API calls.
+
+Every call to a rate-limited upstream (each LLM provider, Together.ai from
+the investigation agent, Safe Browsing) first takes a token from that
+upstream's QuotaScheduler. Each scheduler is a token bucket refilled at
+``per_minute``, and waiting calls are served in this order:
+
+- priority class first: interactive > batch > speculative. Lower classes only
+  spend tokens above a ``reserve`` kept for interactive calls, so a bulk run
+  can't drain the bucket that user requests are about to need.
+- within a class, weighted fair queuing across clients (start-time fair
+  queuing on virtual finish tags), so one client's large batch doesn't
+  starve other clients. Weights come from LLM_CLIENT_WEIGHTS
+  ("client=weight,...", default 1).
+
+The class and client are taken from the caller's context:
+
+    with request_class("batch", client=job["client"]):
+        ...  # every scheduled call made in here, including nested helpers
+
+Threads don't inherit the context; hand work over with
+``contextvars.copy_context().run`` (as HedgedLLM does).
+
+There is one scheduler per full upstream name, so "gemini:gemini-2.5-flash"
+and "gemini:gemini-2.5-pro" get separate buckets, matching per-model quotas.
+A bucket's rate comes from the most specific of <PROVIDER>_<MODEL>_RPM (e.g.
+GEMINI_GEMINI_2_5_PRO_RPM; non-alphanumerics become "_"), <PROVIDER>_RPM
+(e.g. GEMINI_RPM, TOGETHER_RPM, SAFE_BROWSING_RPM, applied to each of the
+provider's models) and LLM_RPM. 0 turns scheduling off for that upstream.
+Limits apply per process.
+"""
+import heapq
+import itertools
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Condition, Lock
+
+from metrics import LLM_QUEUE_WAIT
+
+PRIORITIES = ("interactive", "batch", "speculative")
+DEFAULT_RPM = {"together": 55, "safe_browsing": 600}
+INTERACTIVE_RESERVE = float(os.environ.get("LLM_INTERACTIVE_RESERVE", "0.2"))  # share of the bucket
+
+_request_class = ContextVar("llm_request_class", default=("interactive", "default"))
+
+
+@contextmanager
+def request_class(priority, client=None):
+    """Run the enclosed calls in ``priority`` on behalf of ``client``"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority class {priority!r}")
+    token = _request_class.set((priority, client or "default"))
+    try:
+        yield
+    finally:
+        _request_class.reset(token)
+
+
+def current_request_class():
+    return _request_class.get()
+
+
+def _parse_weights(spec):
+    weights = {}
+    for item in (spec or "").split(","):
+        client, _, weight = item.partition("=")
+        if client.strip() and weight.strip():
+            weights[client.strip()] = float(weight)
+    return weights
+
+
+class _Waiter:
+    __slots__ = ("priority", "client", "cost", "start_tag", "finish_tag", "seq", "cancelled")
+
+    def __init__(self, priority, client, cost, start_tag, finish_tag, seq):
+        self.priority = priority
+        self.client = client
+        self.cost = cost
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.cancelled = False
+
+
+class QuotaScheduler:
+    def __init__(self, name, per_minute, burst=None, reserve=INTERACTIVE_RESERVE, weights=None):
+        self.name = name
+        self.rate = per_minute / 60
+        self.capacity = burst or max(1.0, per_minute / 6)  # ~10 s worth of calls
+        self.reserve = self.capacity * reserve
+        self.weights = weights or {}
+        self._tokens = self.capacity
+        self._refilled = time.monotonic()
+        self._queues = {priority: [] for priority in PRIORITIES}  # heaps of (finish_tag, seq, waiter)
+        self._virtual = {priority: 0.0 for priority in PRIORITIES}
+        self._last_finish = {}  # (priority, client) -> finish tag of its latest call
+        self._seq = itertools.count()
+        self._cond = Condition()
+        self.granted = {priority: 0 for priority in PRIORITIES}
+        self.wait_seconds = {priority: 0.0 for priority in PRIORITIES}
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _head(self):
+        """The next waiter to serve: best class, lowest finish tag"""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and queue[0][2].cancelled:
+                heapq.heappop(queue)
+            if queue:
+                return queue[0][2]
+        return None
+
+    def _shortfall(self, waiter):
+        """Tokens still missing before ``waiter`` may go"""
+        floor = 0.0 if waiter.priority == "interactive" else min(self.reserve, self.capacity - waiter.cost)
+        return waiter.cost + floor - self._tokens
+
+    def acquire(self, cost=1, timeout=None):
+        """Block until a call of ``cost`` tokens may go. Returns the seconds waited.
+
+        Raises TimeoutError after ``timeout`` seconds without a token.
+        """
+        priority, client = _request_class.get()
+        enqueued = time.monotonic()
+        with self._cond:
+            key = (priority, client)
+            start_tag = max(self._virtual[priority], self._last_finish.get(key, 0.0))
+            finish_tag = start_tag + cost / self.weights.get(client, 1.0)
+            self._last_finish[key] = finish_tag
+            waiter = _Waiter(priority, client, cost, start_tag, finish_tag, next(self._seq))
+            heapq.heappush(self._queues[priority], (finish_tag, waiter.seq, waiter))
+            self._cond.notify_all()  # a higher class may now be ahead of a sleeping head
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = None  # until notified
+                if self._head() is waiter:
+                    shortfall = self._shortfall(waiter)
+                    if shortfall <= 0:
+                        break
+                    wait = shortfall / self.rate
+                if timeout is not None:
+                    left = enqueued + timeout - now
+                    if left <= 0:
+                        waiter.cancelled = True
+                        self._cond.notify_all()
+                        raise TimeoutError(f"No {self.name} quota within {timeout}s")
+                    wait = left if wait is None else min(wait, left)
+                self._cond.wait(timeout=wait)
+            heapq.heappop(self._queues[priority])
+            self._tokens -= cost
+            self._virtual[priority] = waiter.start_tag
+            if len(self._last_finish) > 10000:
+                self._last_finish = {k: v for k, v in self._last_finish.items() if v > self._virtual[k[0]]}
+            waited = time.monotonic() - enqueued
+            self.granted[priority] += 1
+            self.wait_seconds[priority] += waited
+            self._cond.notify_all()
+        LLM_QUEUE_WAIT.labels(scheduler=self.name, priority=priority).observe(waited)
+        return waited
+
+    def depths(self):
+        with self._cond:
+            return {priority: sum(not entry[2].cancelled for entry in queue)
+                    for priority, queue in self._queues.items()}
+
+    def stats(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "per_minute": round(self.rate * 60, 1),
+                "tokens": round(self._tokens, 2),
+                "capacity": round(self.capacity, 2),
+                "reserve": round(self.reserve, 2),
+                "classes": {
+                    priority: {
+                        "queued": sum(not entry[2].cancelled for entry in self._queues[priority]),
+                        "granted": self.granted[priority],
+                        "mean_wait_s": round(self.wait_seconds[priority] / self.granted[priority], 4)
+                        if self.granted[priority] else 0.0,
+                    }
+                    for priority in PRIORITIES
+                },
+            }
+
+
+_schedulers = {}
+_schedulers_lock = Lock()
+
+
+def _env_name(name):
+    return re.sub(r"[^A-Z0-9]+", "_", name.upper()).strip("_")
+
+
+def _rate_for(name):
+    """Requests per minute for ``name``: <PROVIDER>_<MODEL>_RPM, then <PROVIDER>_RPM, then LLM_RPM"""
+    provider = name.split(":", 1)[0]
+    for key in dict.fromkeys((name, provider)):
+        value = os.environ.get(f"{_env_name(key)}_RPM")
+        if value is not None:
+            return float(value)
+    return float(DEFAULT_RPM.get(provider, os.environ.get("LLM_RPM", "600")))
+
+
+def get_scheduler(name):
+    """Process-wide scheduler for the upstream ``name`` (e.g. "gemini:gemini-2.5-pro"), or None if unlimited"""
+    with _schedulers_lock:
+        if name not in _schedulers:
+            per_minute = _rate_for(name)
+            _schedulers[name] = QuotaScheduler(
+                name, per_minute, weights=_parse_weights(os.environ.get("LLM_CLIENT_WEIGHTS"))
+            ) if per_minute > 0 else None
+        return _schedulers[name]
+
+
+def acquire(name, cost=1, timeout=None):
+    """Wait for a token from ``name``'s scheduler; returns the seconds waited (0 when unlimited)"""
+    scheduler = get_scheduler(name)
+    return scheduler.acquire(cost, timeout) if scheduler is not None else 0.0
+
+
+def scheduler_stats():
+    with _schedulers_lock:
+        schedulers = {name: s for name, s in _schedulers.items() if s is not None}
+    return {name: s.stats() for name, s in schedulers.items()}
+
+
+def queue_depths():
+    """Calls waiting per priority class, over all schedulers"""
+    with _schedulers_lock:
+        schedulers = [s for s in _schedulers.values() if s is not None]
+    totals = {priority: 0 for priority in PRIORITIES}
+    for scheduler in schedulers:
+        for priority, depth in scheduler.depths().items():
+            totals[priority] += depth
+    return totals
@@ -0,0 +1,262 @@
+"""In-process metrics: latency histograms and a small Prometheus-style registry.
+
+Metrics are per process; with several uvicorn workers each exposes its own
+/metrics and Prometheus aggregates them.
+"""
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock
+
+# Upper bounds in seconds, Prometheus-style cumulative buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+class LatencyHistogram:
+    """Bucketed latency histogram that also keeps recent samples for percentiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, recent=512):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=recent)
+        self._lock = Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+            else:
+                self.counts[-1] += 1
+            self.count += 1
+            self.sum += seconds
+            self._recent.append(seconds)
+
+    def percentile(self, q, default=None):
+        """q in [0, 1] over the recent window; default if there are no samples"""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return default
+        index = min(len(samples) - 1, int(q * len(samples)))
+        return samples[index]
+
+    def sample_count(self):
+        return len(self._recent)
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets, self.counts):
+                running += count
+                cumulative[str(bound)] = running
+            cumulative["+Inf"] = self.count
+            count, total = self.count, self.sum
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "buckets": cumulative,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        return self.labels() if not self.labelnames else None
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self._default().set(value)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        child = self.labels(**labels)
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def _new_child(self):
+        return LatencyHistogram(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, even if it raises"""
+        child = self.labels(**labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    def _render_child(self, key, child):
+        snapshot = child.snapshot()
+        lines = []
+        for bound, count in snapshot["buckets"].items():
+            le = [("le", "+Inf" if bound == "+Inf" else _format_value(float(bound)))]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(snapshot['sum'])}")
+        lines.append(f"{self.name}_count{labels} {snapshot['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """collect() is called before each render, e.g. to refresh queue-depth gauges"""
+        self._collectors.append(collect)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                from event_log import log_event
+
+                log_event("metrics.collector_failed", level="warning", error=str(e))
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "adlumen_stage_latency_seconds",
+    "Latency of pipeline stages (page fetch, parse, LLM, Safe Browsing, WHOIS, store, tools)",
+    ["stage"],
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "adlumen_cache_requests_total", "Cache lookups by layer and result (hit/miss)", ["layer", "result"]
+)
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "adlumen_rate_limiter_wait_seconds", "Time spent waiting on rate limiters", ["limiter"]
+)
+IN_FLIGHT = REGISTRY.gauge("adlumen_in_flight_requests", "Requests currently being handled", ["endpoint"])
+LLM_TOKENS = REGISTRY.counter("adlumen_llm_tokens_total", "LLM tokens by provider and kind", ["provider", "model", "kind"])
+LLM_ERRORS = REGISTRY.counter("adlumen_llm_errors_total", "Failed LLM calls", ["provider"])
+REQUEST_LATENCY = REGISTRY.histogram(
+    "adlumen_http_request_seconds", "API request latency by route and status", ["endpoint", "status"]
+)
+QUEUE_DEPTH = REGISTRY.gauge("adlumen_queue_depth", "Items waiting in background queues", ["queue"])
+SPECULATIVE_SCANS = REGISTRY.counter(
+    "adlumen_speculative_scans_total", "Speculative link pre-analyses by result (scanned/failed/skipped)", ["result"]
+)
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "adlumen_llm_queue_wait_seconds", "Time LLM and paid-API calls waited for quota, by upstream and priority class",
+    ["scheduler", "priority"],
+)
+LOG_EVENTS_DROPPED = REGISTRY.counter("adlumen_log_events_dropped_total", "Log events dropped because the log queue was full")
@@ -0,0 +1,104 @@
+"""Model tiering: a fast, cheap model screens every URL and only ambiguous
+verdicts are escalated to a stronger model.
+
+The escalation band mirrors the confidence bands in the scam-agent prompt: a
+first-tier fraud_probability inside [low, high] (default 0.25-0.75), a
+confidence_level below ``min_confidence``, or an unparseable reply sends the
+page to the next tier.
+"""
+import os
+from threading import Lock
+
+DEFAULT_TIERS = "gemini-2.5-flash-lite,gemini-2.5-flash"
+
+
+class ModelTier:
+    """One rung of the cascade, with its own counters"""
+
+    def __init__(self, name, provider):
+        self.name = name
+        self.provider = provider
+        self.calls = 0
+        self.escalated = 0
+        self.resolved = 0
+        self.failures = 0
+
+    def stats(self):
+        stats = {
+            "calls": self.calls,
+            "escalated": self.escalated,
+            "resolved": self.resolved,
+            "failures": self.failures,
+            "escalation_rate": round(self.escalated / self.calls, 4) if self.calls else 0.0,
+        }
+        if hasattr(self.provider, "stats"):
+            stats["llm"] = self.provider.stats()
+        return stats
+
+
+class ModelCascade:
+    """Ordered tiers plus the thresholds that decide when to escalate"""
+
+    def __init__(self, tiers, low=0.25, high=0.75, min_confidence=0.6):
+        if not tiers:
+            raise ValueError("ModelCascade needs at least one tier")
+        self.tiers = tiers
+        self.low = low
+        self.high = high
+        self.min_confidence = min_confidence
+        self._lock = Lock()
+
+    def needs_escalation(self, verdict):
+        """True when a raw LLM verdict is too uncertain to stop at this tier"""
+        try:
+            fraud_probability = float(verdict["fraud_probability"])
+            confidence_level = float(verdict["confidence_level"])
+        except (KeyError, TypeError, ValueError):
+            return True
+        if self.low <= fraud_probability <= self.high:
+            return True
+        return confidence_level < self.min_confidence
+
+    def record(self, tier_index, verdict, failed=False):
+        """Count a tier's answer and return True if the page moves up a tier"""
+        tier = self.tiers[tier_index]
+        is_last = tier_index == len(self.tiers) - 1
+        escalate = not is_last and (failed or self.needs_escalation(verdict))
+        with self._lock:
+            tier.calls += 1
+            if failed:
+                tier.failures += 1
+            if escalate:
+                tier.escalated += 1
+            else:
+                tier.resolved += 1
+        return escalate
+
+    def warm_up(self, system=None):
+        for tier in self.tiers:
+            if hasattr(tier.provider, "warm_up"):
+                tier.provider.warm_up(system)
+
+    def stats(self):
+        return {
+            "band": [self.low, self.high],
+            "min_confidence": self.min_confidence,
+            "tiers": {tier.name: tier.stats() for tier in self.tiers},
+        }
+
+
+def build_cascade_from_env(gemini_api_key=None):
+    """Tiers from LLM_TIERS (comma-separated Gemini models, cheapest first)"""
+    from llm_providers import build_llm_from_env, build_secondary_from_env
+
+    models = [m.strip() for m in os.environ.get("LLM_TIERS", DEFAULT_TIERS).split(",") if m.strip()]
+    low, high = (float(x) for x in os.environ.get("ESCALATE_BAND", "0.25,0.75").split(","))
+    secondary = build_secondary_from_env()  # shared so its latency histogram spans all tiers
+    tiers = [ModelTier(model, build_llm_from_env(gemini_api_key, model=model, secondary=secondary))
+             for model in models]
+    return ModelCascade(
+        tiers,
+        low=low,
+        high=high,
+        min_confidence=float(os.environ.get("ESCALATE_MIN_CONFIDENCE", "0.6")),
+    )
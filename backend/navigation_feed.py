@@ -0,0 +1,176 @@
+"""One WebSocket per client streaming navigations in and verdicts out.
+
+The client sends ``{"url": ..., "tab": <optional str or int id>}`` for each
+navigation and receives, per URL:
+
+- ``{"type": "verdict", "url": ..., "cached": bool, <the /analyze response>}``
+- ``{"type": "error", "url": ..., "status": ..., "detail": ...}``, also for
+  frames that aren't a JSON object (status 400); the session stays open
+- ``{"type": "superseded", "url": ...}`` when the same tab navigated again
+  before the earlier URL was analyzed (redirect chains, rapid clicks)
+
+Per session, a URL that was already answered gets its cached verdict
+immediately, and a URL that is already queued or being analyzed isn't queued
+twice (the one verdict answers both). Queued navigations wait
+``coalesce_window`` seconds so a burst from one tab collapses into its last
+URL. At most ``concurrency`` analyses run per session. When ``max_pending``
+navigations are queued the session stops reading from the socket, so a
+flooding client is slowed down by TCP flow control instead of growing
+server-side queues.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from event_log import log_event
+from metrics import CACHE_REQUESTS
+from url_utils import canonicalize_url
+
+
+class NavigationSession:
+    def __init__(self, websocket: WebSocket, analyze, max_pending=32, concurrency=2, coalesce_window=0.05,
+                 cache_size=500):
+        self.websocket = websocket
+        self.analyze = analyze  # blocking url -> verdict dict, raises HTTPException
+        self.max_pending = max_pending
+        self.concurrency = concurrency
+        self.coalesce_window = coalesce_window
+        self.cache_size = cache_size
+        self._pending = OrderedDict()  # tab (or URL key) -> (key, url, queued_at)
+        self._inflight = set()  # URL keys being analyzed
+        self._verdicts = OrderedDict()  # URL key -> verdict, least recently used first
+        self._cond = asyncio.Condition()
+        self._send_lock = asyncio.Lock()
+        self.received = 0
+        self.deduped = 0
+        self.superseded = 0
+        self.analyzed = 0
+        self.errors = 0
+
+    async def run(self):
+        await self.websocket.accept()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        try:
+            await self._read()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            log_event("navigation.session_closed", **self.stats())
+
+    async def _send(self, message):
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def _receive(self):
+        """Next frame as a JSON value, or None when it isn't valid JSON"""
+        frame = await self.websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(frame.get("code", 1000))
+        text = frame.get("text")
+        if text is None:
+            text = (frame.get("bytes") or b"").decode("utf-8", "replace")
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    async def _read(self):
+        while True:
+            message = await self._receive()
+            self.received += 1
+            if not isinstance(message, dict):
+                await self._send({"type": "error", "url": "", "status": 400,
+                                  "detail": "Expected a JSON object with a url."})
+                continue
+            url = str(message.get("url") or "").strip()
+            if not url.startswith(("http://", "https://")):
+                await self._send({"type": "error", "url": url, "status": 400, "detail": "Expected an http(s) URL."})
+                continue
+            try:
+                key = canonicalize_url(url)
+            except ValueError:
+                await self._send({"type": "error", "url": url, "status": 400, "detail": "Malformed URL."})
+                continue
+
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+                self.deduped += 1
+                CACHE_REQUESTS.labels(layer="navigation_session", result="hit").inc()
+                await self._send(dict(verdict, type="verdict", url=url, cached=True))
+                continue
+            CACHE_REQUESTS.labels(layer="navigation_session", result="miss").inc()
+
+            # Queue slot: the tab when it's a usable id, else the URL itself
+            tab = message.get("tab")
+            if isinstance(tab, (str, int)) and not isinstance(tab, bool):
+                slot = ("tab", tab)
+            else:
+                slot = ("url", key)
+            superseded = None
+            async with self._cond:
+                if key in self._inflight or any(queued[0] == key for queued in self._pending.values()):
+                    self.deduped += 1
+                    continue
+                # Backpressure: stop reading the socket until a worker frees a slot
+                while slot not in self._pending and len(self._pending) >= self.max_pending:
+                    await self._cond.wait()
+                if slot in self._pending:
+                    superseded = self._pending[slot][1]
+                    self.superseded += 1
+                self._pending[slot] = (key, url, time.monotonic())
+                self._cond.notify_all()
+            if superseded is not None:
+                await self._send({"type": "superseded", "url": superseded})
+
+    async def _take(self):
+        """Oldest queued navigation once it has sat out the coalescing window"""
+        async with self._cond:
+            while True:
+                while not self._pending:
+                    await self._cond.wait()
+                slot, (key, url, queued_at) = next(iter(self._pending.items()))
+                wait = queued_at + self.coalesce_window - time.monotonic()
+                if wait <= 0:
+                    del self._pending[slot]
+                    self._inflight.add(key)
+                    self._cond.notify_all()
+                    return key, url
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _worker(self):
+        while True:
+            key, url = await self._take()
+            try:
+                verdict = await run_in_threadpool(self.analyze, url)
+            except HTTPException as e:
+                self.errors += 1
+                await self._send({"type": "error", "url": url, "status": e.status_code, "detail": e.detail})
+                continue
+            finally:
+                async with self._cond:
+                    self._inflight.discard(key)
+            self.analyzed += 1
+            self._verdicts[key] = verdict
+            if len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+            await self._send(dict(verdict, type="verdict", url=url, cached=False))
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "deduped": self.deduped,
+            "superseded": self.superseded,
+            "analyzed": self.analyzed,
+            "errors": self.errors,
+        }
@@ -0,0 +1,186 @@
+"""Speculative pre-analysis of the outbound links of recently analyzed pages.
+
+Users often click through from a page they just checked. After each
+interactive analysis, the page's top external links (one per site, up to
+``links_per_page``) are queued, newest pages first. One background thread
+analyzes them through the normal pipeline, which fills the verdict cache, so
+the click-through is answered from the cache.
+
+Speculative work only uses its own quota slice (``per_minute`` analyses in
+any 60 s window). It never starts while an interactive analysis is running,
+or within ``idle_grace`` seconds after one, so interactive traffic always
+goes first. An analysis that has already started isn't interrupted.
+
+The hit rate is the share of interactive analyses served from the cache
+with a verdict that speculative work produced.
+"""
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from threading import Condition, Thread
+from urllib.parse import urljoin
+
+from event_log import log_event
+from metrics import CACHE_REQUESTS, SPECULATIVE_SCANS
+from url_utils import extract_host, registrable_domain
+
+
+def external_links(soup, page_url, limit=10):
+    """Absolute http(s) links to other sites, first link per host, in page order"""
+    page_domain = registrable_domain(extract_host(page_url))
+    links, hosts = [], set()
+    for anchor in soup.find_all("a", href=True):
+        href = urljoin(page_url, anchor["href"].strip())
+        if not href.startswith(("http://", "https://")):
+            continue
+        host = extract_host(href)
+        if not host or host in hosts or registrable_domain(host) == page_domain:
+            continue
+        hosts.add(host)
+        links.append(href.split("#", 1)[0])
+        if len(links) >= limit:
+            break
+    return links
+
+
+class SpeculativeScanner:
+    def __init__(self, analyze, is_cached, per_minute=6, links_per_page=3, max_queue=200, idle_grace=0.5,
+                 remember=10000):
+        self.analyze = analyze  # blocking url -> verdict, caching the result
+        self.is_cached = is_cached  # url -> bool
+        self.per_minute = per_minute
+        self.links_per_page = links_per_page
+        self.idle_grace = idle_grace
+        self.remember = remember
+        self._queue = deque(maxlen=max_queue)  # oldest pages' links fall off the end
+        self._speculated = OrderedDict()  # url -> was it requested since, bounded by ``remember``
+        self._started = deque()  # start times inside the quota window
+        self._interactive = 0
+        self._last_interactive = 0.0
+        self._cond = Condition()
+        self._closed = False
+        self.offered = 0
+        self.scanned = 0
+        self.failed = 0
+        self.skipped = 0
+        self.interactive_requests = 0
+        self.hits = 0
+        self.useful = 0  # speculated URLs requested at least once
+        self._thread = Thread(target=self._run, name="speculative-scanner", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def offer(self, page_url, links):
+        """Queue the top ``links`` of an interactively analyzed page"""
+        with self._cond:
+            fresh = [url for url in links if url not in self._speculated and url not in self._queue]
+            fresh = fresh[:self.links_per_page]
+            # Newest page first: its links are the likeliest next clicks
+            self._queue.extendleft(reversed(fresh))
+            self.offered += len(fresh)
+            if fresh:
+                self._cond.notify_all()
+
+    @contextmanager
+    def interactive(self):
+        """Wrap an interactive analysis; speculative work waits while any is running"""
+        with self._cond:
+            self._interactive += 1
+            self.interactive_requests += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._interactive -= 1
+                self._last_interactive = time.monotonic()
+                self._cond.notify_all()
+
+    def record_cache_hit(self, url):
+        """An interactive request was served from the cache; count it if speculation put it there"""
+        with self._cond:
+            hit = url in self._speculated
+            if hit:
+                self.hits += 1
+                if not self._speculated[url]:
+                    self._speculated[url] = True
+                    self.useful += 1
+        CACHE_REQUESTS.labels(layer="speculative", result="hit" if hit else "miss").inc()
+
+    def _wait_seconds(self, now):
+        """0 when a speculative analysis may start now, else how long to wait"""
+        if not self._queue:
+            return None
+        if self._interactive:
+            return None  # woken when the interactive request finishes
+        wait = self._last_interactive + self.idle_grace - now
+        while self._started and self._started[0] <= now - 60:
+            self._started.popleft()
+        if len(self._started) >= self.per_minute:
+            wait = max(wait, self._started[0] + 60 - now)
+        return max(wait, 0)
+
+    def _take(self):
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                wait = self._wait_seconds(now)
+                if wait == 0:
+                    return self._queue.popleft()
+                self._cond.wait(timeout=wait)
+            return None
+
+    def _run(self):
+        while True:
+            url = self._take()
+            if url is None:
+                return
+            try:
+                if self.is_cached(url):
+                    self.skipped += 1
+                    SPECULATIVE_SCANS.labels(result="skipped").inc()
+                    continue
+            except Exception as e:
+                log_event("speculative.cache_check_failed", level="warning", url=url, error=str(e))
+                continue
+            with self._cond:
+                self._started.append(time.monotonic())
+            try:
+                self.analyze(url)
+            except Exception as e:
+                self.failed += 1
+                SPECULATIVE_SCANS.labels(result="failed").inc()
+                log_event("speculative.failed", level="debug", url=url, error=str(e))
+                continue
+            with self._cond:
+                self.scanned += 1
+                self._speculated[url] = False
+                if len(self._speculated) > self.remember:
+                    self._speculated.popitem(last=False)
+            SPECULATIVE_SCANS.labels(result="scanned").inc()
+
+    def depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def close(self, timeout=5):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "offered": self.offered,
+                "scanned": self.scanned,
+                "failed": self.failed,
+                "skipped_cached": self.skipped,
+                "per_minute": self.per_minute,
+                "interactive_requests": self.interactive_requests,
+                "speculative_hits": self.hits,
+                "hit_rate": round(self.hits / self.interactive_requests, 4) if self.interactive_requests else 0.0,
+                "precision": round(self.useful / self.scanned, 4) if self.scanned else 0.0,
+            }
@@ -0,0 +1,157 @@
+"""Lightweight span tracing for investigations.
+
+    with start_trace("investigation", url=url) as root:
+        with span("tool:domain_analysis"):
+            with span("whois"):
+                ...
+    result["trace"] = root.to_dict()
+
+The active span lives in a ContextVar so nested ``span`` calls attach to the
+right parent. Outside a trace ``span`` is a no-op (it yields None). Work handed
+to another thread only joins the trace if run under ``contextvars.copy_context()``.
+
+critical_path and hotspots turn saved trace dicts into reports (see
+olive_agents_test/trace_report.py).
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "wall_start", "children", "error")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.end = None
+        self.children = []
+        self.error = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin=None):
+        """Nested dict with start offsets relative to the root span, in ms"""
+        data = {"name": self.name}
+        if origin is None:
+            origin = self.start
+            data["started_at"] = round(self.wall_start, 3)
+        data["start_ms"] = round((self.start - origin) * 1000, 3)
+        data["duration_ms"] = round(self.duration * 1000, 3)
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+
+@contextmanager
+def _activate(current):
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_trace(name, **attrs):
+    """Root span; nested under the current span if a trace is already active"""
+    root = Span(name, attrs)
+    parent = _current_span.get()
+    if parent is not None:
+        parent.children.append(root)
+    with _activate(root):
+        yield root
+
+
+@contextmanager
+def span(name, **attrs):
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attrs)
+    parent.children.append(child)
+    with _activate(child):
+        yield child
+
+
+def current_span():
+    return _current_span.get()
+
+
+def _end_ms(node):
+    return node["start_ms"] + node["duration_ms"]
+
+
+def critical_path(node, depth=0):
+    """[(depth, span dict)] along the chain of spans that determined the end time.
+
+    Walks back from the span's end: the child finishing last, then the child
+    finishing last before that one started, and so on, recursing into each.
+    """
+    path = [(depth, node)]
+    chain = []
+    cursor = _end_ms(node)
+    for child in sorted(node.get("children", []), key=_end_ms, reverse=True):
+        if _end_ms(child) <= cursor + 0.001:
+            chain.append(child)
+            cursor = child["start_ms"]
+    for child in reversed(chain):
+        path.extend(critical_path(child, depth + 1))
+    return path
+
+
+def self_time_ms(node):
+    """Duration not covered by child spans (children may overlap, so clamp)"""
+    return max(0.0, node["duration_ms"] - sum(child["duration_ms"] for child in node.get("children", [])))
+
+
+def hotspots(traces):
+    """Aggregate span names across traces, sorted by total self time"""
+    totals = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "self_ms": 0.0, "durations": [], "errors": 0})
+
+    def visit(node):
+        entry = totals[node["name"]]
+        entry["count"] += 1
+        entry["total_ms"] += node["duration_ms"]
+        entry["self_ms"] += self_time_ms(node)
+        entry["durations"].append(node["duration_ms"])
+        entry["errors"] += bool(node.get("error"))
+        for child in node.get("children", []):
+            visit(child)
+
+    for trace in traces:
+        visit(trace)
+
+    wall_ms = sum(trace["duration_ms"] for trace in traces) or 1.0
+    report = []
+    for name, entry in totals.items():
+        durations = sorted(entry.pop("durations"))
+        report.append({
+            "name": name,
+            **entry,
+            "total_ms": round(entry["total_ms"], 1),
+            "self_ms": round(entry["self_ms"], 1),
+            "self_share": round(entry["self_ms"] / wall_ms, 4),
+            "p50_ms": durations[len(durations) // 2],
+            "p95_ms": durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+        })
+    return sorted(report, key=lambda row: row["self_ms"], reverse=True)
@@ -0,0 +1,105 @@
+"""Small URL / hostname helpers shared by the backend and the investigation agent."""
+import posixpath
+import re
+import string
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
+
+# Second-level public suffixes we see often enough to special-case.
+# Not a full public-suffix list, just enough to avoid treating "co.uk" as a brand.
+MULTI_PART_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "com.au", "net.au", "org.au",
+    "co.nz", "co.jp", "ne.jp", "co.kr", "co.in", "com.br", "com.cn",
+    "com.mx", "com.tr", "com.sg", "com.hk", "co.za", "com.ar",
+}
+
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "yclid", "_ga", "igshid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+UNRESERVED = frozenset(string.ascii_letters + string.digits + "-._~")
+_PERCENT_ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+_STRAY_PERCENT = re.compile(r"%(?![0-9A-Fa-f]{2})")
+
+
+def extract_host(url):
+    """Lower-cased hostname of a URL, without port or credentials"""
+    if "://" not in url:
+        url = "http://" + url
+    return (urlparse(url).hostname or "").rstrip(".").lower()
+
+
+def registrable_domain(host):
+    """Best-effort registrable domain, e.g. 'login.paypal.co.uk' -> 'paypal.co.uk'"""
+    labels = [label for label in host.lower().rstrip(".").split(".") if label]
+    if len(labels) <= 2:
+        return ".".join(labels)
+    if ".".join(labels[-2:]) in MULTI_PART_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+_psl_extractor = None
+
+
+def public_suffix_domain(host):
+    """Registrable domain per the Public Suffix List, private section included.
+
+    'login.yahoo.co.id' -> 'yahoo.co.id', 'foo.github.io' -> 'foo.github.io'.
+    Returns '' when ``host`` is itself a public suffix ('co.id', 'github.io'),
+    an IP address or has no known suffix. Uses the PSL snapshot bundled with
+    tldextract, so it never goes to the network.
+    """
+    global _psl_extractor
+    if _psl_extractor is None:
+        import tldextract
+
+        _psl_extractor = tldextract.TLDExtract(suffix_list_urls=(), include_psl_private_domains=True)
+    parts = _psl_extractor(host.lower().rstrip("."))
+    return f"{parts.domain}.{parts.suffix}" if parts.domain and parts.suffix else ""
+
+
+def registrable_label(host):
+    """The brand-bearing label of a host, e.g. 'login.paypal.co.uk' -> 'paypal'"""
+    return registrable_domain(host).split(".")[0]
+
+
+def _normalize_escapes(path):
+    """Decode escaped unreserved characters and upper-case the rest (RFC 3986 6.2.2).
+
+    Reserved characters stay encoded: '%2F' is data, not a path separator.
+    """
+    def replace(match):
+        char = chr(int(match.group(1), 16))
+        return char if char in UNRESERVED else match.group(0).upper()
+    return _PERCENT_ESCAPE.sub(replace, _STRAY_PERCENT.sub("%25", path))
+
+
+def canonicalize_url(url):
+    """Normalize a URL so trivially different spellings dedupe to one key.
+
+    Adds a missing scheme, lower-cases scheme and host,
+    drops default ports, fragments and tracking parameters (utm_*, fbclid, ...),
+    resolves dot segments and sorts the query string. Percent-escapes of
+    unreserved characters are decoded, other escapes are kept (upper-cased),
+    and IPv6 hosts keep their brackets.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").rstrip(".").lower()
+    netloc = f"[{host}]" if ":" in host else host  # IPv6 literal
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parsed.port}"
+
+    path = _normalize_escapes(parsed.path) or "/"
+    trailing_slash = path.endswith("/")
+    path = posixpath.normpath(path)
+    if path in (".", "//"):
+        path = "/"
+    if trailing_slash and not path.endswith("/"):
+        path += "/"
+    path = quote(path, safe="/:@!$&'()*+,;=-._~%")
+
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS]
+    return urlunparse((scheme, netloc, path, "", urlencode(sorted(query)), ""))
@@ -0,0 +1,189 @@
+"""Pluggable storage for cached verdicts.
+
+Two backends share one small interface (documents keyed by ``_id``, put
+replaces the whole document, optional TTL):
+
+- MongoVerdictStore: the original MongoDB collection
+- SQLiteVerdictStore: embedded SQLite in WAL mode, for single-node deployments
+  where every cache read would otherwise be a network round trip
+
+Pick one with VERDICT_STORE=mongo|sqlite (see open_verdict_store).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+
+class VerdictStore:
+    """Interface shared by all backends"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl  # seconds; None or 0 = never expire
+
+    def _expires_at(self, now=None):
+        return (now or time.time()) + self.ttl if self.ttl else None
+
+    def get(self, doc_id):
+        """Document for doc_id, or None if missing or expired"""
+        raise NotImplementedError
+
+    def put(self, doc):
+        self.put_many([doc])
+
+    def put_many(self, docs):
+        """Upsert documents (each must carry ``_id``), replacing existing ones"""
+        raise NotImplementedError
+
+    def delete(self, doc_id):
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """Drop expired documents; returns how many were removed (if known)"""
+        return 0
+
+    def close(self):
+        pass
+
+
+class MongoVerdictStore(VerdictStore):
+    def __init__(self, mongo_url=None, db_name="ai_analysis_db", collection_name="results", ttl=None, collection=None):
+        super().__init__(ttl)
+        if collection is None:
+            from pymongo import MongoClient
+
+            self.client = MongoClient(mongo_url)
+            collection = self.client[db_name][collection_name]
+        else:
+            self.client = None
+        self.collection = collection
+        if self.ttl:
+            # Mongo's TTL monitor deletes documents once expires_at has passed
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def get(self, doc_id):
+        doc = self.collection.find_one({"_id": doc_id})
+        if doc is None:
+            return None
+        expires_at = doc.pop("expires_at", None)
+        # The TTL monitor only runs once a minute, so check expiry ourselves too
+        if expires_at is not None:
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at <= datetime.now(timezone.utc):
+                return None
+        return doc
+
+    def put_many(self, docs):
+        from pymongo import ReplaceOne
+
+        operations = []
+        for doc in docs:
+            doc = dict(doc)
+            if self.ttl:
+                doc["expires_at"] = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+            operations.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def delete(self, doc_id):
+        self.collection.delete_one({"_id": doc_id})
+
+    def purge_expired(self):
+        if not self.ttl:
+            return 0
+        return self.collection.delete_many({"expires_at": {"$lte": datetime.now(timezone.utc)}}).deleted_count
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+
+class SQLiteVerdictStore(VerdictStore):
+    """SQLite in WAL mode: concurrent readers, one writer at a time across processes"""
+
+    PURGE_EVERY = 1000  # writes between opportunistic purges of expired rows
+
+    def __init__(self, path="verdicts.db", ttl=None, busy_timeout_ms=5000):
+        super().__init__(ttl)
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                " id TEXT PRIMARY KEY,"
+                " doc TEXT NOT NULL,"
+                " expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS verdicts_expires_at ON verdicts (expires_at)")
+
+    def _conn(self):
+        # One connection per thread, reopened after fork (connections can't cross processes)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, doc_id):
+        row = self._conn().execute(
+            "SELECT doc FROM verdicts WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (doc_id, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, docs):
+        now = time.time()
+        rows = [(doc["_id"], json.dumps(doc, default=str), self._expires_at(now)) for doc in docs]
+        if not rows:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO verdicts (id, doc, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET doc = excluded.doc, expires_at = excluded.expires_at",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._writes += len(rows)
+        if self.ttl and self._writes >= self.PURGE_EVERY:
+            self._writes = 0
+            self.purge_expired()
+
+    def delete(self, doc_id):
+        self._conn().execute("DELETE FROM verdicts WHERE id = ?", (doc_id,))
+
+    def purge_expired(self):
+        return self._conn().execute(
+            "DELETE FROM verdicts WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_verdict_store(backend=None):
+    """Build the store selected by VERDICT_STORE (default: mongo)"""
+    backend = backend or os.environ.get("VERDICT_STORE", "mongo")
+    ttl = int(os.environ.get("VERDICT_TTL", "0")) or None
+    if backend == "sqlite":
+        return SQLiteVerdictStore(os.environ.get("SQLITE_PATH", "verdicts.db"), ttl=ttl)
+    if backend == "mongo":
+        return MongoVerdictStore(os.environ.get("MONGO_URL"), ttl=ttl)
+    raise ValueError(f"Unknown VERDICT_STORE: {backend}")
@@ -0,0 +1,122 @@
+"""Shared conformance checks for VerdictStore backends.
+
+Runs the same checks against SQLite (always) and MongoDB (when MONGO_URL is set):
+
+    python verdict_store_check.py
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from multiprocessing import Process
+
+from verdict_store import MongoVerdictStore, SQLiteVerdictStore
+
+
+def check_roundtrip(make_store):
+    store = make_store(None)
+    doc_id = f"https://{uuid.uuid4().hex}.test/"
+    assert store.get(doc_id) is None
+    store.put({"_id": doc_id, "fraud_probability": 0.4, "confidence_level": 0.8, "justification": "a"})
+    doc = store.get(doc_id)
+    assert doc["_id"] == doc_id and doc["fraud_probability"] == 0.4, doc
+    store.delete(doc_id)
+    assert store.get(doc_id) is None
+
+
+def check_put_replaces(make_store):
+    store = make_store(None)
+    doc_id = f"https://{uuid.uuid4().hex}.test/"
+    store.put({"_id": doc_id, "fraud_probability": 0.1, "extra": True})
+    store.put({"_id": doc_id, "fraud_probability": 0.9})
+    doc = store.get(doc_id)
+    assert doc["fraud_probability"] == 0.9 and "extra" not in doc, doc
+    store.delete(doc_id)
+
+
+def check_put_many(make_store):
+    store = make_store(None)
+    docs = [{"_id": f"https://{uuid.uuid4().hex}.test/", "n": i} for i in range(50)]
+    store.put_many(docs)
+    store.put_many([])
+    for doc in docs:
+        assert store.get(doc["_id"])["n"] == doc["n"]
+        store.delete(doc["_id"])
+
+
+def check_ttl(make_store):
+    store = make_store(1)
+    doc_id = f"https://{uuid.uuid4().hex}.test/"
+    store.put({"_id": doc_id, "fraud_probability": 0.5})
+    assert store.get(doc_id) is not None
+    time.sleep(1.2)
+    assert store.get(doc_id) is None, "expired doc still readable"
+    store.purge_expired()
+
+
+def _writer(path, prefix, count):
+    store = SQLiteVerdictStore(path)
+    for i in range(count):
+        store.put({"_id": f"{prefix}-{i}", "n": i})
+
+
+def check_sqlite_multiprocess(path):
+    processes = [Process(target=_writer, args=(path, f"p{n}", 200)) for n in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    store = SQLiteVerdictStore(path)
+    for n in range(4):
+        assert store.get(f"p{n}-199")["n"] == 199
+
+
+CHECKS = [check_roundtrip, check_put_replaces, check_put_many, check_ttl]
+
+
+def run(name, make_store):
+    failures = 0
+    for check in CHECKS:
+        try:
+            check(make_store)
+            print(f"  ok    {name}.{check.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"  FAIL  {name}.{check.__name__}: {e!r}")
+    return failures
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "verdicts.db")
+        failures += run("sqlite", lambda ttl: SQLiteVerdictStore(path, ttl=ttl))
+        try:
+            check_sqlite_multiprocess(path)
+            print("  ok    sqlite.check_sqlite_multiprocess")
+        except Exception as e:
+            failures += 1
+            print(f"  FAIL  sqlite.check_sqlite_multiprocess: {e!r}")
+
+    if os.environ.get("MONGO_URL"):
+        collection = f"verdict_store_check_{uuid.uuid4().hex[:8]}"
+        stores = []
+
+        def make_mongo(ttl):
+            store = MongoVerdictStore(os.environ["MONGO_URL"], collection_name=collection, ttl=ttl)
+            stores.append(store)
+            return store
+
+        failures += run("mongo", make_mongo)
+        if stores:
+            stores[0].collection.drop()
+    else:
+        print("  skip  mongo (MONGO_URL not set)")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
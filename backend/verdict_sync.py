@@ -0,0 +1,261 @@
+"""Hash-prefix sync of known verdicts, so clients can check URLs locally.
+
+Known-bad and known-good URLs and hosts are published as 4-byte prefixes of
+SHA-256 hashes of their *expressions*, in the style of the Safe Browsing
+Update API. Expressions are namespaced so a URL entry can never match as a
+host entry (the site root "weebly.com/" is not "all of weebly.com"):
+
+- "url:" + a canonical URL without its scheme (see url_utils.canonicalize_url),
+  e.g. "url:login.evil.test/verify?id=1"
+- "host:" + a hostname, matching that host and its subdomains, e.g. "host:evil.test"
+
+Host entries only come from curated sources (the threat-feed blocklist) and
+only in the bad list; analysis verdicts are single pages and are published
+as URL entries only.
+
+A client keeps the prefix sets and, for each navigation, hashes the URL's
+expressions (url_expressions) and looks the prefixes up locally. Only on a
+prefix hit does it send the prefix (never the URL) to ``/sync/confirm`` and
+compare the returned full hashes. An empty result or a missing prefix means
+"unknown", in which case the client falls back to ``/analyze``.
+
+Every change bumps a version. ``/sync/prefixes?since=N`` returns additions
+and removals since version N, or the full sets when N is 0 or older than
+the retained history (``"full": true``). Each response carries a SHA-256
+checksum of every list's sorted prefixes. A client whose checksum doesn't
+match after applying a delta should re-fetch with since=0.
+
+Entries are stored per source ("blocklist", "verdicts", ...), so replacing
+one source's contents doesn't disturb the others.
+"""
+import base64
+import hashlib
+import os
+import sqlite3
+import threading
+
+from url_utils import canonicalize_url, extract_host
+
+PREFIX_LEN = 4
+EXPRESSION_FORMAT = 2  # 1: unprefixed "<url>" / "<host>/"; 2: "url:" / "host:" namespaces
+LISTS = ("bad", "good")
+HISTORY_VERSIONS = 1000  # deltas reach back this many versions; older clients get a full update
+CONFIRM_CACHE_SECONDS = 300
+
+# Analysis verdicts published as known-bad / known-good
+BAD_THRESHOLD = float(os.environ.get("SYNC_BAD_THRESHOLD", "0.75"))
+GOOD_THRESHOLD = float(os.environ.get("SYNC_GOOD_THRESHOLD", "0.2"))
+MIN_CONFIDENCE = float(os.environ.get("SYNC_MIN_CONFIDENCE", "0.7"))
+
+
+def url_expressions(url):
+    """Expressions to look up for ``url``: the canonical URL, then the host and each parent host"""
+    canonical = canonicalize_url(url).split("://", 1)[1]
+    labels = extract_host(url).split(".")
+    expressions = ["url:" + canonical] + ["host:" + ".".join(labels[i:]) for i in range(len(labels) - 1)]
+    return list(dict.fromkeys(expressions))
+
+
+def full_hash(expression):
+    return hashlib.sha256(expression.encode("utf-8")).digest()
+
+
+def encode_prefixes(prefixes):
+    return base64.b64encode(b"".join(prefixes)).decode("ascii")
+
+
+def prefixes_checksum(prefixes):
+    return hashlib.sha256(b"".join(sorted(prefixes))).hexdigest()
+
+
+def verdict_list(fraud_probability, confidence_level):
+    """'bad', 'good' or None for an analysis verdict"""
+    if confidence_level < MIN_CONFIDENCE:
+        return None
+    if fraud_probability >= BAD_THRESHOLD:
+        return "bad"
+    if fraud_probability <= GOOD_THRESHOLD:
+        return "good"
+    return None
+
+
+class VerdictSyncStore:
+    """Versioned full hashes in SQLite (WAL), shared by API worker processes"""
+
+    def __init__(self, path=None, busy_timeout_ms=5000):
+        self.path = path or os.environ.get("VERDICT_SYNC_DB", "verdict_sync.db")
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._full_cache = (None, None)  # (version, response) for since=0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sync_entries ("
+            " list TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " full_hash BLOB NOT NULL,"
+            " prefix BLOB NOT NULL,"
+            " added INTEGER NOT NULL,"
+            " removed INTEGER,"  # NULL while live
+            " PRIMARY KEY (list, source, full_hash)) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sync_entries_prefix ON sync_entries (prefix)")
+        conn.execute("CREATE INDEX IF NOT EXISTS sync_entries_added ON sync_entries (added)")
+        conn.execute("CREATE INDEX IF NOT EXISTS sync_entries_removed ON sync_entries (removed)")
+        conn.execute("CREATE TABLE IF NOT EXISTS sync_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO sync_meta (name, value) VALUES ('version', 0), ('min_version', 0)")
+        row = conn.execute("SELECT value FROM sync_meta WHERE name = 'format'").fetchone()
+        if row is None or row[0] < EXPRESSION_FORMAT:
+            self._reset_format(conn)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _reset_format(self, conn):
+        """Drop entries hashed in an older expression format and force every client to a full update"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM sync_meta WHERE name = 'format'").fetchone()
+            if row is None or row[0] < EXPRESSION_FORMAT:
+                version = self._meta(conn, "version") + 1
+                conn.execute("DELETE FROM sync_entries")
+                conn.execute("UPDATE sync_meta SET value = ? WHERE name IN ('version', 'min_version')", (version,))
+                conn.execute("INSERT OR REPLACE INTO sync_meta (name, value) VALUES ('format', ?)",
+                             (EXPRESSION_FORMAT,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _meta(self, conn, name):
+        return conn.execute("SELECT value FROM sync_meta WHERE name = ?", (name,)).fetchone()[0]
+
+    def version(self):
+        return self._meta(self._conn(), "version")
+
+    def _apply(self, additions, removals):
+        """Apply [(list, source, hash)] changes as one new version; returns the current version"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._meta(conn, "version")
+            # Re-check under the write lock: another process may have made the same change
+            additions = [(name, source, h) for name, source, h in additions if not self._live(conn, name, source, h)]
+            removals = [(name, source, h) for name, source, h in removals if self._live(conn, name, source, h)]
+            if not additions and not removals:
+                conn.execute("COMMIT")
+                return version
+            version += 1
+            conn.executemany(
+                "INSERT INTO sync_entries (list, source, full_hash, prefix, added, removed) VALUES (?, ?, ?, ?, ?, NULL)"
+                " ON CONFLICT (list, source, full_hash) DO UPDATE SET added = excluded.added, removed = NULL",
+                [(name, source, h, h[:PREFIX_LEN], version) for name, source, h in additions],
+            )
+            conn.executemany(
+                "UPDATE sync_entries SET removed = ? WHERE list = ? AND source = ? AND full_hash = ?",
+                [(version, name, source, h) for name, source, h in removals],
+            )
+            conn.execute("UPDATE sync_meta SET value = ? WHERE name = 'version'", (version,))
+            if version - self._meta(conn, "min_version") > 2 * HISTORY_VERSIONS:
+                min_version = version - HISTORY_VERSIONS
+                conn.execute("DELETE FROM sync_entries WHERE removed IS NOT NULL AND removed <= ?", (min_version,))
+                conn.execute("UPDATE sync_meta SET value = ? WHERE name = 'min_version'", (min_version,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def _live(self, conn, name, source, h):
+        return conn.execute(
+            "SELECT 1 FROM sync_entries WHERE list = ? AND source = ? AND full_hash = ? AND removed IS NULL",
+            (name, source, h),
+        ).fetchone() is not None
+
+    def replace_source(self, name, source, expressions):
+        """Make ``expressions`` the complete contents of ``source`` in list ``name``"""
+        wanted = {full_hash(expression) for expression in expressions}
+        live = {row[0] for row in self._conn().execute(
+            "SELECT full_hash FROM sync_entries WHERE list = ? AND source = ? AND removed IS NULL", (name, source)
+        )}
+        return self._apply([(name, source, h) for h in wanted - live], [(name, source, h) for h in live - wanted])
+
+    def set_verdict(self, url, name, source="verdicts"):
+        """Publish ``url`` in list ``name`` (or in no list when None), leaving the other lists.
+
+        Only the page's own "url:" expression is published, never its host.
+        """
+        h = full_hash(url_expressions(url)[0])
+        additions = [(name, source, h)] if name else []
+        removals = [(other, source, h) for other in LISTS if other != name]
+        return self._apply(additions, removals)
+
+    def update(self, since=0):
+        """Prefix update for a client at version ``since``"""
+        conn = self._conn()
+        version = self._meta(conn, "version")
+        if since <= 0 or since < self._meta(conn, "min_version") or since > version:
+            return self._full_update(conn, version)
+        lists = {}
+        for name in LISTS:
+            rows = conn.execute(
+                "SELECT prefix, MAX(removed IS NULL), MAX(added <= ? AND (removed IS NULL OR removed > ?))"
+                " FROM sync_entries WHERE list = ? AND prefix IN ("
+                "  SELECT prefix FROM sync_entries WHERE list = ? AND (added > ? OR removed > ?))"
+                " GROUP BY prefix",
+                (since, since, name, name, since, since),
+            ).fetchall()
+            lists[name] = {
+                "additions": encode_prefixes(sorted(p for p, now, then in rows if now and not then)),
+                "removals": encode_prefixes(sorted(p for p, now, then in rows if then and not now)),
+                "checksum": prefixes_checksum(self._live_prefixes(conn, name)),
+            }
+        return {"version": version, "full": False, "prefix_len": PREFIX_LEN, "lists": lists}
+
+    def _live_prefixes(self, conn, name):
+        return [row[0] for row in conn.execute(
+            "SELECT DISTINCT prefix FROM sync_entries WHERE list = ? AND removed IS NULL ORDER BY prefix", (name,)
+        )]
+
+    def _full_update(self, conn, version):
+        cached_version, cached = self._full_cache
+        if cached_version == version:
+            return cached
+        lists = {}
+        for name in LISTS:
+            prefixes = self._live_prefixes(conn, name)
+            lists[name] = {"additions": encode_prefixes(prefixes), "removals": "",
+                           "checksum": prefixes_checksum(prefixes)}
+        update = {"version": version, "full": True, "prefix_len": PREFIX_LEN, "lists": lists}
+        self._full_cache = (version, update)
+        return update
+
+    def confirm(self, prefixes):
+        """Live full hashes for the given prefixes: [{"list", "hash"}]"""
+        if not prefixes:
+            return []
+        placeholders = ",".join("?" * len(prefixes))
+        rows = self._conn().execute(
+            f"SELECT DISTINCT list, full_hash FROM sync_entries WHERE prefix IN ({placeholders}) AND removed IS NULL",
+            list(prefixes),
+        ).fetchall()
+        return [{"list": name, "hash": h.hex()} for name, h in sorted(rows)]
+
+    def counts(self):
+        rows = self._conn().execute(
+            "SELECT list, COUNT(DISTINCT full_hash) FROM sync_entries WHERE removed IS NULL GROUP BY list"
+        ).fetchall()
+        return dict(rows)
+
+
+def blocklist_expressions(blocklist):
+    """Sync expressions for every entry of a blocklist.Blocklist snapshot"""
+    # Blocklist keys already are "url:<canonical>" / "host:<hostname>"
+    yield from blocklist.keys()
@@ -0,0 +1,122 @@
+"""Write-behind persistence of analysis results.
+
+Results are queued in memory (latest write per ``_id`` wins) and a background
+thread flushes them to the verdict store as one batched upsert (an unordered
+``bulk_write`` on MongoDB) when the batch is big enough or the flush interval
+has passed. Pending documents
+are readable through ``get`` so a result is visible before it is flushed.
+"""
+import time
+from threading import Condition, Thread
+
+from event_log import log_event
+from metrics import STAGE_LATENCY, LatencyHistogram
+
+
+class WriteBehindQueue:
+    def __init__(self, store, max_batch=100, flush_interval=1.0, max_pending=10000):
+        self.store = store
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flush_latency = LatencyHistogram()
+        self.flushed = 0
+        self.flush_failures = 0
+        self._pending = {}  # _id -> fields to $set, in arrival order
+        self._inflight = {}  # batch currently being written, still readable
+        self._cond = Condition()
+        self._closed = False
+        self._thread = Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, doc):
+        """Queue an upsert of ``doc`` (must carry ``_id``). Blocks only when the queue is full"""
+        doc = dict(doc)
+        doc_id = doc.pop("_id")
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            while len(self._pending) >= self.max_pending and doc_id not in self._pending:
+                self._cond.notify_all()
+                self._cond.wait(timeout=self.flush_interval)
+            self._pending.pop(doc_id, None)
+            self._pending[doc_id] = doc
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+
+    def get(self, doc_id):
+        """Pending (not yet flushed) document for doc_id, or None"""
+        with self._cond:
+            doc = self._pending.get(doc_id)
+            if doc is None:
+                doc = self._inflight.get(doc_id)
+            return dict(doc, _id=doc_id) if doc is not None else None
+
+    def depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _take_batch(self):
+        batch = []
+        for doc_id in list(self._pending)[:self.max_batch]:
+            batch.append((doc_id, self._pending.pop(doc_id)))
+        self._inflight = dict(batch)
+        return batch
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+                if self._closed and not self._pending:
+                    return
+                batch = self._take_batch()
+            if not batch:
+                continue
+            failures = 0 if self._flush(batch) else failures + 1
+            if self._closed and failures >= 3:
+                return  # give up on shutdown rather than spin on a dead database
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            self.store.put_many([dict(doc, _id=doc_id) for doc_id, doc in batch])
+            self.flushed += len(batch)
+            return True
+        except Exception as e:
+            self.flush_failures += 1
+            log_event("write_behind.flush_failed", level="warning", docs=len(batch), error=str(e))
+            with self._cond:
+                for doc_id, doc in batch:
+                    # Don't clobber a newer write that arrived during the flush
+                    self._pending.setdefault(doc_id, doc)
+                closed = self._closed
+            time.sleep(min(self.flush_interval, 5) / (10 if closed else 1))
+            return False
+        finally:
+            elapsed = time.perf_counter() - start
+            self.flush_latency.observe(elapsed)
+            STAGE_LATENCY.labels(stage="store_write").observe(elapsed)
+            with self._cond:
+                self._inflight = {}
+                self._cond.notify_all()
+
+    def close(self, timeout=10):
+        """Flush everything still queued and stop the background thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "queue_depth": self.depth(),
+            "flushed": self.flushed,
+            "flush_failures": self.flush_failures,
+            "flush_latency": self.flush_latency.snapshot(),
+        }
@@ -0,0 +1,276 @@
+"""Headless bulk scanning with checkpoint / resume.
+
+Reads URLs from a file (or '-' for stdin), canonicalizes and dedupes them, runs
+investigations on a worker pool that shares one RateLimiter, and streams
+compact NDJSON results. Finished URLs are read back from the output on start,
+so an interrupted run picks up where it stopped. Parquet output (needs
+pyarrow) is spooled to NDJSON and converted when the run completes. With
+--retry-errors the retried row replaces the failed one (last row per URL wins).
+
+    python bulk_scan.py urls.txt --out results.ndjson --workers 8
+    cat urls.txt | python bulk_scan.py - --out results.parquet
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from scam_detection_agent import InvestigationOrchestrator, RateLimiter
+from llm_scheduler import request_class
+from url_utils import canonicalize_url
+
+
+def url_key(url):
+    """8-byte digest; keeps the seen/done sets small for millions of URLs"""
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+
+
+def read_urls(source):
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8", errors="replace")
+    try:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                rank, _, rest = line.partition(",")
+                yield rest if rank.isdigit() and rest else line  # Tranco-style "rank,domain"
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def canonical_unique(urls, skip):
+    """Canonicalize, drop invalid URLs and anything already seen or in ``skip``"""
+    seen = set()
+    for url in urls:
+        try:
+            canonical = canonicalize_url(url)
+        except ValueError:
+            continue
+        key = url_key(canonical)
+        if key in seen or key in skip:
+            continue
+        seen.add(key)
+        yield canonical
+
+
+def load_done(spool_path, retry_errors):
+    """Keys of URLs already written to the output (the checkpoint)"""
+    done = set()
+    if not os.path.exists(spool_path):
+        return done
+    with open(spool_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a crash
+            if retry_errors and record.get("error"):
+                continue
+            done.add(url_key(record["url"]))
+    return done
+
+
+def summarize(result, full=False):
+    if full:
+        return result
+    assessment = result.get("final_assessment", {})
+    return {
+        "url": result["url"],
+        "risk_score": assessment.get("overall_risk_score"),
+        "risk_level": assessment.get("risk_level"),
+        "confidence": assessment.get("confidence_in_assessment"),
+        "method": assessment.get("method"),
+        "primary_risk_factors": assessment.get("primary_risk_factors", []),
+        "tools": result.get("plan", {}).get("tools_to_use", []),
+        "budget_spent": result.get("budget", {}).get("spent"),
+    }
+
+
+def investigate(url, rate_limiter, full):
+    started = time.time()
+    try:
+        # Bulk scans yield the shared LLM quota to interactive requests
+        with request_class("batch", client="bulk_scan"):
+            result = InvestigationOrchestrator(rate_limiter=rate_limiter).execute_investigation(url)
+        record = summarize(result, full)
+    except Exception as e:
+        record = {"url": url, "error": str(e)}
+    record["scanned_at"] = round(started, 3)
+    record["duration_s"] = round(time.time() - started, 3)
+    return record
+
+
+def _read_records(spool_path):
+    with open(spool_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and record.get("url"):
+                yield record
+
+
+def latest_records(spool_path):
+    """Spooled records, keeping only the last one per URL (a --retry-errors rerun appends a second row)"""
+    last = {}
+    for i, record in enumerate(_read_records(spool_path)):
+        last[url_key(record["url"])] = i
+    for i, record in enumerate(_read_records(spool_path)):
+        if last[url_key(record["url"])] == i:
+            yield record
+
+
+def compact_ndjson(path):
+    """Rewrite an NDJSON output with one (the latest) row per URL"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for record in latest_records(path):
+            out.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+    os.replace(tmp_path, path)
+
+
+def parquet_schema():
+    """One schema for summary, --full and error rows; nested values are JSON strings"""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("url", pa.string()),
+        ("risk_score", pa.float64()),
+        ("risk_level", pa.string()),
+        ("confidence", pa.float64()),
+        ("method", pa.string()),
+        ("primary_risk_factors", pa.string()),
+        ("tools", pa.string()),
+        ("budget_spent", pa.string()),
+        # --full rows
+        ("plan", pa.string()),
+        ("results", pa.string()),
+        ("final_assessment", pa.string()),
+        ("trace", pa.string()),
+        ("budget", pa.string()),
+        # every row
+        ("error", pa.string()),
+        ("scanned_at", pa.float64()),
+        ("duration_s", pa.float64()),
+    ])
+
+
+def write_parquet(spool_path, out_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    batch = []
+
+    def to_row(record):
+        row = {}
+        for field in schema:
+            value = record.get(field.name)
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, default=str)
+            elif value is not None and pa.types.is_string(field.type):
+                value = str(value)
+            elif value is not None and pa.types.is_floating(field.type):
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    value = None
+            row[field.name] = value
+        return row
+
+    with pq.ParquetWriter(out_path, schema) as writer:
+        for record in latest_records(spool_path):
+            batch.append(to_row(record))
+            if len(batch) >= 10000:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch.clear()
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk URL investigation with checkpoint/resume")
+    parser.add_argument("source", help="file with one URL per line (or rank,domain rows), '-' for stdin")
+    parser.add_argument("--out", required=True, help="output path (.ndjson or .parquet)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-rpm", type=int, default=55, help="shared Together.ai request budget")
+    parser.add_argument("--full", action="store_true", help="write full tool results, not a summary")
+    parser.add_argument("--retry-errors", action="store_true", help="re-run URLs that failed last time")
+    parser.add_argument("--verbose", action="store_true", help="keep per-investigation console output")
+    args = parser.parse_args(argv)
+
+    parquet = args.out.endswith(".parquet")
+    if parquet:
+        import pyarrow  # noqa: F401  fail fast before scanning anything
+    spool_path = args.out + ".partial.ndjson" if parquet else args.out
+
+    done = load_done(spool_path, args.retry_errors)
+    if done:
+        print(f"Resuming: {len(done)} URLs already done", file=sys.stderr)
+
+    rate_limiter = RateLimiter(max_requests=args.max_rpm)
+    urls = canonical_unique(read_urls(args.source), done)
+    completed = errors = 0
+    started = time.time()
+
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    with open(spool_path, "a", encoding="utf-8") as out, \
+            (contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext()), \
+            ThreadPoolExecutor(max_workers=args.workers) as pool:
+        in_flight = set()
+
+        def write(future):
+            nonlocal completed, errors
+            record = future.result()
+            out.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+            in_flight.discard(future)
+            completed += 1
+            errors += bool(record.get("error"))
+
+        try:
+            for url in urls:
+                # Bounded submission: don't materialize millions of futures
+                if len(in_flight) >= args.workers * 2:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        write(future)
+                    out.flush()
+                    if completed % 100 < len(finished):
+                        rate = completed / max(time.time() - started, 1e-9) * 60
+                        print(f"{completed} done, {errors} errors, {rate:.0f} URLs/min", file=sys.stderr)
+                in_flight.add(pool.submit(investigate, url, rate_limiter, args.full))
+
+            for future in list(in_flight):
+                write(future)
+        except KeyboardInterrupt:
+            print("Interrupted; waiting for running investigations to finish", file=sys.stderr)
+            # Queued ones are dropped; running ones are paid for already, so keep their results
+            pool.shutdown(wait=True, cancel_futures=True)
+            for future in list(in_flight):
+                if future.done() and not future.cancelled():
+                    write(future)
+            print(f"Checkpointed {completed} URLs this run, rerun to resume", file=sys.stderr)
+            return 130
+        finally:
+            out.flush()
+            os.fsync(out.fileno())
+            if quiet:
+                quiet.close()
+
+    print(f"Finished: {completed} URLs this run, {errors} errors", file=sys.stderr)
+    if parquet:
+        write_parquet(spool_path, args.out)
+        os.remove(spool_path)
+        print(f"Wrote {args.out}", file=sys.stderr)
+    elif args.retry_errors:
+        compact_ndjson(spool_path)  # drop the failed rows that were retried
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Per-investigation budgets of API calls, latency and money, and a tool
+scheduler that spends them where they buy the most information.
+
+Each tool has an estimate, {"calls", "ms", "usd"}. It starts from the tool's
+declared ``cost`` and ``latency_ms`` and is replaced by the averages the
+local planner has observed, so it tracks reality over time. Its value is the
+planner's benefit rate: the share of past runs that found a risk signal.
+
+``schedule_tools`` is a greedy knapsack. Planned tools are taken in order of
+value per share of the tightest remaining budget dimension, and a tool is
+kept only if it still fits. deepfake_detection and text_analysis bring
+content_analysis along, since they read its output. Cheap, informative tools
+therefore run first.
+
+Budgets are checked again before each tool runs, against the actual spend
+so far. A tool that no longer fits is skipped rather than overrunning.
+Planning and the final assessment are not charged to the budget: the
+latency clock is (re)started with ``start()`` once the plan is made.
+
+Defaults: INVESTIGATION_MAX_API_CALLS (6), INVESTIGATION_MAX_LATENCY_MS
+(60000) and INVESTIGATION_MAX_USD (0.002).
+"""
+import math
+import os
+import time
+
+from local_planner import NEEDS_CONTENT
+
+DIMENSIONS = ("calls", "ms", "usd")
+
+
+class InvestigationBudget:
+    def __init__(self, api_calls=None, latency_ms=None, usd=None):
+        self.limits = {
+            "calls": api_calls if api_calls is not None else int(os.environ.get("INVESTIGATION_MAX_API_CALLS", "6")),
+            "ms": latency_ms if latency_ms is not None else float(os.environ.get("INVESTIGATION_MAX_LATENCY_MS", "60000")),
+            "usd": usd if usd is not None else float(os.environ.get("INVESTIGATION_MAX_USD", "0.002")),
+        }
+        self.started = time.perf_counter()
+        self.spent = {"calls": 0, "usd": 0.0}
+        self.tools = {}  # tool name -> {"estimate", "actual"}
+        self.dropped = []
+        self.skipped = []
+
+    def start(self):
+        """Start the latency clock; called after planning so it isn't charged"""
+        self.started = time.perf_counter()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def remaining(self):
+        return {
+            "calls": self.limits["calls"] - self.spent["calls"],
+            "ms": self.limits["ms"] - self.elapsed_ms(),
+            "usd": self.limits["usd"] - self.spent["usd"],
+        }
+
+    def fits(self, estimate, remaining=None):
+        remaining = remaining or self.remaining()
+        return all(estimate[dim] <= remaining[dim] + 1e-9 for dim in DIMENSIONS)
+
+    def affordable_calls(self, usd_per_call):
+        """API calls that still fit the call and money budgets"""
+        remaining = self.remaining()
+        calls = remaining["calls"]
+        if usd_per_call > 0:
+            calls = min(calls, remaining["usd"] / usd_per_call)
+        return max(int(calls), 0)
+
+    def charge(self, tool_name, calls, ms, usd):
+        self.spent["calls"] += calls
+        self.spent["usd"] += usd
+        self.tools.setdefault(tool_name, {})["actual"] = {"calls": calls, "ms": round(ms, 1), "usd": round(usd, 6)}
+
+    def to_dict(self):
+        return {
+            "limits": self.limits,
+            "spent": {"calls": self.spent["calls"], "ms": round(self.elapsed_ms(), 1),
+                      "usd": round(self.spent["usd"], 6)},
+            "tools": self.tools,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+        }
+
+
+def _share(estimate, remaining):
+    """Largest fraction of any remaining budget dimension the estimate would use"""
+    share = 0.0
+    for dim in DIMENSIONS:
+        if estimate[dim] <= 0:
+            continue
+        if remaining[dim] <= 0:
+            return math.inf
+        share = max(share, estimate[dim] / remaining[dim])
+    return share
+
+
+def _add(a, b):
+    return {dim: a[dim] + b[dim] for dim in DIMENSIONS}
+
+
+def schedule_tools(tools, estimates, benefits, budget):
+    """(tools to run in order, tools dropped) for the planned ``tools`` under ``budget``"""
+    remaining = budget.remaining()
+    zero = {dim: 0 for dim in DIMENSIONS}
+
+    def density(name):
+        bundle = estimates[name]
+        if name in NEEDS_CONTENT and "content_analysis" in tools:
+            bundle = _add(bundle, estimates["content_analysis"])
+        share = _share(bundle, remaining)
+        return benefits[name] / share if share else math.inf
+
+    ranked = sorted(tools, key=lambda name: (-density(name), estimates[name]["ms"]))
+    selected, used = [], dict(zero)
+    for name in ranked:
+        if name in selected:
+            continue
+        bundle = [name]
+        if name in NEEDS_CONTENT:
+            if "content_analysis" not in tools:
+                continue  # would only be skipped at run time
+            if "content_analysis" not in selected:
+                bundle.insert(0, "content_analysis")
+        total = used
+        for tool_name in bundle:
+            total = _add(total, estimates[tool_name])
+        if budget.fits(total, remaining):
+            selected.extend(bundle)
+            used = total
+    for name in selected:
+        budget.tools[name] = {"estimate": {dim: round(value, 6) for dim, value in estimates[name].items()}}
+    budget.dropped = [name for name in tools if name not in selected]
+    return selected, budget.dropped
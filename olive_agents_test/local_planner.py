@@ -0,0 +1,242 @@
+"""Deterministic investigation planner: picks tools from URL features, per-domain
+history and tool cost/benefit statistics, in microseconds and without an LLM call.
+
+- Free tools (safe_browsing, domain_analysis, content_analysis) always run.
+- deepfake_detection always runs for deepfake-related URLs (the rule the LLM
+  planner is prompted with), and otherwise only on risky URLs where it has
+  paid off before.
+- text_analysis runs when the URL's risk score times the tool's observed
+  benefit rate covers its cost.
+
+A tool's benefit rate is the share of its past runs that turned up a risk
+signal (threats, risk indicators, suspicious forms, a deepfake, a medium or
+high scam likelihood), smoothed towards 50% while there are few runs. Stats
+come from the investigations this process ran (``record``) and can be seeded
+from logged investigations with ``planner_eval.py --save-stats`` and
+PLANNER_STATS_FILE.
+"""
+import ipaddress
+import json
+import os
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import urlparse
+
+from keyword_matcher import KeywordMatcher, load_keyword_file
+from url_utils import extract_host, registrable_domain
+
+TOOL_ORDER = ["safe_browsing", "domain_analysis", "content_analysis", "deepfake_detection", "text_analysis"]
+TOOL_COSTS = {"safe_browsing": 0, "domain_analysis": 0, "content_analysis": 0,
+              "deepfake_detection": 1, "text_analysis": 1}
+NEEDS_CONTENT = {"deepfake_detection", "text_analysis"}
+
+DEEPFAKE_TRIGGERS = [
+    'deepfake', 'ai-generated', 'synthetic', 'face-swap', 'fake-video',
+    'artificial', 'generated', 'manipulated', 'synthetic-media'
+]
+
+# Indicator keywords looked for in hostnames. Extra lists (one keyword per
+# line) can be supplied through BRAND_KEYWORDS_FILE / ACTION_KEYWORDS_FILE.
+BRAND_KEYWORDS = [
+    'paypal', 'apple', 'microsoft', 'amazon', 'google', 'facebook',
+    'instagram', 'twitter', 'netflix', 'spotify', 'adobe', 'dropbox'
+]
+
+ACTION_KEYWORDS = [
+    'login', 'verify', 'secure', 'account', 'update', 'suspended',
+    'urgent', 'immediate', 'confirm', 'banking', 'security', 'warning'
+]
+
+for _env_var, _keywords in (("BRAND_KEYWORDS_FILE", BRAND_KEYWORDS),
+                            ("ACTION_KEYWORDS_FILE", ACTION_KEYWORDS)):
+    if os.environ.get(_env_var):
+        _keywords.extend(load_keyword_file(os.environ[_env_var]))
+
+# TLDs heavily over-represented in phishing feeds
+RISKY_TLDS = {"xyz", "top", "tk", "ml", "ga", "cf", "gq", "icu", "buzz", "zip", "mov", "click", "country",
+              "loan", "work", "support", "rest", "cam", "monster"}
+
+
+def build_domain_keyword_matcher():
+    """Hostname keyword matcher: BRAND_KEYWORDS tagged "brand", ACTION_KEYWORDS "action"."""
+    return KeywordMatcher([(k, "brand") for k in BRAND_KEYWORDS] + [(k, "action") for k in ACTION_KEYWORDS])
+
+
+def url_features(url, keyword_matcher=None):
+    """Cheap lexical features of a URL, plus the risk score they add up to"""
+    parsed = urlparse(url if "://" in url else "http://" + url)
+    host = extract_host(url)
+    domain = registrable_domain(host)
+    url_lower = url.lower()
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        ip_host = True
+    except ValueError:
+        ip_host = False
+
+    brands, actions = [], []
+    if keyword_matcher is not None:
+        for keyword, kind, _ in keyword_matcher.find_first(host):
+            (brands if kind == "brand" else actions).append(keyword)
+
+    features = {
+        "deepfake_terms": [t for t in DEEPFAKE_TRIGGERS if t in url_lower],
+        # a brand in the host but not as the registrable domain itself (paypal.com is fine)
+        "brand_in_host": [b for b in brands if not domain.startswith(b + ".")],
+        "action_in_host": actions,
+        "ip_host": ip_host,
+        "punycode": "xn--" in host,
+        "deep_subdomains": host.count(".") - domain.count(".") >= 3,
+        "risky_tld": domain.rsplit(".", 1)[-1] in RISKY_TLDS,
+        "userinfo": "@" in parsed.netloc,
+        "plain_http": parsed.scheme == "http",
+        "long_url": len(url) > 120,
+    }
+    weights = {"brand_in_host": 2, "action_in_host": 1, "ip_host": 2, "punycode": 2, "deep_subdomains": 1,
+               "risky_tld": 1, "userinfo": 2, "plain_http": 1, "long_url": 1}
+    features["risk"] = sum(weight for name, weight in weights.items() if features[name])
+    if features["brand_in_host"] and features["action_in_host"]:
+        features["risk"] += 1  # "paypal-login-verify" style hosts
+    return features
+
+
+def tool_signal(tool_name, result):
+    """True when a tool result contains a risk signal"""
+    if not isinstance(result, dict) or result.get("status") != "success":
+        return False
+    if tool_name == "safe_browsing":
+        return bool(result.get("threats"))
+    if tool_name == "domain_analysis":
+        return bool(result.get("risk_indicators") or result.get("suspicious_keywords")
+                    or result.get("typosquat_matches"))
+    if tool_name == "content_analysis":
+        return bool(result.get("suspicious_elements")
+                    or any(form.get("suspicious") for form in result.get("forms", [])))
+    if tool_name == "deepfake_detection":
+        return bool(result.get("deepfake_detected"))
+    if tool_name == "text_analysis":
+        return result.get("scam_likelihood") in ("medium", "high")
+    return False
+
+
+def llm_calls(node):
+    """Number of llm:* spans at or below a span dict"""
+    return node.get("name", "").startswith("llm:") + sum(llm_calls(child) for child in node.get("children", []))
+
+
+def tool_usage(trace):
+    """{tool name: {"ms", "calls"}} from an investigation's span tree"""
+    usage = {}
+    for child in (trace or {}).get("children", []):
+        if child.get("name", "").startswith("tool:"):
+            usage[child["name"][5:]] = {"ms": child.get("duration_ms", 0.0), "calls": llm_calls(child)}
+    return usage
+
+
+class LocalPlanner:
+    # Smoothing: a tool with no history counts as PRIOR_SIGNALS signals in PRIOR_RUNS runs
+    PRIOR_SIGNALS = 1
+    PRIOR_RUNS = 2
+    PAID_TOOL_THRESHOLD = 0.5  # expected value per unit of cost needed to run a paid tool
+    DEEPFAKE_MIN_RISK = 3
+    HIGH_RISK_SCORE = 60  # overall_risk_score that marks a domain as previously risky
+    LOW_RISK_SCORE = 20
+
+    def __init__(self, keyword_matcher=None, stats=None, history_size=10000):
+        self.keyword_matcher = keyword_matcher
+        self.stats = {name: {"runs": 0, "signals": 0, "timed": 0, "total_ms": 0.0, "calls": 0} for name in TOOL_ORDER}
+        for name, tool_stats in (stats or {}).items():
+            if name in self.stats:
+                self.stats[name].update(tool_stats)
+        self.history_size = history_size
+        self._history = OrderedDict()  # registrable domain -> last overall_risk_score
+        self._lock = Lock()
+
+    def benefit(self, tool_name):
+        stats = self.stats[tool_name]
+        return (stats["signals"] + self.PRIOR_SIGNALS) / (stats["runs"] + self.PRIOR_RUNS)
+
+    def estimate(self, tool_name, calls, ms):
+        """(API calls, ms) a run is expected to take: observed averages, else the given priors"""
+        with self._lock:
+            stats = self.stats.get(tool_name)
+            if not stats or not stats["timed"]:
+                return calls, ms
+            return stats["calls"] / stats["timed"], stats["total_ms"] / stats["timed"]
+
+    def plan(self, url):
+        """Plan dict in the same shape as the LLM planner's"""
+        features = url_features(url, self.keyword_matcher)
+        risk = features["risk"]
+        reasons = [name for name, value in features.items() if value and name != "risk"]
+
+        with self._lock:
+            previous = self._history.get(registrable_domain(extract_host(url)))
+        if previous is not None and previous >= self.HIGH_RISK_SCORE:
+            risk += 3
+            reasons.append(f"domain scored {previous} before")
+        elif previous is not None and previous < self.LOW_RISK_SCORE:
+            risk = max(risk - 1, 0)
+            reasons.append(f"domain scored {previous} before")
+
+        tools = ["safe_browsing", "domain_analysis", "content_analysis"]
+        if features["deepfake_terms"] or (risk >= self.DEEPFAKE_MIN_RISK and
+                                          self.benefit("deepfake_detection") * risk / 2 >= self.PAID_TOOL_THRESHOLD):
+            tools.append("deepfake_detection")
+        if self.benefit("text_analysis") * risk / 2 >= self.PAID_TOOL_THRESHOLD * TOOL_COSTS["text_analysis"]:
+            tools.append("text_analysis")
+
+        if features["deepfake_terms"] or risk >= 3:
+            priority = "high"
+        elif risk >= 1:
+            priority = "medium"
+        else:
+            priority = "low"
+        return {
+            "tools_to_use": tools,
+            "reasoning": f"Local planner: URL risk {risk}"
+                         + (f" ({', '.join(reasons)})" if reasons else " (no lexical risk features)"),
+            "priority": priority,
+            "estimated_api_calls": sum(TOOL_COSTS[tool] for tool in tools),
+            "deepfake_analysis_warranted": "deepfake_detection" in tools,
+            "planner": "local",
+        }
+
+    def record(self, url, results, final_assessment=None, trace=None):
+        """Update tool stats and domain history from a finished investigation"""
+        usage = tool_usage(trace)
+        with self._lock:
+            for tool_name, result in results.items():
+                if tool_name not in self.stats or result.get("status") == "skipped":
+                    continue
+                stats = self.stats[tool_name]
+                stats["runs"] += 1
+                stats["signals"] += tool_signal(tool_name, result)
+                if tool_name in usage:  # runs logged without a trace only count towards the benefit
+                    stats["timed"] += 1
+                    stats["total_ms"] += usage[tool_name]["ms"]
+                    stats["calls"] += usage[tool_name]["calls"]
+            score = (final_assessment or {}).get("overall_risk_score")
+            if score is not None:
+                domain = registrable_domain(extract_host(url))
+                self._history.pop(domain, None)
+                self._history[domain] = score
+                if len(self._history) > self.history_size:
+                    self._history.popitem(last=False)
+
+    def stats_snapshot(self):
+        with self._lock:
+            return {name: dict(stats, benefit=round(self.benefit(name), 4), cost=TOOL_COSTS[name],
+                               avg_ms=round(stats["total_ms"] / stats["timed"], 1) if stats["timed"] else None,
+                               avg_calls=round(stats["calls"] / stats["timed"], 2) if stats["timed"] else None)
+                    for name, stats in self.stats.items()}
+
+
+def load_planner_stats(path=None):
+    """Tool stats saved by planner_eval.py --save-stats (PLANNER_STATS_FILE), or None"""
+    path = path or os.environ.get("PLANNER_STATS_FILE")
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return {name: {key: stats[key] for key in ("runs", "signals", "timed", "total_ms", "calls") if key in stats}
+                for name, stats in json.load(f).items()}
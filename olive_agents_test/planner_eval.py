@@ -0,0 +1,131 @@
+"""Offline evaluation of the local planner against logged investigations.
+
+Replays saved investigations (investigation_*.json, NDJSON from
+``bulk_scan.py --full``) in order. Each URL is planned with the statistics
+learned from the investigations before it, then the local plan is compared
+with the logged plan:
+
+- agreement: exact tool-set matches and mean Jaccard similarity
+- signal recall: of the logged tools that found a risk signal, the share the
+  local plan would also have run (a missed signal is a tool the local planner
+  skipped on a URL where it mattered)
+- paid API calls per investigation, logged vs local
+- planning time per URL
+
+    python planner_eval.py investigation_*.json
+    python planner_eval.py results.ndjson --misses 20 --save-stats planner_stats.json
+
+``--save-stats`` writes the tool statistics learned over all records, for
+PLANNER_STATS_FILE.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from local_planner import TOOL_COSTS, LocalPlanner, build_domain_keyword_matcher, tool_signal
+
+
+def load_investigations(paths):
+    """Logged investigations that carry a plan and full tool results"""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            records = [json.loads(text)]
+        except json.JSONDecodeError:
+            records = []
+            for line in text.splitlines():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        for record in records:
+            if isinstance(record, dict) and record.get("url") and isinstance(record.get("results"), dict) \
+                    and isinstance(record.get("plan"), dict) and record["plan"].get("tools_to_use"):
+                yield record
+
+
+def evaluate(records, planner):
+    rows = []
+    for record in records:
+        started = time.perf_counter()
+        plan = planner.plan(record["url"])
+        plan_ms = (time.perf_counter() - started) * 1000
+        logged = set(record["plan"]["tools_to_use"])
+        local = set(plan["tools_to_use"])
+        signals = {name for name, result in record["results"].items() if tool_signal(name, result)}
+        rows.append({
+            "url": record["url"],
+            "logged": sorted(logged),
+            "local": sorted(local),
+            "jaccard": len(logged & local) / len(logged | local),
+            "signals": sorted(signals),
+            "missed": sorted(signals - local),
+            "logged_calls": sum(TOOL_COSTS.get(name, 0) for name in logged),
+            "local_calls": sum(TOOL_COSTS.get(name, 0) for name in local),
+            "plan_ms": plan_ms,
+        })
+        planner.record(record["url"], record["results"], record.get("final_assessment"), record.get("trace"))
+    return rows
+
+
+def summarize(rows):
+    signals = sum(len(row["signals"]) for row in rows)
+    missed = sum(len(row["missed"]) for row in rows)
+    return {
+        "investigations": len(rows),
+        "exact_match": round(sum(row["logged"] == row["local"] for row in rows) / len(rows), 4),
+        "mean_jaccard": round(sum(row["jaccard"] for row in rows) / len(rows), 4),
+        "signal_recall": round((signals - missed) / signals, 4) if signals else None,
+        "missed_signals": missed,
+        "logged_paid_calls": round(sum(row["logged_calls"] for row in rows) / len(rows), 3),
+        "local_paid_calls": round(sum(row["local_calls"] for row in rows) / len(rows), 3),
+        "mean_plan_ms": round(sum(row["plan_ms"] for row in rows) / len(rows), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay logged investigations through the local planner")
+    parser.add_argument("paths", nargs="+", help="investigation JSON or bulk-scan NDJSON (--full) files")
+    parser.add_argument("--misses", type=int, default=10, help="URLs with missed signals to list")
+    parser.add_argument("--save-stats", metavar="PATH", help="write the learned tool statistics here")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    records = list(load_investigations(args.paths))
+    if not records:
+        print("No investigations with plans and full results found", file=sys.stderr)
+        return 1
+    # Same matcher as the agent (including *_KEYWORDS_FILE extensions)
+    planner = LocalPlanner(build_domain_keyword_matcher())
+    rows = evaluate(records, planner)
+    summary = summarize(rows)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for name, value in summary.items():
+            print(f"{name:20} {value}")
+        misses = [row for row in rows if row["missed"]][:args.misses]
+        if misses:
+            print("\nMissed signals")
+            for row in misses:
+                print(f"  {row['url'][:70]:70} {', '.join(row['missed'])}")
+        print("\nTool statistics")
+        for name, stats in planner.stats_snapshot().items():
+            avg_ms = f"{stats['avg_ms']:.1f}" if stats["avg_ms"] is not None else "-"
+            avg_calls = f"{stats['avg_calls']:.2f}" if stats["avg_calls"] is not None else "-"
+            print(f"  {name:20} runs {stats['runs']:>6}  signals {stats['signals']:>6}  "
+                  f"benefit {stats['benefit']:.2f}  cost {stats['cost']}  avg {avg_ms} ms, {avg_calls} calls")
+
+    if args.save_stats:
+        with open(args.save_stats, "w", encoding="utf-8") as f:
+            json.dump(planner.stats_snapshot(), f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,14 +12,50 @@ import base64
 import io
 from PIL import Image
 import hashlib
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from keyword_matcher import KeywordMatcher, load_keyword_file
+from llm_scheduler import acquire
+from brand_index import get_brand_index
+from blocklist import check_url
+from content_compactor import compact_page
+from investigation_budget import InvestigationBudget, schedule_tools
+from local_planner import LocalPlanner, build_domain_keyword_matcher, llm_calls, load_planner_stats
+from metrics import RATE_LIMIT_WAIT, STAGE_LATENCY
+from tracing import span, start_trace
 
 # Configuration
 TOGETHER_API_KEY = ""  # Replace with your Together.ai API key
 GOOGLE_SAFE_BROWSING_API_KEY = ""  # Replace with your Google Safe Browsing API key
 
 TOGETHER_API_URL = "https://api.together.xyz/v1/chat/completions"
+SAFE_BROWSING_API_URL = "https://safebrowsing.googleapis.com/v4/threatMatches:find"
 ORCHESTRATOR_MODEL = "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"
+TOGETHER_USD_PER_CALL = float(os.environ.get("TOGETHER_USD_PER_CALL", "0.0002"))  # ~1k tokens on the 8B model
 DEEPFAKE_MODEL = "microsoft/DialoGPT-medium"  # Placeholder - replace with actual deepfake detection model
+TEXT_ANALYSIS_TOKEN_BUDGET = 500  # compacted page text handed to TextAnalysisTool
+
+# Page-text indicator phrases; extra phrases (one per line) can be supplied
+# through SCAM_PHRASES_FILE. The hostname keyword lists (BRAND_KEYWORDS,
+# ACTION_KEYWORDS) live in local_planner, shared with planner_eval.
+SUSPICIOUS_TEXT_PATTERNS = [
+    "urgent", "immediate", "suspended", "verify now", "click here",
+    "limited time", "act now", "confirm identity", "update payment"
+]
+
+if os.environ.get("SCAM_PHRASES_FILE"):
+    SUSPICIOUS_TEXT_PATTERNS.extend(load_keyword_file(os.environ["SCAM_PHRASES_FILE"]))
+
+# Compiled once at startup; each lookup is a single pass over the input
+DOMAIN_KEYWORD_MATCHER = build_domain_keyword_matcher()
+TEXT_PATTERN_MATCHER = KeywordMatcher(SUSPICIOUS_TEXT_PATTERNS)
+
+# "local" plans from URL features and tool statistics; "llm" asks the orchestrator model
+PLANNER = os.environ.get("PLANNER", "local")
+# Shared by every orchestrator in the process so tool statistics accumulate
+LOCAL_PLANNER = LocalPlanner(DOMAIN_KEYWORD_MATCHER, load_planner_stats())
 
 class RateLimiter:
     """Rate limiter to ensure we don't exceed 60 RPM for Together.ai API"""
@@ -31,28 +67,34 @@ class RateLimiter:
         self.request_count = 0
     
     def wait_if_needed(self):
-        with self.lock:
-            now = datetime.now()
-            # Remove requests older than time_window
-            self.requests = [req_time for req_time in self.requests 
-                           if (now - req_time).total_seconds() < self.time_window]
-            
-            if len(self.requests) >= self.max_requests:
-                oldest_request = min(self.requests)
-                wait_time = self.time_window - (now - oldest_request).total_seconds()
-                if wait_time > 0:
-                    print(f"⏳ Rate limit approaching, waiting {wait_time:.1f} seconds...")
-                    time.sleep(wait_time + 1)
-            
-            self.requests.append(now)
-            self.request_count += 1
+        with span("rate_limit_wait"):
+            # Shared, priority-ordered Together.ai quota first (see backend/llm_scheduler.py)
+            acquire("together")
+            with self.lock:
+                now = datetime.now()
+                # Remove requests older than time_window
+                self.requests = [req_time for req_time in self.requests 
+                               if (now - req_time).total_seconds() < self.time_window]
+            
+                if len(self.requests) >= self.max_requests:
+                    oldest_request = min(self.requests)
+                    wait_time = self.time_window - (now - oldest_request).total_seconds()
+                    if wait_time > 0:
+                        print(f"⏳ Rate limit approaching, waiting {wait_time:.1f} seconds...")
+                        time.sleep(wait_time + 1)
+                        RATE_LIMIT_WAIT.labels(limiter="together").observe(wait_time + 1)
+            
+                self.requests.append(now)
+                self.request_count += 1
 
 class InvestigationTool:
     """Base class for investigation tools"""
-    def __init__(self, name, description, cost=1):
+    def __init__(self, name, description, cost=1, latency_ms=1000, usd_per_call=0.0):
         self.name = name
         self.description = description
         self.cost = cost  # API call cost (for rate limiting)
+        self.latency_ms = latency_ms  # expected run time until observed runs replace it
+        self.usd_per_call = usd_per_call
     
     def execute(self, *args, **kwargs):
         raise NotImplementedError
@@ -62,7 +104,8 @@ class SafeBrowsingTool(InvestigationTool):
         super().__init__(
             "safe_browsing",
             "Check URL against Google Safe Browsing database for known threats",
-            cost=0  # External API, no Together.ai cost
+            cost=0,  # External API, no Together.ai cost
+            latency_ms=300
         )
     
     def execute(self, url):
@@ -76,22 +119,24 @@ class SafeBrowsingTool(InvestigationTool):
             }
             
         try:
-            response = requests.post(
-                f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={GOOGLE_SAFE_BROWSING_API_KEY}",
-                json={
-                    "client": {"clientId": "scam-investigator", "clientVersion": "2.0"},
-                    "threatInfo": {
-                        "threatTypes": [
-                            "MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE", 
-                            "POTENTIALLY_HARMFUL_APPLICATION"
-                        ],
-                        "platformTypes": ["ANY_PLATFORM"],
-                        "threatEntryTypes": ["URL"],
-                        "threatEntries": [{"url": url}]
-                    }
-                },
-                timeout=10
-            )
+            acquire("safe_browsing")
+            with span("http:safe_browsing"):
+                response = requests.post(
+                    f"{SAFE_BROWSING_API_URL}?key={GOOGLE_SAFE_BROWSING_API_KEY}",
+                    json={
+                        "client": {"clientId": "scam-investigator", "clientVersion": "2.0"},
+                        "threatInfo": {
+                            "threatTypes": [
+                                "MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE", 
+                                "POTENTIALLY_HARMFUL_APPLICATION"
+                            ],
+                            "platformTypes": ["ANY_PLATFORM"],
+                            "threatEntryTypes": ["URL"],
+                            "threatEntries": [{"url": url}]
+                        }
+                    },
+                    timeout=10
+                )
             result = response.json()
             threats = result.get('matches', [])
             
@@ -115,7 +160,8 @@ class DomainAnalysisTool(InvestigationTool):
         super().__init__(
             "domain_analysis",
             "Analyze domain characteristics, WHOIS data, and suspicious patterns",
-            cost=0
+            cost=0,
+            latency_ms=1500
         )
     
     def execute(self, url):
@@ -128,34 +174,29 @@ class DomainAnalysisTool(InvestigationTool):
                 "status": "success",
                 "domain": domain,
                 "suspicious_keywords": [],
+                "typosquat_matches": [],
                 "character_analysis": {},
                 "whois_info": {},
                 "risk_indicators": [],
                 "confidence": 50
             }
             
-            # Enhanced suspicious keyword detection
-            brand_keywords = [
-                'paypal', 'apple', 'microsoft', 'amazon', 'google', 'facebook',
-                'instagram', 'twitter', 'netflix', 'spotify', 'adobe', 'dropbox'
-            ]
-            
-            action_keywords = [
-                'login', 'verify', 'secure', 'account', 'update', 'suspended',
-                'urgent', 'immediate', 'confirm', 'banking', 'security', 'warning'
-            ]
-            
-            all_keywords = brand_keywords + action_keywords
-            
-            for keyword in all_keywords:
-                if keyword in domain:
-                    # Check if it's not the legitimate domain
-                    if not (domain == keyword + '.com' or domain.startswith(keyword + '.')):
-                        analysis["suspicious_keywords"].append({
-                            "keyword": keyword,
-                            "type": "brand" if keyword in brand_keywords else "action",
-                            "position": domain.find(keyword)
-                        })
+            # Enhanced suspicious keyword detection (single automaton pass)
+            for keyword, keyword_type, position in DOMAIN_KEYWORD_MATCHER.find_first(domain):
+                # Check if it's not the legitimate domain
+                if not (domain == keyword + '.com' or domain.startswith(keyword + '.')):
+                    analysis["suspicious_keywords"].append({
+                        "keyword": keyword,
+                        "type": keyword_type,
+                        "position": position
+                    })
+            
+            # Look-alike check against the protected brand-domain index
+            analysis["typosquat_matches"] = get_brand_index().lookup(url)
+            for match in analysis["typosquat_matches"][:3]:
+                analysis["risk_indicators"].append(
+                    f"Possible {match['technique']} look-alike of {match['protected_domain']}"
+                )
             
             # Enhanced character analysis
             char_analysis = {
@@ -182,7 +223,8 @@ class DomainAnalysisTool(InvestigationTool):
             
             # WHOIS analysis
             try:
-                w = whois.whois(domain)
+                with span("whois"), STAGE_LATENCY.time(stage="whois"):
+                    w = whois.whois(domain)
                 if w:
                     whois_data = {
                         "creation_date": str(w.creation_date) if w.creation_date else None,
@@ -234,7 +276,8 @@ class ContentAnalysisTool(InvestigationTool):
         super().__init__(
             "content_analysis",
             "Fetch and analyze website content, structure, and behavior",
-            cost=0
+            cost=0,
+            latency_ms=2500
         )
     
     def execute(self, url):
@@ -243,12 +286,14 @@ class ContentAnalysisTool(InvestigationTool):
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
+            with span("http:page_fetch"), STAGE_LATENCY.time(stage="page_fetch"):
+                response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
             
             # Track redirects
             redirect_chain = [resp.url for resp in response.history] + [response.url]
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            with span("html_parse"), STAGE_LATENCY.time(stage="html_parse"):
+                soup = BeautifulSoup(response.text, 'html.parser')
             
             # Remove script and style elements for text analysis
             for script in soup(["script", "style"]):
@@ -280,47 +325,10 @@ class ContentAnalysisTool(InvestigationTool):
             content["security_headers"] = security_headers
             
             # Enhanced form analysis
-            for form in soup.find_all('form'):
-                form_data = {
-                    "action": form.get('action', ''),
-                    "method": form.get('method', 'get').lower(),
-                    "inputs": [],
-                    "suspicious": False
-                }
-                
-                for inp in form.find_all('input'):
-                    input_type = inp.get('type', 'text').lower()
-                    input_name = inp.get('name', '').lower()
-                    form_data["inputs"].append({
-                        "type": input_type,
-                        "name": input_name,
-                        "required": inp.get('required') is not None
-                    })
-                    
-                    # Check for suspicious patterns
-                    if input_type in ['password', 'email'] or 'password' in input_name:
-                        form_data["suspicious"] = True
-                
-                content["forms"].append(form_data)
+            content["forms"] = self.analyze_forms(soup)
             
             # Analyze links
-            external_links = []
-            internal_links = []
-            
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if href.startswith('http'):
-                    if urlparse(href).netloc != urlparse(url).netloc:
-                        external_links.append(href)
-                    else:
-                        internal_links.append(href)
-            
-            content["links"] = {
-                "external": external_links[:10],
-                "internal": internal_links[:10],
-                "external_count": len(external_links),
-                "internal_count": len(internal_links)
-            }
+            content["links"] = self.analyze_links(soup, url)
             
             # Image analysis
             images = []
@@ -342,15 +350,12 @@ class ContentAnalysisTool(InvestigationTool):
                     content["meta_info"][name] = meta.get('content')
             
             # Check for suspicious elements
-            suspicious_patterns = [
-                "urgent", "immediate", "suspended", "verify now", "click here",
-                "limited time", "act now", "confirm identity", "update payment"
-            ]
+            for pattern, _, _ in TEXT_PATTERN_MATCHER.find_first(content["text_content"]):
+                content["suspicious_elements"].append(f"Suspicious text: '{pattern}'")
             
-            text_lower = content["text_content"].lower()
-            for pattern in suspicious_patterns:
-                if pattern in text_lower:
-                    content["suspicious_elements"].append(f"Suspicious text: '{pattern}'")
+            # Compacted main content + forms/CTAs/contacts for the LLM text analysis.
+            # Runs last because it strips boilerplate from the soup in place.
+            content["compact_text"] = compact_page(soup, token_budget=TEXT_ANALYSIS_TOKEN_BUDGET)
             
             # Check for multiple redirects (common in phishing)
             if len(redirect_chain) > 3:
@@ -373,16 +378,67 @@ class ContentAnalysisTool(InvestigationTool):
                 "confidence": 0
             }
 
+    @staticmethod
+    def analyze_forms(soup):
+        """Form actions and inputs; a form asking for a password or email is suspicious"""
+        forms = []
+        for form in soup.find_all('form'):
+            form_data = {
+                "action": form.get('action', ''),
+                "method": form.get('method', 'get').lower(),
+                "inputs": [],
+                "suspicious": False
+            }
+            
+            for inp in form.find_all('input'):
+                input_type = inp.get('type', 'text').lower()
+                input_name = inp.get('name', '').lower()
+                form_data["inputs"].append({
+                    "type": input_type,
+                    "name": input_name,
+                    "required": inp.get('required') is not None
+                })
+                
+                # Check for suspicious patterns
+                if input_type in ['password', 'email'] or 'password' in input_name:
+                    form_data["suspicious"] = True
+            
+            forms.append(form_data)
+        return forms
+    
+    @staticmethod
+    def analyze_links(soup, url):
+        """Absolute links split into internal / external by host"""
+        external_links = []
+        internal_links = []
+        
+        for link in soup.find_all('a', href=True):
+            href = link['href']
+            if href.startswith('http'):
+                if urlparse(href).netloc != urlparse(url).netloc:
+                    external_links.append(href)
+                else:
+                    internal_links.append(href)
+        
+        return {
+            "external": external_links[:10],
+            "internal": internal_links[:10],
+            "external_count": len(external_links),
+            "internal_count": len(internal_links)
+        }
+
 # Also enhance the DeepfakeDetectionTool to analyze more images
 class DeepfakeDetectionTool(InvestigationTool):
     def __init__(self):
         super().__init__(
             "deepfake_detection",
             "Analyze images and videos for deepfake/AI-generated content",
-            cost=1  # Uses Together.ai API
+            cost=1,  # Uses Together.ai API
+            latency_ms=8000,
+            usd_per_call=TOGETHER_USD_PER_CALL
         )
     
-    def execute(self, images_data, rate_limiter):
+    def execute(self, images_data, rate_limiter, max_images=5):
         """Detect deepfakes in images - enhanced version"""
         if not images_data or not TOGETHER_API_KEY:
             return {
@@ -401,8 +457,8 @@ class DeepfakeDetectionTool(InvestigationTool):
         }
         
         try:
-            # Analyze up to 5 images instead of 3
-            max_images = min(5, len(images_data))
+            # Analyze up to 5 images instead of 3, fewer when the budget is tight
+            max_images = min(max_images, len(images_data))
             print(f"   📊 Analyzing {max_images} images for deepfake content...")
             
             for i, image_info in enumerate(images_data[:max_images]):
@@ -415,7 +471,8 @@ class DeepfakeDetectionTool(InvestigationTool):
                 
                 try:
                     print(f"   🖼️ Analyzing image {i+1}/{max_images}: {img_url[:50]}...")
-                    img_response = requests.get(img_url, timeout=10)
+                    with span("http:image_fetch"):
+                        img_response = requests.get(img_url, timeout=10)
                     img_response.raise_for_status()
                     
                     # Enhanced analysis with URL context
@@ -513,7 +570,8 @@ class DeepfakeDetectionTool(InvestigationTool):
                 "temperature": 0.1
             }
             
-            response = requests.post(TOGETHER_API_URL, headers=headers, json=payload, timeout=30)
+            with span("llm:deepfake", model=payload["model"]):
+                response = requests.post(TOGETHER_API_URL, headers=headers, json=payload, timeout=30)
             if response.status_code == 200:
                 result = response.json()
                 ai_response = result['choices'][0]['message']['content']
@@ -552,7 +610,9 @@ class TextAnalysisTool(InvestigationTool):
         super().__init__(
             "text_analysis",
             "Analyze website text for scam patterns, social engineering, and deceptive language",
-            cost=1
+            cost=1,
+            latency_ms=3000,
+            usd_per_call=TOGETHER_USD_PER_CALL
         )
     
     def execute(self, text_content, rate_limiter):
@@ -569,7 +629,7 @@ class TextAnalysisTool(InvestigationTool):
         prompt = f"""
         Analyze this website text for scam and phishing indicators:
         
-        TEXT: {text_content[:1500]}
+        TEXT: {text_content}
         
         Look for:
         1. Urgency tactics ("act now", "limited time")
@@ -606,7 +666,8 @@ class TextAnalysisTool(InvestigationTool):
                 "temperature": 0.1
             }
             
-            response = requests.post(TOGETHER_API_URL, headers=headers, json=payload, timeout=30)
+            with span("llm:text_analysis", model=payload["model"]):
+                response = requests.post(TOGETHER_API_URL, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -638,8 +699,9 @@ class TextAnalysisTool(InvestigationTool):
 class InvestigationOrchestrator:
     """AI orchestrator that decides which tools to use based on initial analysis"""
     
-    def __init__(self):
-        self.rate_limiter = RateLimiter()
+    def __init__(self, rate_limiter=None):
+        # Pass a shared RateLimiter when running many orchestrators concurrently
+        self.rate_limiter = rate_limiter or RateLimiter()
         self.tools = {
             "safe_browsing": SafeBrowsingTool(),
             "domain_analysis": DomainAnalysisTool(),
@@ -652,6 +714,12 @@ class InvestigationOrchestrator:
     # Add this method to the InvestigationOrchestrator class
 
     def plan_investigation(self, url, initial_scan=None):
+        """Decide which tools to use, with the local planner unless PLANNER=llm"""
+        if PLANNER == "llm":
+            return self.plan_investigation_llm(url, initial_scan)
+        return LOCAL_PLANNER.plan(url)
+
+    def plan_investigation_llm(self, url, initial_scan=None):
         """AI decides which tools to use based on initial analysis"""
         if not TOGETHER_API_KEY:
             # Enhanced fallback plan
@@ -730,7 +798,8 @@ class InvestigationOrchestrator:
                 "temperature": 0.2
             }
             
-            response = requests.post(TOGETHER_API_URL, headers=headers, json=payload, timeout=30)
+            with span("llm:plan", model=payload["model"]):
+                response = requests.post(TOGETHER_API_URL, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -786,10 +855,43 @@ class InvestigationOrchestrator:
                     "estimated_api_calls": 2
                 }
       
-    def execute_investigation(self, url):
-        """Main investigation pipeline"""
+    def tool_estimates(self, tool_names):
+        """Expected {"calls", "ms", "usd"} and benefit rate per tool, from observed runs"""
+        estimates, benefits = {}, {}
+        for name in tool_names:
+            tool = self.tools[name]
+            calls, ms = LOCAL_PLANNER.estimate(name, tool.cost, tool.latency_ms)
+            estimates[name] = {"calls": calls, "ms": ms, "usd": calls * tool.usd_per_call}
+            benefits[name] = LOCAL_PLANNER.benefit(name)
+        return estimates, benefits
+
+    def execute_investigation(self, url, on_progress=None, budget=None):
+        """Main investigation pipeline
+
+        on_progress(event, data) is called after planning, after each tool and
+        once the final assessment is ready, so callers can expose partial results.
+        Tools are fitted into ``budget`` (an InvestigationBudget, default limits
+        from the environment). The returned dict carries a span tree under
+        "trace" and the budget's estimates and actual spend under "budget".
+        """
+        self.budget = budget or InvestigationBudget()
+        with start_trace("investigation", url=url) as trace:
+            result = self._run_investigation(url, on_progress)
+        result["trace"] = trace.to_dict()
+        result["budget"] = self.budget.to_dict()
+        LOCAL_PLANNER.record(url, result["results"], result["final_assessment"], result["trace"])
+        return result
+
+    def _run_investigation(self, url, on_progress):
         print(f"🚀 Starting AI-orchestrated investigation of: {url}")
         print("=" * 70)
+
+        # Known-bad URLs from the threat feeds skip planning and every tool
+        with span("blocklist"):
+            blocked = check_url(url)
+        if blocked:
+            print(f"⛔ Blocklisted by {blocked['key']} ({blocked['source']})")
+            return self.blocklisted_result(url, blocked, on_progress)
         
         # Step 1: Quick initial scan
         print("📊 Phase 1: Initial Assessment")
@@ -803,65 +905,105 @@ class InvestigationOrchestrator:
         
         # Step 2: AI decides investigation plan
         print("🤖 Phase 2: AI Planning Investigation Strategy")
-        plan = self.plan_investigation(url, initial_scan)
+        with span("plan"):
+            plan = self.plan_investigation(url, initial_scan)
+        self.budget.start()
+        with span("budget"):
+            estimates, benefits = self.tool_estimates(plan["tools_to_use"])
+            tools, dropped = schedule_tools(plan["tools_to_use"], estimates, benefits, self.budget)
+        plan["tools_to_use"] = tools
+        plan["estimated_api_calls"] = round(sum(estimates[name]["calls"] for name in tools), 2)
+        if dropped:
+            plan["budget_dropped"] = dropped
         print(f"🎯 Investigation Plan: {plan['reasoning']}")
         print(f"🔧 Tools selected: {', '.join(plan['tools_to_use'])}")
         print(f"⚡ Priority: {plan['priority']}")
         print(f"💰 Estimated API calls: {plan.get('estimated_api_calls', 'unknown')}")
+        if dropped:
+            print(f"✂️ Dropped to stay within budget: {', '.join(dropped)}")
+        if on_progress:
+            on_progress("planned", {"plan": plan})
         
         # Step 3: Execute planned tools
         print("\n🔍 Phase 3: Executing Investigation Tools")
         
         for tool_name in plan["tools_to_use"]:
             tool = self.tools[tool_name]
+            if not self.budget.fits(self.budget.tools[tool_name]["estimate"]):
+                # Earlier tools ran over their estimates
+                print(f"\n⏭️ Skipping {tool.name}: investigation budget exhausted")
+                self.budget.skipped.append(tool_name)
+                self.investigation_results[tool_name] = {
+                    "status": "skipped",
+                    "message": "Investigation budget exhausted",
+                    "confidence": 0
+                }
+                if on_progress:
+                    on_progress("tool_done", {"tool": tool_name, "result": self.investigation_results[tool_name]})
+                continue
             print(f"\n🛠️ Running {tool.name}...")
+            tool_started = time.perf_counter()
             
-            try:
-                if tool_name == "safe_browsing":
-                    result = tool.execute(url)
-                elif tool_name == "domain_analysis":
-                    result = tool.execute(url)
-                elif tool_name == "content_analysis":
-                    result = tool.execute(url)
-                elif tool_name == "deepfake_detection":
-                    # Need content analysis results first
-                    if "content_analysis" in self.investigation_results:
-                        images = self.investigation_results["content_analysis"].get("images", [])
-                        result = tool.execute(images, self.rate_limiter)
-                    else:
-                        result = {"status": "skipped", "message": "No content analysis available"}
-                elif tool_name == "text_analysis":
-                    # Need content analysis results first
-                    if "content_analysis" in self.investigation_results:
-                        text = self.investigation_results["content_analysis"].get("text_content", "")
-                        result = tool.execute(text, self.rate_limiter)
-                    else:
-                        result = {"status": "skipped", "message": "No content analysis available"}
+            with span(f"tool:{tool_name}") as tool_span:
+                try:
+                    if tool_name == "safe_browsing":
+                        result = tool.execute(url)
+                    elif tool_name == "domain_analysis":
+                        result = tool.execute(url)
+                    elif tool_name == "content_analysis":
+                        result = tool.execute(url)
+                    elif tool_name == "deepfake_detection":
+                        # Need content analysis results first
+                        if "content_analysis" in self.investigation_results:
+                            images = self.investigation_results["content_analysis"].get("images", [])
+                            max_images = min(5, self.budget.affordable_calls(tool.usd_per_call))
+                            result = tool.execute(images, self.rate_limiter, max_images=max_images)
+                        else:
+                            result = {"status": "skipped", "message": "No content analysis available"}
+                    elif tool_name == "text_analysis":
+                        # Need content analysis results first
+                        if "content_analysis" in self.investigation_results:
+                            content_result = self.investigation_results["content_analysis"]
+                            text = content_result.get("compact_text") or content_result.get("text_content", "")[:1500]
+                            result = tool.execute(text, self.rate_limiter)
+                        else:
+                            result = {"status": "skipped", "message": "No content analysis available"}
                 
-                self.investigation_results[tool_name] = result
+                    self.investigation_results[tool_name] = result
                 
-                # Quick status update
-                if result.get("status") == "success":
-                    confidence = result.get("confidence", 0)
-                    print(f"   ✅ Completed (confidence: {confidence}%)")
-                else:
-                    print(f"   ⚠️ {result.get('status', 'unknown')}: {result.get('message', 'No details')}")
+                    # Quick status update
+                    if result.get("status") == "success":
+                        confidence = result.get("confidence", 0)
+                        print(f"   ✅ Completed (confidence: {confidence}%)")
+                    else:
+                        print(f"   ⚠️ {result.get('status', 'unknown')}: {result.get('message', 'No details')}")
                     
-            except Exception as e:
-                print(f"   ❌ Failed: {str(e)}")
-                self.investigation_results[tool_name] = {
-                    "status": "error",
-                    "message": str(e),
-                    "confidence": 0
-                }
+                except Exception as e:
+                    print(f"   ❌ Failed: {str(e)}")
+                    self.investigation_results[tool_name] = {
+                        "status": "error",
+                        "message": str(e),
+                        "confidence": 0
+                    }
+            tool_seconds = time.perf_counter() - tool_started
+            STAGE_LATENCY.labels(stage=f"tool:{tool_name}").observe(tool_seconds)
+            calls = llm_calls(tool_span.to_dict()) if tool_span is not None else tool.cost
+            self.budget.charge(tool_name, calls, tool_seconds * 1000, calls * tool.usd_per_call)
+            
+            if on_progress:
+                on_progress("tool_done", {"tool": tool_name, "result": self.investigation_results[tool_name]})
         
         # Step 4: Final AI analysis and risk assessment
         print("\n🧠 Phase 4: Final AI Risk Assessment")
-        final_assessment = self.generate_final_assessment(url, plan)
+        with span("final_assessment"):
+            final_assessment = self.generate_final_assessment(url, plan)
+        if on_progress:
+            on_progress("assessed", {"final_assessment": final_assessment})
         
         # Step 5: Generate comprehensive report
         print("\n📋 Phase 5: Generating Report")
-        self.generate_comprehensive_report(url, plan, final_assessment)
+        with span("report"):
+            self.generate_comprehensive_report(url, plan, final_assessment)
         
         return {
             "url": url,
@@ -870,6 +1012,40 @@ class InvestigationOrchestrator:
             "final_assessment": final_assessment
         }
     
+    def blocklisted_result(self, url, blocked, on_progress=None):
+        """Investigation result for a URL found on a threat-feed blocklist"""
+        plan = {
+            "tools_to_use": [],
+            "reasoning": "URL is on a threat-feed blocklist; no tools needed",
+            "priority": "high",
+            "estimated_api_calls": 0
+        }
+        self.investigation_results["blocklist"] = {
+            "status": "success",
+            "match": blocked["key"],
+            "source": blocked["source"],
+            "confidence": 95
+        }
+        final_assessment = {
+            "overall_risk_score": 100,
+            "risk_level": "critical",
+            "confidence_in_assessment": 95,
+            "primary_risk_factors": [f"Listed in threat feed {blocked['source']} ({blocked['key']})"],
+            "secondary_risk_factors": [],
+            "user_recommendation": "🚨 DO NOT INTERACT - This URL is a known phishing or malware site",
+            "technical_summary": "Exact match in the compiled threat-feed blocklist",
+            "false_positive_likelihood": 2,
+            "method": "blocklist"
+        }
+        if on_progress:
+            on_progress("assessed", {"final_assessment": final_assessment})
+        return {
+            "url": url,
+            "plan": plan,
+            "results": self.investigation_results,
+            "final_assessment": final_assessment
+        }
+
     def generate_final_assessment(self, url, plan):
         """AI-powered final risk assessment"""
         if not TOGETHER_API_KEY:
@@ -896,6 +1072,7 @@ class InvestigationOrchestrator:
                 elif tool_name == "domain_analysis":
                     analysis_data["tool_results"][tool_name] = {
                         "suspicious_keywords": result.get("suspicious_keywords", []),
+                        "typosquat_matches": result.get("typosquat_matches", []),
                         "risk_indicators": result.get("risk_indicators", []),
                         "confidence": result.get("confidence", 0)
                     }
@@ -964,7 +1141,8 @@ class InvestigationOrchestrator:
                 "temperature": 0.1
             }
             
-            response = requests.post(TOGETHER_API_URL, headers=headers, json=payload, timeout=30)
+            with span("llm:final_assessment", model=payload["model"]):
+                response = requests.post(TOGETHER_API_URL, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -1007,6 +1185,11 @@ class InvestigationOrchestrator:
                 score += len(domain_result["suspicious_keywords"]) * 15
                 primary_factors.append(f"Suspicious domain keywords: {len(domain_result['suspicious_keywords'])}")
             
+            if domain_result.get("typosquat_matches"):
+                score += 40
+                top_match = domain_result["typosquat_matches"][0]
+                primary_factors.append(f"Domain imitates {top_match['protected_domain']} ({top_match['technique']})")
+            
             if domain_result.get("risk_indicators"):
                 score += len(domain_result["risk_indicators"]) * 10
                 secondary_factors.extend(domain_result["risk_indicators"])
@@ -1128,6 +1311,10 @@ class InvestigationOrchestrator:
                         for kw in keywords[:3]:  # Show first 3
                             print(f"   - {kw.get('keyword', 'Unknown')} ({kw.get('type', 'unknown')} keyword)")
                     
+                    typosquats = result.get('typosquat_matches', [])
+                    if typosquats:
+                        print(f"🎭 Look-alike of: {', '.join(m['protected_domain'] for m in typosquats[:3])}")
+                    
                     risk_indicators = result.get('risk_indicators', [])
                     if risk_indicators:
                         print(f"⚠️ Risk indicators: {', '.join(risk_indicators[:3])}")
@@ -1176,6 +1363,10 @@ class InvestigationOrchestrator:
         print(f"Priority Level: {plan['priority']}")
         print(f"Estimated API Calls: {plan.get('estimated_api_calls', 'unknown')}")
         print(f"Actual API Calls: {self.rate_limiter.request_count}")
+        spent, limits = self.budget.spent, self.budget.limits
+        print(f"Tool Budget Used: {spent['calls']}/{limits['calls']} calls, "
+              f"{self.budget.elapsed_ms() / 1000:.1f}/{limits['ms'] / 1000:.0f} s, "
+              f"${spent['usd']:.4f}/${limits['usd']:.4f}")
         
         print("\n" + "=" * 70)
         print("Investigation Complete ✅")
@@ -1193,6 +1384,11 @@ class InvestigationOrchestrator:
 
 def main():
     """Main application entry point"""
+    if len(sys.argv) > 1:
+        # Headless bulk mode: python scam_detection_agent.py urls.txt --out results.ndjson
+        from bulk_scan import main as bulk_main
+        return bulk_main(sys.argv[1:])
+    
     print("🕵️ Advanced AI-Orchestrated Scam Investigation Agent")
     print("=" * 60)
     
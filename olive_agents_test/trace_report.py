@@ -0,0 +1,74 @@
+"""Critical-path and hotspot reports from investigation traces.
+
+Accepts saved investigation JSON files (investigation_*.json) and NDJSON from
+``bulk_scan.py --full``; anything without a "trace" is skipped.
+
+    python trace_report.py investigation_*.json
+    python trace_report.py results.ndjson --top 20 --critical 3
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from tracing import critical_path, hotspots, self_time_ms
+
+
+def load_traces(paths):
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            records = [json.loads(text)]
+        except json.JSONDecodeError:
+            records = []
+            for line in text.splitlines():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        for record in records:
+            trace = record.get("trace", record if "duration_ms" in record else None)
+            if trace:
+                yield trace
+
+
+def print_hotspots(traces, top):
+    rows = hotspots(traces)[:top]
+    print(f"Hotspots over {len(traces)} traces (by self time)")
+    print(f"{'span':32} {'count':>6} {'self ms':>10} {'share':>7} {'p50 ms':>9} {'p95 ms':>9} {'errors':>6}")
+    for row in rows:
+        print(f"{row['name'][:32]:32} {row['count']:>6} {row['self_ms']:>10.1f} {row['self_share']:>7.1%} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['errors']:>6}")
+
+
+def print_critical_path(trace):
+    url = trace.get("attrs", {}).get("url", "")
+    print(f"\nCritical path: {url} ({trace['duration_ms'] / 1000:.2f} s)")
+    for depth, node in critical_path(trace):
+        label = "  " * depth + node["name"]
+        error = "  !" + node["error"] if node.get("error") else ""
+        print(f"{label[:48]:48} {node['start_ms']:>10.1f} +{node['duration_ms']:>9.1f} ms"
+              f"  self {self_time_ms(node):>8.1f}{error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report on investigation span traces")
+    parser.add_argument("paths", nargs="+", help="investigation JSON or bulk-scan NDJSON files")
+    parser.add_argument("--top", type=int, default=15, help="hotspot rows to show")
+    parser.add_argument("--critical", type=int, default=1, help="critical paths to show, slowest first")
+    args = parser.parse_args(argv)
+
+    traces = list(load_traces(args.paths))
+    if not traces:
+        print("No traces found", file=sys.stderr)
+        return 1
+    print_hotspots(traces, args.top)
+    for trace in sorted(traces, key=lambda t: t["duration_ms"], reverse=True)[:args.critical]:
+        print_critical_path(trace)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())